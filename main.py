@@ -1,4 +1,6 @@
 # dependencias usadas para este archivo raiz
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from scalar_fastapi import get_scalar_api_reference
@@ -24,16 +26,34 @@ from src.routes import (
     contratos_route,
     polygon,
     line,
-    point
+    point,
+    geo,
+    boundaries,
+    neighbors
 )
+from src.services.geo_executor import geo_executor
+from src.services.geo_reload import geo_reloader
+from src.services.geo_warmup import geo_warmup
 
 # # --- Crear tablas en todas las bases parametrizadas ---
 for engines in engine:
     Base.metadata.create_all(bind=engines)
 
 
+# Carga de límites e índices en segundo plano: el arranque no espera la lectura
+# de archivos y /api/geo/ready indica cuándo el motor está listo. Los GeoJSON
+# se vigilan para recargarlos en caliente si se reemplazan
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    geo_warmup.start()
+    geo_reloader.watch()
+    yield
+    geo_reloader.stop()
+    geo_executor.shutdown()
+
+
 # Inicialización de la aplicación FastAPI
-app = FastAPI(title="Servicios parametrizables", version="1.0.0")
+app = FastAPI(title="Servicios parametrizables", version="1.0.0", lifespan=lifespan)
 # configuracion de CORS
 # permite que aplicaciones externas (por ejemplo,
 # un frontend en Angular o React)
@@ -126,6 +146,9 @@ app.include_router(
 app.include_router(polygon.router)
 app.include_router(line.router)
 app.include_router(point.router)
+app.include_router(geo.router)
+app.include_router(boundaries.router)
+app.include_router(neighbors.router)
 
 
 #  Documentación con Swagger/OpenAPI
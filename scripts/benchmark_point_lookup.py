@@ -0,0 +1,58 @@
+"""
+Benchmark de búsqueda punto-en-municipio: recorrido lineal vs índice STRtree
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.benchmark_point_lookup --puntos 2000
+"""
+import argparse
+import time
+import numpy as np
+from shapely.geometry import Point
+from src.services.geometry_registry import geometry_registry
+
+
+def _linear_lookup(municipios, point: Point):
+    """Estrategia anterior: evaluar `contains` sobre todos los municipios"""
+    for codigo, geom in municipios.items():
+        if geom.contains(point):
+            return codigo
+    return None
+
+
+def _indexed_lookup(municipios, point: Point):
+    """Estrategia actual: evaluar solo los candidatos del STRtree"""
+    for idx in municipios.candidates(point):
+        if municipios.geometries[idx].contains(point):
+            return municipios.codes[idx]
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--puntos", type=int, default=2000, help="Cantidad de puntos aleatorios")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    municipios = geometry_registry.get().municipios
+    print(f"Carga de {len(municipios)} municipios: {time.perf_counter() - t0:.2f} s")
+
+    # Mismo recuadro de Colombia que valida /api/point/analyze
+    rng = np.random.default_rng(args.semilla)
+    lngs = rng.uniform(-79, -66, args.puntos)
+    lats = rng.uniform(-4.5, 13.5, args.puntos)
+    points = [Point(lng, lat) for lng, lat in zip(lngs, lats)]
+
+    resultados = {}
+    for nombre, lookup in (("lineal", _linear_lookup), ("strtree", _indexed_lookup)):
+        t0 = time.perf_counter()
+        resultados[nombre] = [lookup(municipios, p) for p in points]
+        total = time.perf_counter() - t0
+        print(f"{nombre:>8}: {total:.3f} s total, {total / len(points) * 1e6:.0f} µs/punto")
+
+    assert resultados["lineal"] == resultados["strtree"], "Las estrategias difieren"
+    print("Resultados idénticos en ambas estrategias")
+
+
+if __name__ == "__main__":
+    main()
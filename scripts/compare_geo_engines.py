@@ -0,0 +1,140 @@
+"""
+Comparación de resultados entre el motor shapely y el motor PostGIS
+
+Lanza un proceso por motor (GEO_ENGINE se lee al importar los servicios),
+cada uno analiza la misma muestra aleatoria de puntos, líneas y polígonos
+contra la base configurada, y luego reporta las respuestas que difieren:
+códigos y nombres deben coincidir exactamente, áreas, porcentajes y km dentro
+de la tolerancia.
+
+Uso (desde la raíz del proyecto, con PostGIS disponible en la base principal):
+    python -m scripts.compare_geo_engines --muestras 200
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
+import time
+from typing import Optional
+import numpy as np
+
+# Diferencia absoluta aceptada además de la relativa: las respuestas se redondean a 2 decimales
+TOLERANCIA_ABS = 0.011
+
+
+def _muestra(muestras: int, semilla: int) -> dict:
+    from src.config.config import GEO_LAT_MAX, GEO_LAT_MIN, GEO_LNG_MAX, GEO_LNG_MIN
+    rng = np.random.default_rng(semilla)
+
+    def _coords(n: int) -> list:
+        return np.column_stack([
+            rng.uniform(GEO_LNG_MIN, GEO_LNG_MAX, n),
+            rng.uniform(GEO_LAT_MIN, GEO_LAT_MAX, n),
+        ]).round(6).tolist()
+
+    poligonos = []
+    for lng, lat in _coords(muestras):
+        ancho, alto = rng.uniform(0.05, 2.0, 2).round(6)
+        poligonos.append([[
+            [lng, lat], [lng + ancho, lat], [lng + ancho, lat + alto], [lng, lat + alto], [lng, lat]
+        ]])
+    return {
+        "puntos": _coords(muestras),
+        "lineas": [_coords(int(rng.integers(2, 6))) for _ in range(muestras)],
+        "poligonos": poligonos,
+    }
+
+
+def _worker(motor: str, muestras: int, semilla: int, cola) -> None:
+    os.environ["GEO_ENGINE"] = motor
+    from src.config.config import sessions
+    from src.services.line_service import line_service
+    from src.services.point_service import point_service
+    from src.services.polygon_service import polygon_service
+    from src.services.result_cache import geo_result_cache
+
+    # Sin caché: se comparan los cálculos de cada motor
+    geo_result_cache.maxsize = 0
+    muestra = _muestra(muestras, semilla)
+    db = sessions[0]()
+    try:
+        resultados = {
+            "puntos": point_service.analyze_points(muestra["puntos"], db)["puntos"],
+            "lineas": [line_service.analyze_line(c, db) for c in muestra["lineas"]],
+            "poligonos": [polygon_service.analyze_polygon(c, db) for c in muestra["poligonos"]],
+        }
+    finally:
+        db.close()
+    cola.put((motor, json.dumps(resultados, sort_keys=True, default=str)))
+
+
+def _iguales(a, b, tolerancia: float) -> bool:
+    """Compara dos respuestas: textos y enteros exactos, números reales con tolerancia relativa"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_iguales(a[k], b[k], tolerancia) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_iguales(x, y, tolerancia) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return isinstance(a, (int, float)) and isinstance(b, (int, float)) \
+            and math.isclose(a, b, rel_tol=tolerancia, abs_tol=TOLERANCIA_ABS)
+    return a == b
+
+
+def _esperar(p, cola, timeout: float) -> Optional[tuple]:
+    """Resultado del proceso de un motor; None si terminó sin publicarlo o se agotó el tiempo"""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            return cola.get(timeout=1)
+        except queue.Empty:
+            if not p.is_alive():
+                break
+    try:
+        # El proceso pudo publicar justo antes de terminar
+        return cola.get(timeout=1)
+    except queue.Empty:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--muestras", type=int, default=200, help="Geometrías por tipo")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--tolerancia", type=float, default=1e-3,
+                        help="Diferencia relativa aceptada en áreas, porcentajes y km")
+    parser.add_argument("--timeout", type=float, default=600, help="Segundos máximos por motor")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    cola = ctx.Queue()
+    resultados = {}
+    # Un motor a la vez: la primera ejecución con PostGIS carga la tabla de límites
+    for motor in ("shapely", "postgis"):
+        p = ctx.Process(target=_worker, args=(motor, args.muestras, args.semilla, cola))
+        p.start()
+        mensaje = _esperar(p, cola, args.timeout)
+        if mensaje is None:
+            p.terminate()
+        p.join()
+        if mensaje is None or p.exitcode != 0:
+            print(f"El motor {motor} no entregó resultados (código de salida {p.exitcode})")
+            raise SystemExit(2)
+        nombre, data = mensaje
+        resultados[nombre] = json.loads(data)
+
+    diferencias = 0
+    for tipo in ("puntos", "lineas", "poligonos"):
+        pares = zip(resultados["shapely"][tipo], resultados["postgis"][tipo])
+        distintos = [i for i, (a, b) in enumerate(pares) if not _iguales(a, b, args.tolerancia)]
+        diferencias += len(distintos)
+        print(f"{tipo:<10} {len(resultados['shapely'][tipo]):>6} analizados, {len(distintos):>4} distintos")
+        for i in distintos[:5]:
+            print(f"  #{i} shapely: {json.dumps(resultados['shapely'][tipo][i], ensure_ascii=False)}")
+            print(f"  #{i} postgis: {json.dumps(resultados['postgis'][tipo][i], ensure_ascii=False)}")
+    raise SystemExit(1 if diferencias else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Reporte de memoria por worker con los límites en modo "eager" vs "shared"
+
+Lanza N procesos (como los workers de uvicorn), cada uno carga el registro de
+geometrías y resuelve un lote de puntos; luego reporta RSS, USS (memoria
+exclusiva del proceso) y PSS (memoria compartida prorrateada) de cada uno.
+
+Uso (desde la raíz del proyecto, con la caché binaria construida):
+    python -m scripts.memory_report --workers 4 --puntos 2000
+"""
+import argparse
+import multiprocessing
+import os
+import numpy as np
+import psutil
+
+MB = 1024 * 1024
+
+
+def _worker(modo: str, puntos: int, semilla: int, barrera, cola) -> None:
+    # El modo se lee de la configuración al importar el registro
+    os.environ["GEO_GEOMETRY_MODE"] = modo
+    import shapely
+    from src.config.config import GEO_LAT_MAX, GEO_LAT_MIN, GEO_LNG_MAX, GEO_LNG_MIN
+    from src.services.geometry_registry import geometry_registry
+
+    municipios = geometry_registry.get().municipios
+    rng = np.random.default_rng(semilla)
+    coords = np.column_stack([
+        rng.uniform(GEO_LNG_MIN, GEO_LNG_MAX, puntos),
+        rng.uniform(GEO_LAT_MIN, GEO_LAT_MAX, puntos),
+    ])
+    municipios.query(shapely.points(coords), predicate='within')
+
+    # Se mide cuando todos los workers cargaron, como en un servidor en régimen
+    barrera.wait()
+    info = psutil.Process().memory_full_info()
+    cola.put((os.getpid(), info.rss, info.uss, getattr(info, "pss", float("nan"))))
+    barrera.wait()
+
+
+def _medir(modo: str, workers: int, puntos: int) -> list:
+    ctx = multiprocessing.get_context("spawn")
+    barrera = ctx.Barrier(workers)
+    cola = ctx.Queue()
+    procesos = [
+        ctx.Process(target=_worker, args=(modo, puntos, i, barrera, cola))
+        for i in range(workers)
+    ]
+    for p in procesos:
+        p.start()
+    resultados = [cola.get() for _ in procesos]
+    for p in procesos:
+        p.join()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4, help="Procesos a simular")
+    parser.add_argument("--puntos", type=int, default=2000, help="Puntos resueltos por worker")
+    args = parser.parse_args()
+
+    print(f"{'modo':<8} {'pid':>8} {'RSS MB':>8} {'USS MB':>8} {'PSS MB':>8}")
+    for modo in ("eager", "shared"):
+        resultados = _medir(modo, args.workers, args.puntos)
+        for pid, rss, uss, pss in resultados:
+            print(f"{modo:<8} {pid:>8} {rss / MB:>8.1f} {uss / MB:>8.1f} {pss / MB:>8.1f}")
+        uss_total = sum(r[2] for r in resultados) / MB
+        print(f"{modo:<8} {'total':>8} {'':>8} {uss_total:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,62 @@ ALGORITHM = os.getenv("ALGORITHM")
 DATA_DIR: str = "data"
 MUNICIPIOS_GEOJSON: str = "municipios_colombia.geojson"
 DEPARTAMENTOS_GEOJSON: str = "departamentos_colombia.geojson"
+# Artefactos binarios precompilados de los límites (ver src/services/geometry_cache.py)
+GEO_CACHE_DIR: str = os.getenv("GEO_CACHE_DIR", os.path.join(DATA_DIR, "cache"))
+
+# "eager" decodifica todos los límites en cada proceso (con niveles simplificados);
+# "shared" los lee bajo demanda del artefacto mapeado en memoria, compartido entre workers
+GEO_GEOMETRY_MODE: str = os.getenv("GEO_GEOMETRY_MODE", "eager")
+# Geometrías decodificadas que conserva cada proceso en modo "shared"
+GEO_SHARED_DECODE_CACHE: int = int(os.getenv("GEO_SHARED_DECODE_CACHE", "256"))
+# Motor de los predicados espaciales: "shapely" (en memoria) o "postgis" (límites cargados
+# en una tabla con índice GiST de la base principal; las tablas se instalan con
+# `python -m src.services.postgis_engine setup`, ver src/services/postgis_engine.py)
+GEO_ENGINE: str = os.getenv("GEO_ENGINE", "shapely")
+# Áreas de los departamentos en /api/polygon: "exact" intersecta cada departamento con el
+# polígono; "aggregate" las suma desde las intersecciones de sus municipios (sin intersecar
+# los departamentos, que son los límites más grandes; ver test/test_polygon_service.py)
+GEO_DEPARTMENT_AREAS: str = os.getenv("GEO_DEPARTMENT_AREAS", "exact")
+# Envolvente de Colombia (grados WGS84) usada para validar coordenadas y para la grilla de búsqueda
+GEO_LNG_MIN: float = -79.0
+GEO_LNG_MAX: float = -66.0
+GEO_LAT_MIN: float = -4.5
+GEO_LAT_MAX: float = 13.5
+# Resolución (grados) de la grilla precalculada punto -> municipio (ver src/services/lookup_grid.py)
+GEO_LOOKUP_GRID_RESOLUTION: float = float(os.getenv("GEO_LOOKUP_GRID_RESOLUTION", "0.01"))
+
+# Distancia máxima (grados) entre dos límites para considerarlos vecinos (ver src/services/adjacency_graph.py)
+GEO_ADJACENCY_TOLERANCE: float = float(os.getenv("GEO_ADJACENCY_TOLERANCE", "0.00001"))
+
+# Medición geográfica
+# CRS proyectado para longitudes/áreas: EPSG:3116 (MAGNA-SIRGAS Bogotá) o EPSG:9377 (Origen Nacional)
+GEO_PROJECTED_CRS: str = os.getenv("GEO_PROJECTED_CRS", "EPSG:3116")
+# "projected" usa GEO_PROJECTED_CRS; "geodesic" mide sobre el elipsoide WGS84 con pyproj.Geod
+GEO_MEASUREMENT_MODE: str = os.getenv("GEO_MEASUREMENT_MODE", "projected")
+# Tolerancias (grados) de los niveles simplificados de los límites: el nivel grueso
+# descarta rápido y el medio (con topología preservada) delimita la franja de borde
+GEO_TIER_COARSE_TOLERANCE: float = float(os.getenv("GEO_TIER_COARSE_TOLERANCE", "0.01"))
+GEO_TIER_MEDIUM_TOLERANCE: float = float(os.getenv("GEO_TIER_MEDIUM_TOLERANCE", "0.001"))
+# Cada cuántos segundos se revisan los GeoJSON de límites para recargarlos en caliente (0 lo desactiva)
+GEO_RELOAD_WATCH_SECONDS: float = float(os.getenv("GEO_RELOAD_WATCH_SECONDS", "30"))
+# Segundos que una petición geográfica espera al calentamiento antes de responder 503
+GEO_WARMUP_WAIT_SECONDS: float = float(os.getenv("GEO_WARMUP_WAIT_SECONDS", "5"))
+# Espera (segundos) antes de reintentar un calentamiento fallido; se duplica en cada fallo
+GEO_WARMUP_RETRY_SECONDS: float = float(os.getenv("GEO_WARMUP_RETRY_SECONDS", "5"))
+# Tiles de límites: respuestas comprimidas cacheadas en memoria y zoom máximo servido
+GEO_TILE_CACHE_SIZE: int = int(os.getenv("GEO_TILE_CACHE_SIZE", "4096"))
+GEO_TILE_MAX_ZOOM: int = int(os.getenv("GEO_TILE_MAX_ZOOM", "14"))
+# Pool de hilos de los análisis geográficos y cupos de espera antes de responder 503
+GEO_EXECUTOR_WORKERS: int = int(os.getenv("GEO_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+GEO_EXECUTOR_QUEUE_SIZE: int = int(os.getenv("GEO_EXECUTOR_QUEUE_SIZE", "32"))
+# Cada cuántos segundos un worker revisa si cambiaron las tablas DIVIPOLA (las escrituras
+# hechas por otros workers no invalidan su caché en memoria; 0 revisa en cada lectura)
+GEO_DIVIPOLA_CHECK_SECONDS: float = float(os.getenv("GEO_DIVIPOLA_CHECK_SECONDS", "10"))
+# Caché de resultados de /api/point, /api/line y /api/polygon (tamaño 0 la desactiva)
+GEO_RESULT_CACHE_SIZE: int = int(os.getenv("GEO_RESULT_CACHE_SIZE", "1024"))
+GEO_RESULT_CACHE_TTL_SECONDS: float = float(os.getenv("GEO_RESULT_CACHE_TTL_SECONDS", "600"))
+# Decimales a los que se redondean las coordenadas de la llave (6 ≈ 0.1 m)
+GEO_RESULT_CACHE_PRECISION: int = int(os.getenv("GEO_RESULT_CACHE_PRECISION", "6"))
 
 
 # # --- Configura las URLs dinámicamente ---
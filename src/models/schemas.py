@@ -36,6 +36,38 @@ class PointCoordinates(BaseModel):
     )
 
 
+class PointBatchCoordinates(BaseModel):
+    """Lote de puntos en formato GeoJSON"""
+    type: str = Field(default="marker", description="Tipo de geometría")
+    coordinates: List[List[float]] = Field(
+        ...,
+        description="Coordenadas de los puntos en formato GeoJSON [[lng, lat], ...]"
+    )
+
+
+class PolygonGeometry(BaseModel):
+    """Geometría GeoJSON de tipo Polygon"""
+    type: str = Field(default="Polygon", description="Tipo de geometría GeoJSON")
+    coordinates: List[List[List[float]]] = Field(
+        ...,
+        description="Coordenadas del polígono en formato GeoJSON [[[lng, lat], ...]]"
+    )
+
+
+class PolygonFeature(BaseModel):
+    """Feature GeoJSON con geometría de polígono (por ejemplo, la huella de un proyecto)"""
+    type: str = Field(default="Feature", description="Tipo de objeto GeoJSON")
+    id: Optional[Union[str, int]] = None
+    properties: Optional[dict] = None
+    geometry: PolygonGeometry
+
+
+class PolygonFeatureCollection(BaseModel):
+    """Lote de polígonos como FeatureCollection GeoJSON"""
+    type: str = Field(default="FeatureCollection", description="Tipo de objeto GeoJSON")
+    features: List[PolygonFeature]
+
+
 # ============================================================================
 # SCHEMAS DE RESPUESTA - POLÍGONOS
 # ============================================================================
@@ -76,6 +108,22 @@ class AnalisisPolygonResponse(BaseModel):
     municipios: List[MunicipioIntersectado]
 
 
+class PoligonoAnalizado(BaseModel):
+    """Resultado de un feature dentro de un lote de polígonos"""
+    indice: int  # Posición del feature en la FeatureCollection
+    id: Optional[Union[str, int]] = None
+    success: bool
+    data: Optional[AnalisisPolygonResponse] = None
+    error: Optional[str] = None
+
+
+class AnalisisPolygonBatchResponse(BaseModel):
+    """Respuesta completa del análisis de un lote de polígonos"""
+    tipo: str = "polygon"
+    total_features: int
+    features: List[PoligonoAnalizado]
+
+
 # ============================================================================
 # SCHEMAS DE RESPUESTA - LÍNEAS
 # ============================================================================
@@ -87,7 +135,8 @@ class MunicipioEnRuta(BaseModel):
     nombre_municipio: str
     codigo_departamento: str
     nombre_departamento: str
-    orden: int  # Orden en que aparece en la ruta
+    orden: int  # Orden en que la línea entra al límite
+    longitud_km: float  # Km de la línea dentro del límite
 
 
 class DepartamentoEnRuta(BaseModel):
@@ -95,7 +144,8 @@ class DepartamentoEnRuta(BaseModel):
     id: int
     codigo_departamento: str
     nombre_departamento: str
-    orden: int  # Orden en que aparece en la ruta
+    orden: int  # Orden en que la línea entra al límite
+    longitud_km: float  # Km de la línea dentro del límite
 
 
 class AnalisisLineaResumen(BaseModel):
@@ -137,6 +187,75 @@ class AnalisisPointResponse(BaseModel):
     ubicacion: UbicacionPunto
 
 
+class PuntoAnalizado(BaseModel):
+    """Resultado de un punto dentro de un lote"""
+    coordenadas_punto: List[float]
+    ubicacion: UbicacionPunto
+
+
+class AnalisisPointNearestResponse(BaseModel):
+    """Respuesta de la búsqueda de municipios más cercanos a un punto"""
+    tipo: str = "marker"
+    coordenadas_punto: List[float]
+    municipios: List[UbicacionPunto]
+
+
+class AnalisisPointBatchResponse(BaseModel):
+    """Respuesta completa del análisis de un lote de puntos"""
+    tipo: str = "marker"
+    total_puntos: int
+    puntos: List[PuntoAnalizado]
+
+
+# ============================================================================
+# SCHEMAS DE RESPUESTA - PROXIMIDAD
+# ============================================================================
+
+class MunicipioCercano(BaseModel):
+    """Municipio dentro del radio de búsqueda"""
+    id: int
+    codigo_municipio: str
+    nombre_municipio: str
+    codigo_departamento: str
+    nombre_departamento: str
+    distancia_km: float  # Distancia a la geometría consultada (0 si la toca)
+
+
+class AnalisisProximidadResponse(BaseModel):
+    """Municipios a menos de `radio_km` de un punto o una línea"""
+    tipo: str
+    coordenadas_punto: Optional[List[float]] = None
+    coordenadas_linea: Optional[List[List[float]]] = None
+    radio_km: float
+    total_municipios: int
+    municipios: List[MunicipioCercano]
+
+
+# ============================================================================
+# SCHEMAS DE RESPUESTA - VECINOS
+# ============================================================================
+
+class LimiteVecino(BaseModel):
+    """Municipio o departamento vecino"""
+    id: int
+    codigo: str
+    nombre: str
+    codigo_departamento: Optional[str] = None  # Solo en la capa de municipios
+    nombre_departamento: Optional[str] = None  # Solo en la capa de municipios
+    saltos: int  # 1 = comparte borde con el límite consultado
+    longitud_frontera_km: Optional[float] = None  # Km de borde compartido (solo vecinos directos)
+
+
+class AnalisisVecinosResponse(BaseModel):
+    """Vecinos (o vecindario de k saltos) de un municipio o departamento"""
+    capa: str
+    codigo: str
+    nombre: str
+    k: int
+    total_vecinos: int
+    vecinos: List[LimiteVecino]
+
+
 # ============================================================================
 # SCHEMA DE RESPUESTA GENÉRICA
 # ============================================================================
@@ -144,6 +263,8 @@ class AnalisisPointResponse(BaseModel):
 class APIResponse(BaseModel):
     """Respuesta estándar de la API"""
     success: bool
-    data: Optional[Union[AnalisisPolygonResponse, AnalisisLineResponse, AnalisisPointResponse, dict]] = None
+    data: Optional[Union[AnalisisPolygonResponse, AnalisisPolygonBatchResponse, AnalisisLineResponse,
+                         AnalisisPointResponse, AnalisisPointBatchResponse, AnalisisPointNearestResponse,
+                         AnalisisProximidadResponse, AnalisisVecinosResponse, dict]] = None
     error: Optional[str] = None
 
@@ -0,0 +1,90 @@
+"""
+Endpoints de límites DIVIPOLA para el mapa (vector tiles y GeoJSON simplificado)
+"""
+import gzip
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from src.config.config import GEO_TILE_MAX_ZOOM
+from src.services.boundary_tiles import CAPAS, CachedBody, boundary_tile_service
+from src.services.geo_executor import geo_executor
+from src.utils.geo_ready_util import require_geo_ready
+
+router = APIRouter(prefix="/api/geo/boundaries", tags=["Geo Boundaries"], dependencies=[Depends(require_geo_ready)])
+
+# Zoom máximo del GeoJSON simplificado (más allá conviene usar los tiles)
+MAX_ZOOM_GEOJSON = 12
+
+
+def _validar_capa(capa: str) -> None:
+    if capa not in CAPAS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Capa desconocida: {capa}. Use una de {', '.join(CAPAS)}"
+        )
+
+
+def _responder(request: Request, cuerpo: CachedBody, media_type: str) -> Response:
+    """Cuerpo precomprimido con ETag fuerte; 304 si el cliente ya lo tiene"""
+    headers = {
+        "ETag": cuerpo.etag,
+        "Cache-Control": "public, max-age=86400",
+        "Vary": "Accept-Encoding",
+    }
+    if cuerpo.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=cuerpo.gz, media_type=media_type, headers=headers)
+    # Clientes sin gzip (poco frecuente): se descomprime al vuelo
+    return Response(content=gzip.decompress(cuerpo.gz), media_type=media_type, headers=headers)
+
+
+@router.get("/tiles/{capa}/{z}/{x}/{y}.mvt")
+async def boundary_tile(
+    request: Request,
+    capa: str,
+    z: int = Path(..., ge=0, le=GEO_TILE_MAX_ZOOM),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+):
+    """
+    Tile vectorial (Mapbox Vector Tile) de `municipios` o `departamentos`
+
+    Esquema XYZ (Web Mercator). Cada feature trae `codigo` (DIVIPOLA) y `nombre`.
+    La respuesta va comprimida con gzip y con ETag; los tiles se generan una sola
+    vez por versión de los límites.
+    """
+    _validar_capa(capa)
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail=f"Tile fuera de rango: {z}/{x}/{y}")
+
+    # Memoria en el event loop; el disco en el pool de hilos; la generación en el pool geográfico
+    cuerpo = boundary_tile_service.memory_tile(capa, z, x, y)
+    if cuerpo is None:
+        cuerpo = await run_in_threadpool(boundary_tile_service.cached_tile, capa, z, x, y)
+    if cuerpo is None:
+        cuerpo = await geo_executor.run(boundary_tile_service.tile, capa, z, x, y)
+    return _responder(request, cuerpo, "application/vnd.mapbox-vector-tile")
+
+
+@router.get("/{capa}")
+async def boundary_geojson(
+    request: Request,
+    capa: str,
+    zoom: int = Query(6, ge=0, le=MAX_ZOOM_GEOJSON, description="Zoom del mapa: define la simplificación"),
+):
+    """
+    Límites de `municipios` o `departamentos` como GeoJSON simplificado para un zoom
+
+    La tolerancia de simplificación equivale a ~1 píxel en el zoom pedido y
+    preserva la topología. Cada feature trae `codigo` (DIVIPOLA) y `nombre`.
+    """
+    _validar_capa(capa)
+
+    cuerpo = boundary_tile_service.memory_geojson(capa, zoom)
+    if cuerpo is None:
+        cuerpo = await run_in_threadpool(boundary_tile_service.cached_geojson, capa, zoom)
+    if cuerpo is None:
+        cuerpo = await geo_executor.run(boundary_tile_service.geojson, capa, zoom)
+    return _responder(request, cuerpo, "application/geo+json")
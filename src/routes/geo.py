@@ -0,0 +1,124 @@
+"""
+Endpoints de estado y administración del motor geográfico
+"""
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from src.services.geo_executor import geo_executor
+from src.services.geo_reload import geo_reloader
+from src.services.geo_warmup import geo_warmup
+from src.services.geometry_registry import geometry_registry
+from src.services.result_cache import geo_result_cache
+from src.utils.geo_ready_util import require_geo_ready
+from src.utils.jwt_validator_util import verify_jwt_token
+
+router = APIRouter(prefix="/api/geo", tags=["Geo Engine"])
+
+
+@router.get("/ready")
+async def geo_ready():
+    """
+    Indica si el motor geográfico (límites, índices y caché DIVIPOLA) está cargado
+    
+    Responde 200 cuando está listo y 503 mientras carga o si la carga falló,
+    para usarse como readiness probe.
+    
+    **Respuesta:**
+    - `ready`: Si las rutas /api/point, /api/line y /api/polygon pueden atender
+    - `estado`: `pendiente`, `cargando`, `listo` o `error`
+    - `duracion_s`: Duración de la carga en segundos (cuando terminó)
+    - `error`: Mensaje de error si la carga falló
+    - `intentos`: Cargas lanzadas; tras un fallo la siguiente petición geográfica la reintenta
+    - `reintento_s`: Segundos que faltan para permitir el reintento (solo en `error`)
+    """
+    estado = geo_warmup.status()
+    return JSONResponse(status_code=200 if estado["ready"] else 503, content=estado)
+
+
+@router.get("/cache")
+async def geo_cache_stats():
+    """
+    Contadores de la caché de resultados de /api/point, /api/line y /api/polygon
+    
+    La caché se vacía sola cuando cambian los límites o las tablas DIVIPOLA.
+    
+    **Respuesta:**
+    - `habilitada`: Si la caché está activa (GEO_RESULT_CACHE_SIZE > 0)
+    - `entradas` / `capacidad`: Resultados almacenados y máximo permitido
+    - `ttl_s`: Segundos de vigencia de cada resultado
+    - `precision`: Decimales a los que se redondean las coordenadas de la llave
+    - `hits`, `misses`, `evictions`, `hit_ratio`: Contadores acumulados
+    """
+    return geo_result_cache.stats()
+
+
+@router.get("/executor")
+async def geo_executor_stats():
+    """
+    Ocupación del pool de análisis geográficos
+    
+    **Respuesta:**
+    - `workers`: Hilos del pool (GEO_EXECUTOR_WORKERS)
+    - `cola`: Análisis que pueden esperar además de los que se ejecutan (GEO_EXECUTOR_QUEUE_SIZE)
+    - `en_curso`: Análisis admitidos que aún no terminan
+    - `completadas`: Análisis terminados
+    - `rechazadas`: Peticiones respondidas con 503 por cola llena
+    """
+    return geo_executor.stats()
+
+
+@router.get("/diagnostics", dependencies=[Depends(require_geo_ready)])
+async def geo_diagnostics():
+    """
+    Resultado de la validación de los límites al cargarlos
+    
+    Las geometrías inválidas se reparan con make_valid una sola vez al construir
+    la caché binaria; los features que no se pueden leer ni reparar quedan en
+    cuarentena y no participan en los análisis.
+    
+    **Respuesta (por capa `municipios` y `departamentos`):**
+    - `features`: Límites cargados (válidos)
+    - `reparados`: Features corregidos (`indice` en el GeoJSON, `codigo`, `motivo`)
+    - `cuarentena`: Features descartados (`indice`, `codigo`, `motivo`)
+    """
+    capas = geometry_registry.get()
+    return {
+        "version": capas.version,
+        **{
+            layer.nombre: {"features": len(layer), **layer.diagnostico}
+            for layer in (capas.municipios, capas.departamentos)
+        },
+    }
+
+
+@router.get("/reload")
+async def geo_reload_status():
+    """
+    Estado de la última recarga de límites
+    
+    **Respuesta:**
+    - `estado`: `inactivo`, `recargando`, `listo` o `error`
+    - `motivo`: Origen de la última recarga (manual o archivos modificados)
+    - `version`: Versión del registro de geometrías que atienden las peticiones
+    - `recargas`: Recargas completadas desde el arranque
+    - `duracion_s`, `fecha`, `error`: Resultado de la última recarga
+    - `vigilancia_s`: Intervalo de revisión de los GeoJSON (0 = sin vigilancia)
+    """
+    return geo_reloader.status()
+
+
+@router.post("/reload", status_code=202)
+async def geo_reload(tokenpayload: dict = Depends(verify_jwt_token)):
+    """
+    Recarga los límites desde DATA_DIR sin reiniciar el worker
+    
+    La versión nueva se construye en segundo plano y reemplaza a la vigente de
+    forma atómica; las peticiones en curso terminan con la versión anterior.
+    Responde 202 de inmediato; el avance se consulta con GET /api/geo/reload.
+    Con varios workers, cada uno detecta el cambio de archivos por su cuenta.
+    
+    **Respuesta:**
+    - `iniciada`: False si ya había una recarga en curso
+    - Más los campos de GET /api/geo/reload
+    """
+    iniciada = geo_reloader.start("manual")
+    return {"iniciada": iniciada, **geo_reloader.status()}
@@ -1,13 +1,20 @@
 """
 Endpoints de API para análisis de líneas
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from src.config.config import get_session
 from src.models.schemas import LineCoordinates, APIResponse
 from src.services.line_service import line_service
+from src.services.proximity_service import proximity_service
+from src.services.geo_executor import geo_executor
+from src.utils.geo_ready_util import require_geo_ready
 
-router = APIRouter(prefix="/api/line", tags=["Line Analysis"])
+# Todas las rutas esperan (o rechazan con 503) hasta que el motor geográfico esté cargado
+router = APIRouter(prefix="/api/line", tags=["Line Analysis"], dependencies=[Depends(require_geo_ready)])
+
+# Radio máximo (km) de /within
+MAX_RADIO_KM = 200
 
 
 @router.post("/analyze", response_model=APIResponse)
@@ -36,8 +43,10 @@ async def analyze_line(
       - `coordenadas_linea`: Coordenadas de la línea analizada
       - `longitud_km`: Longitud total de la línea en km
       - `resumen`: Resumen con totales y longitud
-      - `departamentos`: Lista de departamentos por donde pasa (con orden)
-      - `municipios`: Lista de municipios por donde pasa (con orden)
+      - `departamentos`: Departamentos en el orden en que la línea los recorre,
+        con `orden` y `longitud_km` (km de línea dentro de cada uno)
+      - `municipios`: Municipios en el orden en que la línea los recorre,
+        con `orden` y `longitud_km`
     """
     try:
         # Validar que haya coordenadas
@@ -47,8 +56,8 @@ async def analyze_line(
                 detail="Se requieren al menos 2 puntos para formar una línea"
             )
         
-        # Realizar análisis
-        result = line_service.analyze_line(line_data.coordinates, db)
+        # Realizar análisis en el pool geográfico (fuera del event loop)
+        result = await geo_executor.run(line_service.analyze_line, line_data.coordinates, db)
         
         return APIResponse(
             success=True,
@@ -63,3 +72,45 @@ async def analyze_line(
             error=str(e)
         )
 
+
+@router.post("/within", response_model=APIResponse)
+async def municipalities_within(
+    line_data: LineCoordinates,
+    radio_km: float = Query(..., gt=0, le=MAX_RADIO_KM, description="Radio de búsqueda en km"),
+    db: Session = Depends(lambda: next(get_session(0)))
+):
+    """
+    Retorna los municipios a menos de `radio_km` de la línea (por ejemplo, el
+    área de influencia de una vía)
+    
+    **Respuesta:**
+    - `success`: Indica si la operación fue exitosa
+    - `data`: Objeto con el resultado
+      - `coordenadas_linea`: Coordenadas de la línea consultada
+      - `radio_km`: Radio de búsqueda
+      - `municipios`: Lista ordenada por `distancia_km` ascendente (0 para
+        los municipios que la línea atraviesa)
+    """
+    try:
+        # Validar que haya coordenadas
+        if not line_data.coordinates or len(line_data.coordinates) < 2:
+            raise HTTPException(
+                status_code=400,
+                detail="Se requieren al menos 2 puntos para formar una línea"
+            )
+        
+        # Realizar búsqueda en el pool geográfico (fuera del event loop)
+        result = await geo_executor.run(proximity_service.line_within, line_data.coordinates, radio_km, db)
+        
+        return APIResponse(
+            success=True,
+            data=result
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            error=str(e)
+        )
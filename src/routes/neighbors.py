@@ -0,0 +1,81 @@
+"""
+Endpoints de vecindad entre municipios y departamentos
+"""
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy.orm import Session
+from src.config.config import get_session
+from src.models.schemas import APIResponse
+from src.services.geo_executor import geo_executor
+from src.services.neighbor_service import CAPAS, neighbor_service
+from src.utils.geo_ready_util import require_geo_ready
+
+router = APIRouter(prefix="/api/geo/neighbors", tags=["Geo Neighbors"], dependencies=[Depends(require_geo_ready)])
+
+# Máximo de saltos aceptados por /k-hop
+MAX_SALTOS = 10
+
+
+async def _vecinos(capa: str, codigo: str, k: int, db: Session) -> APIResponse:
+    if capa not in CAPAS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Capa desconocida: {capa}. Use una de {', '.join(CAPAS)}"
+        )
+    try:
+        # El grafo se abre (o construye) en el pool geográfico la primera vez
+        result = await geo_executor.run(neighbor_service.neighbors, capa, codigo, k, db)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"No existe el código {codigo} en la capa {capa}")
+
+        return APIResponse(
+            success=True,
+            data=result
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            error=str(e)
+        )
+
+
+@router.get("/{capa}/{codigo}", response_model=APIResponse)
+async def neighbors(
+    capa: str = Path(..., description="`municipios` o `departamentos`"),
+    codigo: str = Path(..., description="Código DIVIPOLA del límite"),
+    db: Session = Depends(lambda: next(get_session(0)))
+):
+    """
+    Municipios (o departamentos) que comparten borde con el límite dado
+
+    **Respuesta:**
+    - `success`: Indica si la operación fue exitosa
+    - `data`: Objeto con el resultado
+      - `codigo` / `nombre`: Límite consultado
+      - `vecinos`: Lista ordenada por `longitud_frontera_km` descendente
+        (km de borde compartido; 0 si solo se tocan en un punto)
+    """
+    return await _vecinos(capa, codigo, 1, db)
+
+
+@router.get("/{capa}/{codigo}/k-hop", response_model=APIResponse)
+async def neighbors_k_hop(
+    capa: str = Path(..., description="`municipios` o `departamentos`"),
+    codigo: str = Path(..., description="Código DIVIPOLA del límite"),
+    k: int = Query(2, ge=1, le=MAX_SALTOS, description="Saltos máximos desde el límite consultado"),
+    db: Session = Depends(lambda: next(get_session(0)))
+):
+    """
+    Vecindario de hasta `k` saltos del límite dado
+
+    Un límite a 2 saltos es vecino de un vecino directo, y así sucesivamente.
+
+    **Respuesta:**
+    - `success`: Indica si la operación fue exitosa
+    - `data`: Objeto con el resultado
+      - `vecinos`: Lista ordenada por `saltos` ascendente; los vecinos
+        directos (`saltos` = 1) incluyen `longitud_frontera_km`
+    """
+    return await _vecinos(capa, codigo, k, db)
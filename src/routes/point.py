@@ -1,13 +1,47 @@
 """
 Endpoints de API para análisis de puntos
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from src.config.config import get_session
-from src.models.schemas import PointCoordinates, APIResponse
+from src.config.config import get_session, GEO_LAT_MAX, GEO_LAT_MIN, GEO_LNG_MAX, GEO_LNG_MIN
+from src.models.schemas import PointCoordinates, PointBatchCoordinates, APIResponse
 from src.services.point_service import point_service
+from src.services.proximity_service import proximity_service
+from src.services.geo_executor import geo_executor
+from src.utils.geo_ready_util import require_geo_ready
 
-router = APIRouter(prefix="/api/point", tags=["Point Analysis"])
+# Todas las rutas esperan (o rechazan con 503) hasta que el motor geográfico esté cargado
+router = APIRouter(prefix="/api/point", tags=["Point Analysis"], dependencies=[Depends(require_geo_ready)])
+
+# Máximo de puntos aceptados por /analyze-batch
+MAX_PUNTOS_LOTE = 10000
+# Máximo de municipios retornados por /nearest
+MAX_VECINOS = 50
+# Radio máximo (km) de /within
+MAX_RADIO_KM = 200
+
+
+def _validar_coordenadas(coordinates, posicion: str = "") -> None:
+    """Valida que el punto tenga [lng, lat] dentro del rango de Colombia"""
+    # Validar que haya coordenadas
+    if not coordinates or len(coordinates) != 2:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Se requieren exactamente 2 coordenadas [lng, lat] para un punto{posicion}"
+        )
+    
+    # Validar rangos de coordenadas (Colombia aproximadamente)
+    lng, lat = coordinates
+    if not (GEO_LNG_MIN <= lng <= GEO_LNG_MAX):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Longitud fuera de rango para Colombia: {lng}{posicion}"
+        )
+    if not (GEO_LAT_MIN <= lat <= GEO_LAT_MAX):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Latitud fuera de rango para Colombia: {lat}{posicion}"
+        )
 
 
 @router.post("/analyze", response_model=APIResponse)
@@ -40,28 +74,69 @@ async def analyze_point(
         - `distancia_centroide_km`: Distancia al centroide del municipio en km
     """
     try:
-        # Validar que haya coordenadas
-        if not point_data.coordinates or len(point_data.coordinates) != 2:
-            raise HTTPException(
-                status_code=400,
-                detail="Se requieren exactamente 2 coordenadas [lng, lat] para un punto"
-            )
+        _validar_coordenadas(point_data.coordinates)
+        
+        # Realizar análisis en el pool geográfico (fuera del event loop)
+        result = await geo_executor.run(point_service.analyze_point, point_data.coordinates, db)
         
-        # Validar rangos de coordenadas (Colombia aproximadamente)
-        lng, lat = point_data.coordinates
-        if not (-79 <= lng <= -66):
+        return APIResponse(
+            success=True,
+            data=result
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            error=str(e)
+        )
+
+
+@router.post("/analyze-batch", response_model=APIResponse)
+async def analyze_points(
+    batch_data: PointBatchCoordinates,
+    db: Session = Depends(lambda: next(get_session(0)))
+):
+    """
+    Analiza un lote de puntos y retorna el municipio y departamento de cada uno
+    
+    **Body esperado:**
+    ```json
+    {
+        "type": "marker",
+        "coordinates": [
+            [-74.0817, 4.6097],
+            [-75.5636, 6.2518]
+        ]
+    }
+    ```
+    
+    **Respuesta:**
+    - `success`: Indica si la operación fue exitosa
+    - `data`: Objeto con el análisis del lote
+      - `total_puntos`: Cantidad de puntos analizados
+      - `puntos`: Lista en el mismo orden de entrada, cada uno con
+        `coordenadas_punto` y `ubicacion` (misma estructura de `/api/point/analyze`)
+    """
+    try:
+        # Validar tamaño del lote
+        if not batch_data.coordinates:
             raise HTTPException(
                 status_code=400,
-                detail=f"Longitud fuera de rango para Colombia: {lng}"
+                detail="Se requiere al menos un punto [lng, lat]"
             )
-        if not (-4.5 <= lat <= 13.5):
+        if len(batch_data.coordinates) > MAX_PUNTOS_LOTE:
             raise HTTPException(
                 status_code=400,
-                detail=f"Latitud fuera de rango para Colombia: {lat}"
+                detail=f"El lote no puede superar {MAX_PUNTOS_LOTE} puntos"
             )
         
-        # Realizar análisis
-        result = point_service.analyze_point(point_data.coordinates, db)
+        for i, coordinates in enumerate(batch_data.coordinates):
+            _validar_coordenadas(coordinates, f" (punto {i})")
+        
+        # Realizar análisis en el pool geográfico (fuera del event loop)
+        result = await geo_executor.run(point_service.analyze_points, batch_data.coordinates, db)
         
         return APIResponse(
             success=True,
@@ -76,3 +151,92 @@ async def analyze_point(
             error=str(e)
         )
 
+
+@router.post("/nearest", response_model=APIResponse)
+async def nearest_municipalities(
+    point_data: PointCoordinates,
+    k: int = Query(5, ge=1, le=MAX_VECINOS, description="Cantidad de municipios a retornar"),
+    db: Session = Depends(lambda: next(get_session(0)))
+):
+    """
+    Retorna los `k` municipios cuyo centroide está más cerca del punto
+    
+    **Body esperado:**
+    ```json
+    {
+        "type": "marker",
+        "coordinates": [-74.0817, 4.6097]
+    }
+    ```
+    
+    **Respuesta:**
+    - `success`: Indica si la operación fue exitosa
+    - `data`: Objeto con el resultado
+      - `coordenadas_punto`: Coordenadas del punto consultado [lng, lat]
+      - `municipios`: Lista ordenada por `distancia_centroide_km` ascendente
+    """
+    try:
+        _validar_coordenadas(point_data.coordinates)
+        
+        # Realizar búsqueda en el pool geográfico (fuera del event loop)
+        result = await geo_executor.run(point_service.nearest_municipalities, point_data.coordinates, k, db)
+        
+        return APIResponse(
+            success=True,
+            data=result
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            error=str(e)
+        )
+
+
+@router.post("/within", response_model=APIResponse)
+async def municipalities_within(
+    point_data: PointCoordinates,
+    radio_km: float = Query(..., gt=0, le=MAX_RADIO_KM, description="Radio de búsqueda en km"),
+    db: Session = Depends(lambda: next(get_session(0)))
+):
+    """
+    Retorna los municipios a menos de `radio_km` del punto
+    
+    La distancia se mide desde el punto hasta el borde más cercano de cada
+    municipio (0 para el municipio que lo contiene).
+    
+    **Body esperado:**
+    ```json
+    {
+        "type": "marker",
+        "coordinates": [-74.0817, 4.6097]
+    }
+    ```
+    
+    **Respuesta:**
+    - `success`: Indica si la operación fue exitosa
+    - `data`: Objeto con el resultado
+      - `coordenadas_punto`: Coordenadas del punto consultado [lng, lat]
+      - `radio_km`: Radio de búsqueda
+      - `municipios`: Lista ordenada por `distancia_km` ascendente
+    """
+    try:
+        _validar_coordenadas(point_data.coordinates)
+        
+        # Realizar búsqueda en el pool geográfico (fuera del event loop)
+        result = await geo_executor.run(proximity_service.point_within, point_data.coordinates, radio_km, db)
+        
+        return APIResponse(
+            success=True,
+            data=result
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            error=str(e)
+        )
@@ -1,13 +1,19 @@
 """
 Endpoints de API para análisis de polígonos
 """
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from src.config.config import get_session
-from src.models.schemas import PolygonCoordinates, APIResponse
+from src.models.schemas import PolygonCoordinates, PolygonFeatureCollection, APIResponse
 from src.services.polygon_service import polygon_service
+from src.services.geo_executor import geo_executor
+from src.utils.geo_ready_util import require_geo_ready
 
-router = APIRouter(prefix="/api/polygon", tags=["Polygon Analysis"])
+# Todas las rutas esperan (o rechazan con 503) hasta que el motor geográfico esté cargado
+router = APIRouter(prefix="/api/polygon", tags=["Polygon Analysis"], dependencies=[Depends(require_geo_ready)])
 
 
 @router.post("/analyze", response_model=APIResponse)
@@ -57,8 +63,8 @@ async def analyze_polygon(
                 detail="El polígono debe tener al menos 2 puntos"
             )
         
-        # Realizar análisis
-        result = polygon_service.analyze_polygon(polygon_data.coordinates, db)
+        # Realizar análisis en el pool geográfico (fuera del event loop)
+        result = await geo_executor.run(polygon_service.analyze_polygon, polygon_data.coordinates, db)
         result["tipo"] = polygon_data.type
         return APIResponse(
             success=True,
@@ -73,3 +79,112 @@ async def analyze_polygon(
             error=str(e)
         )
 
+
+# Máximo de features aceptados por /analyze-batch
+MAX_POLIGONOS_LOTE = 1000
+
+
+@router.post("/analyze-batch", response_model=APIResponse)
+async def analyze_polygons(
+    collection: PolygonFeatureCollection,
+    stream: bool = Query(False, description="Responder como NDJSON, una línea por feature a medida que se completa"),
+    db: Session = Depends(lambda: next(get_session(0)))
+):
+    """
+    Analiza un lote de polígonos (FeatureCollection) contra el índice compartido
+    
+    **Body esperado:**
+    ```json
+    {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "id": "proyecto-1",
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[[-74.08, 4.60], [-74.08, 4.53], [-74.00, 4.53], [-74.08, 4.60]]]
+                }
+            }
+        ]
+    }
+    ```
+    
+    **Respuesta:**
+    - `success`: Indica si la operación fue exitosa
+    - `data`: Objeto con el análisis del lote
+      - `total_features`: Cantidad de features analizados
+      - `features`: Lista en el orden de entrada, cada uno con `indice`, `id`,
+        `success`, `data` (misma estructura de `/api/polygon/analyze`) y `error`
+    
+    Con `stream=true` la respuesta es `application/x-ndjson`: una línea JSON por
+    feature (misma estructura de cada elemento de `features`) en cuanto termina.
+    El lote toma un solo cupo del pool geográfico antes de empezar: si no hay
+    cupo la respuesta es 503, nunca un stream cortado a mitad del lote.
+    """
+    try:
+        # Validar tamaño del lote
+        if not collection.features:
+            raise HTTPException(
+                status_code=400,
+                detail="Se requiere al menos un feature de tipo Polygon"
+            )
+        if len(collection.features) > MAX_POLIGONOS_LOTE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"El lote no puede superar {MAX_POLIGONOS_LOTE} features"
+            )
+        
+        for i, feature in enumerate(collection.features):
+            if feature.geometry.type != "Polygon" or not feature.geometry.coordinates:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"El feature {i} debe tener una geometría Polygon con coordenadas"
+                )
+        
+        coordenadas = [feature.geometry.coordinates for feature in collection.features]
+        ids = [feature.id for feature in collection.features]
+        
+        if stream:
+            # El cupo del pool se toma una vez para todo el lote: si no hay, el
+            # cliente recibe 503 antes de que empiece la respuesta
+            reserva = geo_executor.reserve()
+            resultados = polygon_service.iter_polygons(coordenadas, db)
+            
+            async def ndjson():
+                # Cada resultado se calcula en el pool geográfico (fuera del event loop)
+                try:
+                    while True:
+                        try:
+                            resultado = await reserva.run(next, resultados, None)
+                        except Exception as e:
+                            # La respuesta ya comenzó: el error se informa como última línea
+                            yield json.dumps({"success": False, "error": str(e)}, ensure_ascii=False) + "\n"
+                            break
+                        if resultado is None:
+                            break
+                        resultado["id"] = ids[resultado["indice"]]
+                        yield json.dumps(resultado, ensure_ascii=False) + "\n"
+                finally:
+                    reserva.release()
+            
+            # La tarea de fondo libera el cupo aunque el cliente se desconecte antes de leer
+            return StreamingResponse(ndjson(), media_type="application/x-ndjson",
+                                     background=BackgroundTask(reserva.release))
+        
+        # Realizar análisis en el pool geográfico (fuera del event loop)
+        result = await geo_executor.run(polygon_service.analyze_polygons, coordenadas, db)
+        for resultado in result["features"]:
+            resultado["id"] = ids[resultado["indice"]]
+        return APIResponse(
+            success=True,
+            data=result
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            error=str(e)
+        )
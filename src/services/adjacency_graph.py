@@ -0,0 +1,184 @@
+"""
+Grafo de adyacencia precalculado de municipios y departamentos
+
+Dos límites son vecinos si sus geometrías se tocan (a menos de
+GEO_ADJACENCY_TOLERANCE grados, para absorber pequeñas holguras entre los
+polígonos fuente). Cada arista guarda la longitud en km del borde compartido;
+un contacto en un solo punto queda con longitud 0.
+
+El grafo se guarda en formato CSR (indptr / indices / longitudes), con los
+índices de la capa en memoria, dentro del artefacto de la capa en
+geometry_cache: un GeoJSON modificado o un cambio de formato del artefacto lo
+dejan fuera de uso y se elimina con él. Consultar vecinos o vecindarios de k
+saltos es solo lectura de arreglos, sin trabajo geométrico.
+
+Construcción fuera de línea (si falta, se construye en el primer uso):
+    python -m src.services.adjacency_graph
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+import numpy as np
+import shapely
+from src.config.config import GEO_ADJACENCY_TOLERANCE
+from src.services import geometry_cache
+from src.services.geometry_registry import BoundaryLayer, geometry_registry
+from src.utils.measurement_util import lengths_km
+
+FORMAT_VERSION = 1
+
+
+class AdjacencyGraph:
+    """Adyacencia simétrica en formato CSR sobre los índices de una capa"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, longitudes_km: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.longitudes_km = longitudes_km
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def vecinos(self, idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Índices de los vecinos de un límite y km de borde compartido con cada uno"""
+        inicio, fin = self.indptr[idx], self.indptr[idx + 1]
+        return self.indices[inicio:fin], self.longitudes_km[inicio:fin]
+
+    def k_hop(self, origenes: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Límites alcanzables desde `origenes` en 1..k saltos (búsqueda en anchura)
+
+        Returns:
+            Índices alcanzados (sin los orígenes) y el número mínimo de saltos de cada uno
+        """
+        saltos = np.full(len(self), -1, dtype=np.int32)
+        frontera = np.unique(np.asarray(origenes, dtype=np.intp))
+        saltos[frontera] = 0
+        for nivel in range(1, k + 1):
+            if len(frontera) == 0:
+                break
+            partes = [self.indices[self.indptr[i]:self.indptr[i + 1]] for i in frontera]
+            siguientes = np.unique(np.concatenate(partes)) if partes else np.empty(0, dtype=np.intp)
+            frontera = siguientes[saltos[siguientes] < 0]
+            saltos[frontera] = nivel
+        alcanzados = np.flatnonzero(saltos > 0)
+        return alcanzados, saltos[alcanzados]
+
+
+def graph_path(artifact_dir: str) -> str:
+    """Archivo del grafo para el artefacto de una capa"""
+    return geometry_cache.derived_path(artifact_dir, f"adjacency-v{FORMAT_VERSION}.npz")
+
+
+def build(layer: BoundaryLayer, tolerancia: float = GEO_ADJACENCY_TOLERANCE) -> AdjacencyGraph:
+    """
+    Calcula el grafo de una capa
+
+    Las parejas candidatas salen del STRtree de la capa; la longitud compartida
+    es la parte del borde de un límite que cae a menos de `tolerancia` del
+    borde del otro.
+    """
+    n = len(layer)
+    geoms = np.array(list(layer.geometries), dtype=object)
+    if n == 0:
+        return AdjacencyGraph(np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0))
+
+    a, b = layer.tree.query(geoms, predicate='dwithin', distance=tolerancia)
+    pares = a < b
+    a, b = a[pares], b[pares]
+    # El árbol en modo "shared" indexa envolventes: se confirma con la geometría completa
+    cerca = shapely.dwithin(geoms[a], geoms[b], tolerancia)
+    a, b = a[cerca], b[cerca]
+
+    bordes = shapely.boundary(geoms)
+    franjas = np.full(n, None, dtype=object)
+    usados = np.unique(b)
+    franjas[usados] = shapely.buffer(bordes[usados], tolerancia, quad_segs=2)
+    compartido = shapely.intersection(bordes[a], franjas[b])
+    km = lengths_km(compartido)
+
+    # Aristas en ambos sentidos, ordenadas por origen y destino
+    origen = np.concatenate([a, b])
+    destino = np.concatenate([b, a])
+    longitudes = np.concatenate([km, km])
+    orden = np.lexsort((destino, origen))
+    origen, destino, longitudes = origen[orden], destino[orden], longitudes[orden]
+    indptr = np.searchsorted(origen, np.arange(n + 1)).astype(np.int64)
+    return AdjacencyGraph(indptr, destino.astype(np.int32), longitudes.astype(np.float64))
+
+
+def save(graph: AdjacencyGraph, path: str) -> Optional[str]:
+    """Escribe el grafo de forma atómica; None si el artefacto ya no existe"""
+    if not geometry_cache.is_artifact(os.path.dirname(path)):
+        print(f"El artefacto de {path} ya no existe, no se guarda el grafo")
+        return None
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        np.savez(f, indptr=graph.indptr, indices=graph.indices, longitudes_km=graph.longitudes_km)
+    os.replace(tmp, path)
+    return path
+
+
+def load(path: str) -> AdjacencyGraph:
+    """Lee un grafo guardado con `save`"""
+    with np.load(path) as data:
+        return AdjacencyGraph(data['indptr'], data['indices'], data['longitudes_km'])
+
+
+class BoundaryAdjacency:
+    """Grafo de cada capa, abierto (o construido) una vez por versión de la capa"""
+
+    def __init__(self):
+        self._grafos: Dict[str, Tuple[BoundaryLayer, AdjacencyGraph]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, layer: BoundaryLayer) -> AdjacencyGraph:
+        """Grafo correspondiente a `layer`"""
+        actual = self._grafos.get(layer.nombre)
+        if actual is None or actual[0] is not layer:
+            with self._lock:
+                actual = self._grafos.get(layer.nombre)
+                if actual is None or actual[0] is not layer:
+                    actual = (layer, self._open(layer))
+                    self._grafos[layer.nombre] = actual
+        return actual[1]
+
+    def _open(self, layer: BoundaryLayer) -> AdjacencyGraph:
+        path = graph_path(layer.artifact_dir) if layer.artifact_dir else None
+        if path and os.path.exists(path):
+            try:
+                graph = load(path)
+                if len(graph) == len(layer):
+                    return graph
+                print(f"Grafo {path} con {len(graph)} nodos para {len(layer)} límites, se reconstruye")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error cargando el grafo {path}: {e}")
+
+        graph = build(layer)
+        if path:
+            try:
+                save(graph, path)
+            except OSError as e:
+                print(f"No se pudo guardar {path} en disco: {e}")
+        return graph
+
+
+# Instancia global de los grafos de adyacencia
+boundary_adjacency = BoundaryAdjacency()
+
+
+def main():
+    capas = geometry_registry.get()
+    for layer in (capas.municipios, capas.departamentos):
+        if not layer.artifact_dir:
+            print(f"La capa de {layer.nombre} no proviene de la caché binaria, no se guarda el grafo")
+            continue
+        graph = build(layer)
+        path = save(graph, graph_path(layer.artifact_dir))
+        if path is None:
+            continue
+        print(f"{path}: {len(graph)} límites, {len(graph.indices) // 2} pares de vecinos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+Publicación de los límites DIVIPOLA para el mapa: vector tiles y GeoJSON simplificado
+
+Ambos formatos salen de las mismas capas del registro de geometrías que usan
+los análisis. Cada respuesta se genera una sola vez por versión de los límites:
+el cuerpo se guarda ya comprimido con gzip junto a un ETag fuerte, en memoria
+(LRU) y en disco dentro del artefacto de geometry_cache de la capa (compartido
+por los workers y eliminado junto con el artefacto). Un paneo del mapa se sirve
+desde la caché sin trabajo geométrico.
+
+El directorio en disco lleva FORMAT_VERSION: al cambiar la codificación
+(mvt_util) o la simplificación se sube la versión y los tiles anteriores se
+descartan.
+
+Pregeneración de tiles (por ejemplo en el build de la imagen):
+    python -m src.services.boundary_tiles --max-zoom 8
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+import numpy as np
+import shapely
+from src.config.config import (
+    GEO_LAT_MAX, GEO_LAT_MIN, GEO_LNG_MAX, GEO_LNG_MIN, GEO_TILE_CACHE_SIZE, GEO_TILE_MAX_ZOOM,
+)
+from src.services import geometry_cache
+from src.services.geometry_registry import BoundaryLayer, geometry_registry
+from src.utils import mvt_util
+
+# Versión de los tiles y GeoJSON en disco: subirla al cambiar mvt_util o la simplificación
+FORMAT_VERSION = 1
+CAPAS = ("municipios", "departamentos")
+# Atributo con el nombre del límite en cada GeoJSON fuente
+_NOMBRE = {"municipios": "MPIO_CNMBR", "departamentos": "NOMBRE_DPT"}
+# Margen (en unidades del tile) que evita costuras al dibujar bordes
+_BUFFER = 64
+
+
+class CachedBody:
+    """Cuerpo comprimido listo para responder, con su ETag"""
+
+    def __init__(self, gz: bytes, etag: str):
+        self.gz = gz
+        self.etag = etag
+
+
+def _layer(capa: str) -> Tuple[BoundaryLayer, int]:
+    """Capa pedida y versión de los límites a la que pertenece"""
+    capas = geometry_registry.get()
+    return (capas.municipios if capa == "municipios" else capas.departamentos), capas.version
+
+
+def _atributos(layer: BoundaryLayer, capa: str, idx: int) -> Dict[str, str]:
+    return {
+        "codigo": layer.codes[idx],
+        "nombre": layer.properties[idx].get(_NOMBRE[capa]),
+    }
+
+
+def geojson_tolerance(zoom: int) -> float:
+    """Tolerancia de simplificación (grados) equivalente a ~1 píxel en el zoom dado"""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+class BoundaryTileService:
+    """Genera y cachea tiles MVT y GeoJSON simplificado de municipios y departamentos"""
+
+    def __init__(self, cache_size: int = GEO_TILE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._memoria: "OrderedDict[Tuple, CachedBody]" = OrderedDict()
+        self._podados: Set[str] = set()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ caché
+
+    def _clave(self, layer: BoundaryLayer, version: int, *partes) -> Tuple:
+        return (layer.nombre, version) + partes
+
+    def _ruta(self, layer: BoundaryLayer, nombre: str) -> Optional[str]:
+        if not layer.artifact_dir:
+            return None
+        directorio = geometry_cache.derived_path(layer.artifact_dir, f"tiles-v{FORMAT_VERSION}")
+        if layer.artifact_dir not in self._podados:
+            self._podar(layer.artifact_dir, directorio)
+        return os.path.join(directorio, nombre)
+
+    def _podar(self, artifact_dir: str, vigente: str) -> None:
+        """Elimina (una vez por artefacto) los tiles en disco de versiones de formato anteriores"""
+        with self._lock:
+            if artifact_dir in self._podados:
+                return
+            self._podados.add(artifact_dir)
+        try:
+            entradas = os.listdir(artifact_dir)
+        except OSError:
+            return
+        for entrada in entradas:
+            path = os.path.join(artifact_dir, entrada)
+            if entrada.startswith("tiles-v") and path != vigente:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _desde_memoria(self, clave: Tuple) -> Optional[CachedBody]:
+        with self._lock:
+            cuerpo = self._memoria.get(clave)
+            if cuerpo is not None:
+                self._memoria.move_to_end(clave)
+            return cuerpo
+
+    def _desde_cache(self, clave: Tuple, ruta: Optional[str]) -> Optional[CachedBody]:
+        cuerpo = self._desde_memoria(clave)
+        if cuerpo is not None:
+            return cuerpo
+        if ruta and os.path.exists(ruta):
+            try:
+                with open(ruta, 'rb') as f:
+                    cuerpo = self._cuerpo(f.read(), comprimido=True)
+            except OSError:
+                return None
+            self._guardar_memoria(clave, cuerpo)
+            return cuerpo
+        return None
+
+    def _guardar_memoria(self, clave: Tuple, cuerpo: CachedBody) -> None:
+        with self._lock:
+            self._memoria[clave] = cuerpo
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.cache_size:
+                self._memoria.popitem(last=False)
+
+    def _guardar(self, clave: Tuple, layer: BoundaryLayer, nombre: str, cuerpo: CachedBody) -> None:
+        self._guardar_memoria(clave, cuerpo)
+        ruta = self._ruta(layer, nombre)
+        # Sin el artefacto (podado por una versión más nueva) no se recrea su directorio
+        if not ruta or not geometry_cache.is_artifact(layer.artifact_dir):
+            return
+        # Escritura atómica: otro worker puede estar leyendo el mismo archivo
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            tmp = f"{ruta}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp, 'wb') as f:
+                f.write(cuerpo.gz)
+            os.replace(tmp, ruta)
+        except OSError as e:
+            print(f"No se pudo guardar {ruta} en disco: {e}")
+
+    def _cuerpo(self, data: bytes, comprimido: bool = False) -> CachedBody:
+        # mtime=0: el mismo contenido produce siempre los mismos bytes (y el mismo ETag)
+        gz = data if comprimido else gzip.compress(data, mtime=0)
+        return CachedBody(gz, '"' + hashlib.sha256(gz).hexdigest()[:32] + '"')
+
+    def memory_tile(self, capa: str, z: int, x: int, y: int) -> Optional[CachedBody]:
+        """Tile ya generado en la caché en memoria (sin E/S: apto para el event loop)"""
+        layer, version = _layer(capa)
+        return self._desde_memoria(self._clave(layer, version, 'mvt', z, x, y))
+
+    def memory_geojson(self, capa: str, zoom: int) -> Optional[CachedBody]:
+        """GeoJSON simplificado ya generado en la caché en memoria (sin E/S)"""
+        layer, version = _layer(capa)
+        return self._desde_memoria(self._clave(layer, version, 'geojson', zoom))
+
+    def cached_tile(self, capa: str, z: int, x: int, y: int) -> Optional[CachedBody]:
+        """Tile ya generado (memoria o disco), sin trabajo geométrico"""
+        layer, version = _layer(capa)
+        return self._desde_cache(self._clave(layer, version, 'mvt', z, x, y), self._ruta(layer, f"{z}/{x}/{y}.mvt.gz"))
+
+    def cached_geojson(self, capa: str, zoom: int) -> Optional[CachedBody]:
+        """GeoJSON simplificado ya generado (memoria o disco)"""
+        layer, version = _layer(capa)
+        return self._desde_cache(self._clave(layer, version, 'geojson', zoom), self._ruta(layer, f"z{zoom}.geojson.gz"))
+
+    # -------------------------------------------------------------- generación
+
+    def tile(self, capa: str, z: int, x: int, y: int) -> CachedBody:
+        """Tile MVT z/x/y de la capa (gzip), generándolo si no está en caché"""
+        cuerpo = self.cached_tile(capa, z, x, y)
+        if cuerpo is not None:
+            return cuerpo
+        layer, version = _layer(capa)
+        cuerpo = self._cuerpo(self._encode_tile(layer, capa, z, x, y))
+        self._guardar(self._clave(layer, version, 'mvt', z, x, y), layer, f"{z}/{x}/{y}.mvt.gz", cuerpo)
+        return cuerpo
+
+    def _encode_tile(self, layer: BoundaryLayer, capa: str, z: int, x: int, y: int) -> bytes:
+        minx, miny, maxx, maxy = mvt_util.tile_bounds(z, x, y)
+        margen_x = (maxx - minx) * _BUFFER / mvt_util.EXTENT
+        margen_y = (maxy - miny) * _BUFFER / mvt_util.EXTENT
+        recorte = (minx - margen_x, miny - margen_y, maxx + margen_x, maxy + margen_y)
+
+        features = []
+        for idx in layer.candidates(shapely.box(*recorte)):
+            geom = shapely.clip_by_rect(layer.geometries[idx], *recorte)
+            if geom.is_empty:
+                continue
+            geom = mvt_util.to_tile_coords(geom, z, x, y)
+            # Simplificación a ~1/4 de píxel y ajuste a la grilla entera del tile
+            geom = shapely.simplify(geom, mvt_util.EXTENT / 256 / 4, preserve_topology=True)
+            geom = shapely.set_precision(geom, 1.0)
+            if geom.is_empty:
+                continue
+            features.append((int(idx) + 1, mvt_util.polygon_commands(geom), _atributos(layer, capa, idx)))
+        return mvt_util.encode_layer(capa, features)
+
+    def geojson(self, capa: str, zoom: int) -> CachedBody:
+        """FeatureCollection de la capa simplificada para el zoom dado (gzip)"""
+        cuerpo = self.cached_geojson(capa, zoom)
+        if cuerpo is not None:
+            return cuerpo
+        layer, version = _layer(capa)
+        tolerancia = geojson_tolerance(zoom)
+        # Decimales suficientes para la tolerancia del zoom
+        decimales = min(max(int(np.ceil(-np.log10(tolerancia))) + 1, 2), 7)
+
+        features = []
+        for idx in range(len(layer)):
+            geom = shapely.simplify(layer.geometries[idx], tolerancia, preserve_topology=True)
+            geom = shapely.set_precision(geom, 10 ** -decimales)
+            if geom.is_empty:
+                continue
+            features.append({
+                "type": "Feature",
+                "id": layer.codes[idx],
+                "properties": _atributos(layer, capa, idx),
+                "geometry": json.loads(shapely.to_geojson(geom)),
+            })
+        data = json.dumps(
+            {"type": "FeatureCollection", "features": features},
+            ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+
+        cuerpo = self._cuerpo(data)
+        self._guardar(self._clave(layer, version, 'geojson', zoom), layer, f"z{zoom}.geojson.gz", cuerpo)
+        return cuerpo
+
+
+# Instancia global del servicio de tiles
+boundary_tile_service = BoundaryTileService()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pregenera los tiles de límites que cubren Colombia")
+    parser.add_argument("--max-zoom", type=int, default=8)
+    args = parser.parse_args()
+
+    for capa in CAPAS:
+        total = 0
+        for z in range(0, min(args.max_zoom, GEO_TILE_MAX_ZOOM) + 1):
+            n = 2 ** z
+            x0 = int((GEO_LNG_MIN + 180.0) / 360.0 * n)
+            x1 = int((GEO_LNG_MAX + 180.0) / 360.0 * n)
+            y0 = int((1 - math.asinh(math.tan(math.radians(GEO_LAT_MAX))) / math.pi) / 2 * n)
+            y1 = int((1 - math.asinh(math.tan(math.radians(GEO_LAT_MIN))) / math.pi) / 2 * n)
+            for x in range(x0, min(x1, n - 1) + 1):
+                for y in range(y0, min(y1, n - 1) + 1):
+                    boundary_tile_service.tile(capa, z, x, y)
+                    total += 1
+            boundary_tile_service.geojson(capa, z)
+        print(f"{capa}: {total} tiles")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Índice en memoria de centroides de municipios para búsquedas de vecino más cercano
+"""
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+import shapely
+from shapely import STRtree
+from sqlalchemy.orm import Session
+from src.services.divipola_cache import DivipolaSnapshot, divipola_cache
+from src.utils.measurement_util import distances_km, project_xy
+
+
+class _CentroidData:
+    """Centroides proyectados (metros) y atributos de los municipios indexados"""
+
+    def __init__(self, registros: List[Dict[str, Any]], version: int):
+        self.version = version
+        self.registros = registros
+        self.lnglat = np.array([[r['longitud'], r['latitud']] for r in registros], dtype=float).reshape(-1, 2)
+        x, y = project_xy(self.lnglat[:, 0], self.lnglat[:, 1])
+        self.xy = np.column_stack([x, y])
+        self.tree = STRtree(shapely.points(self.xy))
+
+
+class MunicipioCentroidIndex:
+    """
+    Árbol espacial (STRtree) sobre los centroides proyectados de los municipios
+
+    Se construye a partir de la caché DIVIPOLA y se reconstruye cuando esta
+    cambia de versión (los servicios CRUD la invalidan al escribir).
+    """
+
+    def __init__(self):
+        self._data: Optional[_CentroidData] = None
+        self._lock = threading.Lock()
+
+    def _get(self, db: Session) -> _CentroidData:
+        divipola = divipola_cache.get(db)
+        data = self._data
+        if data is None or data.version != divipola.version:
+            with self._lock:
+                if self._data is None or self._data.version != divipola.version:
+                    self._data = _CentroidData(self._registros(divipola), divipola.version)
+                data = self._data
+        return data
+
+    def _registros(self, divipola: DivipolaSnapshot) -> List[Dict[str, Any]]:
+        """Municipios con coordenadas, con los atributos de su departamento"""
+        registros = []
+        for municipio in divipola.municipios.values():
+            if municipio['latitud'] is None or municipio['longitud'] is None:
+                continue
+            departamento = divipola.departamento_de(municipio)
+            registros.append({
+                'municipio_id': municipio['id'],
+                'codigo_municipio': municipio['codigo_municipio'],
+                'nombre_municipio': municipio['nombre_municipio'],
+                'departamento_id': departamento['id'] if departamento else 0,
+                'codigo_departamento': municipio['codigo_departamento'],
+                'nombre_departamento': departamento['nombre'] if departamento else 'N/A',
+                'longitud': municipio['longitud'],
+                'latitud': municipio['latitud'],
+            })
+        return registros
+
+    def nearest(self, lng: float, lat: float, db: Session, k: int = 1) -> List[Dict[str, Any]]:
+        """
+        Los `k` municipios con centroide más cercano al punto, ordenados por distancia
+
+        Cada resultado incluye los atributos del municipio y `distancia_km`.
+        """
+        data = self._get(db)
+        total = len(data.registros)
+        if total == 0 or k < 1:
+            return []
+
+        x, y = project_xy([lng], [lat])
+        if k == 1:
+            idx = data.tree.query_nearest(shapely.points(x[0], y[0]))[:1]
+        else:
+            # Selección parcial sobre las distancias proyectadas (sin ordenar todo el arreglo)
+            d2 = (data.xy[:, 0] - x[0]) ** 2 + (data.xy[:, 1] - y[0]) ** 2
+            k = min(k, total)
+            idx = np.argpartition(d2, k - 1)[:k]
+            idx = idx[np.argsort(d2[idx])]
+
+        distancias = distances_km([lng, lat], data.lnglat[idx])
+        return [
+            dict(data.registros[i], distancia_km=float(d))
+            for i, d in zip(idx.tolist(), distancias.tolist())
+        ]
+
+
+# Instancia global del índice
+municipio_centroid_index = MunicipioCentroidIndex()
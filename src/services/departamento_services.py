@@ -5,6 +5,7 @@ from src.models.logs_model import TipoOperacionEnum
 from src.schemas.departamento_schema import DepartamentoCreate, DepartamentoUpdate, LogEntityRead
 from datetime import datetime
 from src.utils.logs_util import registrar_log, LogUtil
+from src.services.divipola_cache import divipola_cache
 
 # Servicio para listar las unidades de ejecucion
 class DepartamentoService:
@@ -43,6 +44,8 @@ class DepartamentoService:
                             activo=True, created_at=datetime.utcnow())
         self.db.add(entity)
         self.db.commit()
+        # La caché DIVIPOLA de los análisis geográficos debe reflejar el cambio
+        divipola_cache.invalidate()
         self.db.refresh(entity)
         
         # Registro de logs
@@ -105,6 +108,8 @@ class DepartamentoService:
             dataupdate.id_persona = tokenpayload.get("sub")
             dataupdate.updated_at = datetime.utcnow()
             self.db.commit()
+            # La caché DIVIPOLA de los análisis geográficos debe reflejar el cambio
+            divipola_cache.invalidate()
             self.db.refresh(dataupdate)
             
             # Registro de logs
@@ -136,6 +141,8 @@ class DepartamentoService:
         datadelete.id_persona = tokenpayload.get("sub")
         # guardar los cambios
         self.db.commit()
+        # La caché DIVIPOLA de los análisis geográficos debe reflejar el cambio
+        divipola_cache.invalidate()
         self.db.refresh(datadelete)
         
         
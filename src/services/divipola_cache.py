@@ -0,0 +1,113 @@
+"""
+Caché en memoria de los registros DIVIPOLA (municipios y departamentos)
+
+Los análisis geográficos resuelven los atributos por código contra esta caché
+en lugar de consultar la base de datos por cada feature intersectado.
+"""
+import itertools
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from src.config.config import GEO_DIVIPOLA_CHECK_SECONDS
+from src.models.divipola import Departamento, Municipio
+
+_versiones = itertools.count(1)
+
+
+class DivipolaSnapshot:
+    """Registros DIVIPOLA indexados por código, en una versión inmutable"""
+
+    def __init__(self, municipios: Dict[str, Dict[str, Any]], departamentos: Dict[str, Dict[str, Any]],
+                 marca: Optional[Tuple] = None):
+        self.version = next(_versiones)
+        self.municipios = municipios
+        self.departamentos = departamentos
+        # Marca de cambios de las tablas al momento de la carga (ver DivipolaCache._marca)
+        self.marca = marca
+
+    def departamento_de(self, municipio: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Departamento al que pertenece un municipio de la caché"""
+        return self.departamentos.get(municipio['codigo_departamento'])
+
+
+class DivipolaCache:
+    """
+    Carga en bloque (una consulta por tabla) la primera vez que se usa
+
+    Los servicios CRUD de municipios y departamentos llaman `invalidate()`
+    al escribir; la siguiente lectura recarga ambas tablas. Eso solo alcanza
+    al proceso que escribió: con varios workers, cada uno compara además cada
+    `intervalo` segundos una marca barata de las tablas (conteo, id máximo y
+    última actualización) y recarga si cambió.
+    """
+
+    def __init__(self, intervalo: float = GEO_DIVIPOLA_CHECK_SECONDS):
+        self.intervalo = intervalo
+        self._snapshot: Optional[DivipolaSnapshot] = None
+        self._revisado = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Descarta los registros cacheados"""
+        self._snapshot = None
+
+    def get(self, db: Session) -> DivipolaSnapshot:
+        """Retorna los registros cacheados, cargándolos si es necesario"""
+        snapshot = self._snapshot
+        if snapshot is None or self._vencido():
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or (self._vencido() and not self._vigente(snapshot, db)):
+                    snapshot = self._snapshot = self._load(db)
+                self._revisado = time.monotonic()
+        return snapshot
+
+    def _vencido(self) -> bool:
+        """True si ya pasó `intervalo` desde la última revisión de las tablas"""
+        return time.monotonic() - self._revisado >= self.intervalo
+
+    def _vigente(self, snapshot: DivipolaSnapshot, db: Session) -> bool:
+        """True si las tablas no cambiaron desde que se cargó `snapshot`"""
+        try:
+            return self._marca(db) == snapshot.marca
+        except Exception as e:
+            # Sin base de datos se siguen sirviendo los registros cargados
+            print(f"No se pudo revisar la marca de las tablas DIVIPOLA: {e}")
+            return True
+
+    def _marca(self, db: Session) -> Tuple:
+        """Conteo, id máximo y última actualización de departamentos y municipios"""
+        return tuple(
+            tuple(db.query(func.count(modelo.id), func.max(modelo.id), func.max(modelo.updated_at)).one())
+            for modelo in (Departamento, Municipio)
+        )
+
+    def _load(self, db: Session) -> DivipolaSnapshot:
+        """Lee todos los municipios y departamentos en bloque"""
+        marca = self._marca(db)
+        departamentos = {
+            d.codigo: {
+                'id': d.id,
+                'codigo': d.codigo,
+                'nombre': d.nombre,
+            }
+            for d in db.query(Departamento).all()
+        }
+        municipios = {
+            m.codigo_municipio: {
+                'id': m.id,
+                'codigo_municipio': m.codigo_municipio,
+                'nombre_municipio': m.nombre_municipio,
+                'codigo_departamento': m.codigo_departamento,
+                'latitud': float(m.latitud) if m.latitud is not None else None,
+                'longitud': float(m.longitud) if m.longitud is not None else None,
+            }
+            for m in db.query(Municipio).all()
+        }
+        return DivipolaSnapshot(municipios, departamentos, marca)
+
+
+# Instancia global de la caché
+divipola_cache = DivipolaCache()
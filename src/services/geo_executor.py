@@ -0,0 +1,129 @@
+"""
+Pool dedicado para los análisis geográficos
+
+Los análisis (shapely y consultas SQLAlchemy síncronas) se ejecutan en hilos
+fuera del event loop: shapely 2 libera el GIL en las operaciones GEOS, de modo
+que un polígono grande no detiene al resto de peticiones del worker.
+
+El número de análisis admitidos (en ejecución + en cola) está acotado; al
+llenarse la cola las rutas responden 503 con Retry-After en lugar de acumular
+peticiones. Las respuestas en streaming reservan su cupo una sola vez, antes de
+empezar a responder, para no quedar cortadas a mitad del lote.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from fastapi import HTTPException, status
+from src.config.config import GEO_EXECUTOR_QUEUE_SIZE, GEO_EXECUTOR_WORKERS
+
+
+class GeoExecutor:
+    """ThreadPoolExecutor con cola acotada y contadores"""
+
+    def __init__(self, workers: int = GEO_EXECUTOR_WORKERS, queue_size: int = GEO_EXECUTOR_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geo")
+        self._cupos = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        # Análisis admitidos que aún no terminan (en ejecución o en cola)
+        self.en_curso = 0
+        self.completadas = 0
+        self.rechazadas = 0
+
+    def _admitir(self) -> None:
+        """Toma un cupo (workers + cola) o responde 503"""
+        if not self._cupos.acquire(blocking=False):
+            with self._lock:
+                self.rechazadas += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="El motor geográfico está saturado, intenta de nuevo en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+        with self._lock:
+            self.en_curso += 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Ejecuta `fn(*args)` en el pool y espera su resultado sin bloquear el event loop
+
+        Raises:
+            HTTPException 503 si todos los cupos (workers + cola) están ocupados
+        """
+        self._admitir()
+        future = self._pool.submit(fn, *args)
+        # El cupo se libera cuando termina la ejecución, aunque el cliente se desconecte antes
+        future.add_done_callback(self._liberar)
+        return await asyncio.wrap_future(future)
+
+    def reserve(self) -> "GeoReservation":
+        """
+        Reserva un cupo para una secuencia de pasos (por ejemplo, una respuesta
+        en streaming) que se ejecutan uno a la vez con `GeoReservation.run`
+
+        Raises:
+            HTTPException 503 si todos los cupos están ocupados; se llama antes
+            de empezar a responder, para que el cliente reciba el 503
+        """
+        self._admitir()
+        return GeoReservation(self)
+
+    def _liberar(self, _future) -> None:
+        with self._lock:
+            self.en_curso -= 1
+            self.completadas += 1
+        self._cupos.release()
+
+    def shutdown(self) -> None:
+        """Espera a que terminen los análisis en curso y libera los hilos"""
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Ocupación del pool para monitoreo"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "cola": self.queue_size,
+                "en_curso": self.en_curso,
+                "completadas": self.completadas,
+                "rechazadas": self.rechazadas,
+            }
+
+
+class GeoReservation:
+    """Cupo del pool tomado una vez y reutilizado por cada paso de una secuencia"""
+
+    def __init__(self, executor: GeoExecutor):
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._pendiente: Optional[Future] = None
+        self._liberada = False
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Ejecuta `fn(*args)` en el pool con el cupo reservado"""
+        with self._lock:
+            if self._liberada:
+                raise RuntimeError("La reserva del pool geográfico ya fue liberada")
+            future = self._pendiente = self._executor._pool.submit(fn, *args)
+        return await asyncio.wrap_future(future)
+
+    def release(self) -> None:
+        """
+        Devuelve el cupo (idempotente); si hay un paso en ejecución, al terminar
+        ese paso
+        """
+        with self._lock:
+            if self._liberada:
+                return
+            self._liberada = True
+            pendiente = self._pendiente
+        if pendiente is not None and not pendiente.done():
+            pendiente.add_done_callback(self._executor._liberar)
+        else:
+            self._executor._liberar(None)
+
+
+# Instancia global del pool
+geo_executor = GeoExecutor()
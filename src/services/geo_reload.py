@@ -0,0 +1,147 @@
+"""
+Recarga en caliente de los límites DIVIPOLA
+
+Cuando IGAC/DANE publican límites actualizados basta con reemplazar los
+GeoJSON en DATA_DIR: un hilo vigila los archivos (cada GEO_RELOAD_WATCH_SECONDS)
+y, también bajo demanda desde POST /api/geo/reload, construye en segundo plano
+la versión nueva del registro y la publica de forma atómica. Las peticiones en
+curso terminan con la versión que ya tenían; las cachés de resultados y de
+tiles quedan invalidadas porque dependen de la versión del registro.
+
+Cada worker vigila los archivos por su cuenta, de modo que un solo reemplazo
+recarga todos los procesos sin reiniciarlos.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+from src.config.config import (
+    DATA_DIR, DEPARTAMENTOS_GEOJSON, GEO_ENGINE, GEO_RELOAD_WATCH_SECONDS, MUNICIPIOS_GEOJSON, sessions,
+)
+from src.services.geometry_registry import geometry_registry
+from src.services.lookup_grid import municipio_lookup_grid
+from src.services.postgis_engine import POSTGIS, postgis_engine
+
+INACTIVO = "inactivo"
+RECARGANDO = "recargando"
+LISTO = "listo"
+ERROR = "error"
+
+
+def _firma_archivos() -> Tuple:
+    """(mtime, tamaño) de cada GeoJSON de límites; None si falta"""
+    firmas = []
+    for filename in (MUNICIPIOS_GEOJSON, DEPARTAMENTOS_GEOJSON):
+        try:
+            info = os.stat(os.path.join(DATA_DIR, filename))
+            firmas.append((info.st_mtime_ns, info.st_size))
+        except OSError:
+            firmas.append(None)
+    return tuple(firmas)
+
+
+class GeoReloader:
+    """Recargas del registro de geometrías (manuales o por cambio de archivos)"""
+
+    def __init__(self, intervalo: float = GEO_RELOAD_WATCH_SECONDS):
+        self.intervalo = intervalo
+        self.estado = INACTIVO
+        self.motivo: Optional[str] = None
+        self.error: Optional[str] = None
+        self.duracion_s: Optional[float] = None
+        self.fecha: Optional[str] = None
+        self.recargas = 0
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._vigilante: Optional[threading.Thread] = None
+
+    def start(self, motivo: str) -> bool:
+        """Lanza una recarga en segundo plano; False si ya hay una en curso"""
+        with self._lock:
+            if self.estado == RECARGANDO:
+                return False
+            self.estado = RECARGANDO
+            self.motivo = motivo
+        threading.Thread(target=self._run, name="geo-reload", daemon=True).start()
+        return True
+
+    def _run(self) -> None:
+        inicio = time.perf_counter()
+        try:
+            capas = geometry_registry.reload()
+        except Exception as e:
+            self._terminar(ERROR, inicio, str(e))
+            print(f"Error recargando los límites: {e}")
+            return
+
+        # Se precargan los índices derivados para que la primera petición no los pague
+        try:
+            municipio_lookup_grid.get(capas.municipios)
+            if GEO_ENGINE == POSTGIS:
+                db = sessions[0]()
+                try:
+                    postgis_engine.ensure_loaded(db, capas)
+                finally:
+                    db.close()
+        except Exception as e:
+            print(f"Índices derivados no precargados tras la recarga: {e}")
+
+        self._terminar(LISTO, inicio, None)
+        print(f"Límites recargados ({self.motivo}) en {self.duracion_s} s: versión {capas.version}, "
+              f"{len(capas.municipios)} municipios, {len(capas.departamentos)} departamentos")
+
+    def _terminar(self, estado: str, inicio: float, error: Optional[str]) -> None:
+        with self._lock:
+            self.estado = estado
+            self.error = error
+            self.duracion_s = round(time.perf_counter() - inicio, 3)
+            self.fecha = datetime.now(timezone.utc).isoformat()
+            if estado == LISTO:
+                self.recargas += 1
+
+    # ------------------------------------------------------------- vigilancia
+
+    def watch(self) -> None:
+        """Inicia el hilo que vigila los GeoJSON (idempotente; no hace nada si el intervalo es 0)"""
+        if self.intervalo <= 0 or self._vigilante is not None:
+            return
+        self._vigilante = threading.Thread(target=self._vigilar, name="geo-reload-watch", daemon=True)
+        self._vigilante.start()
+
+    def stop(self) -> None:
+        """Detiene la vigilancia de archivos"""
+        self._detener.set()
+
+    def _vigilar(self) -> None:
+        vigente = _firma_archivos()
+        pendiente = None
+        while not self._detener.wait(self.intervalo):
+            firma = _firma_archivos()
+            if firma == vigente or None in firma:
+                pendiente = None
+                continue
+            # Se espera una revisión sin cambios: el archivo puede estar copiándose
+            if firma != pendiente:
+                pendiente = firma
+                continue
+            if self.start("archivos modificados"):
+                vigente, pendiente = firma, None
+
+    def status(self) -> Dict[str, Any]:
+        """Resumen de la última recarga y de la versión publicada"""
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "motivo": self.motivo,
+                "version": geometry_registry.version,
+                "recargas": self.recargas,
+                "duracion_s": self.duracion_s,
+                "fecha": self.fecha,
+                "error": self.error,
+                "vigilancia_s": self.intervalo,
+            }
+
+
+# Instancia global de recargas
+geo_reloader = GeoReloader()
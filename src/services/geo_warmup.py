@@ -0,0 +1,121 @@
+"""
+Calentamiento en segundo plano del motor geográfico
+
+Al iniciar la aplicación se cargan los límites, sus índices y la caché DIVIPOLA
+en un hilo aparte, para que el arranque no bloquee el event loop ni la primera
+petición pague la carga.
+
+Si la carga falla (por ejemplo, un GeoJSON ilegible durante un despliegue), la
+siguiente petición geográfica la reintenta, con una espera que se duplica en
+cada fallo hasta MAX_ESPERA_REINTENTO_S.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+from src.config.config import GEO_ENGINE, GEO_WARMUP_RETRY_SECONDS, sessions
+from src.services.divipola_cache import divipola_cache
+from src.services.geometry_registry import geometry_registry
+from src.services.postgis_engine import POSTGIS, postgis_engine
+
+PENDIENTE = "pendiente"
+CARGANDO = "cargando"
+LISTO = "listo"
+ERROR = "error"
+
+# Espera máxima (segundos) entre reintentos de un calentamiento fallido
+MAX_ESPERA_REINTENTO_S = 300.0
+
+
+class GeoWarmup:
+    """Estado de carga del motor geográfico"""
+
+    def __init__(self, espera_reintento: float = GEO_WARMUP_RETRY_SECONDS):
+        self.estado = PENDIENTE
+        self.error: Optional[str] = None
+        self.duracion_s: Optional[float] = None
+        self.intentos = 0
+        self.espera_reintento = espera_reintento
+        self._reintento_en = 0.0
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self) -> None:
+        """
+        Lanza la carga en un hilo daemon (idempotente)
+
+        Tras un fallo la relanza solo cuando venció la espera de reintento.
+        """
+        with self._lock:
+            if self.estado == ERROR and time.monotonic() < self._reintento_en:
+                return
+            if self.estado not in (PENDIENTE, ERROR):
+                return
+            self.estado = CARGANDO
+            self.intentos += 1
+        threading.Thread(target=self._run, name="geo-warmup", daemon=True).start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Bloquea hasta que el motor esté listo; retorna si lo está"""
+        return self._ready.wait(timeout)
+
+    def _run(self) -> None:
+        inicio = time.perf_counter()
+        try:
+            capas = geometry_registry.get()
+        except Exception as e:
+            espera = min(self.espera_reintento * 2 ** (self.intentos - 1), MAX_ESPERA_REINTENTO_S)
+            with self._lock:
+                self.error = str(e)
+                self._reintento_en = time.monotonic() + espera
+                self.estado = ERROR
+            print(f"Error cargando el motor geográfico (intento {self.intentos}, "
+                  f"se reintenta en {espera:.0f} s): {e}")
+            return
+
+        # La caché DIVIPOLA es opcional en el arranque: si la BD no responde se
+        # carga en la primera petición
+        db = sessions[0]()
+        try:
+            divipola_cache.get(db)
+        except Exception as e:
+            print(f"Caché DIVIPOLA no precargada: {e}")
+        finally:
+            db.close()
+
+        # Con el motor PostGIS se verifica (o carga) la copia de los límites en la base
+        if GEO_ENGINE == POSTGIS:
+            db = sessions[0]()
+            try:
+                postgis_engine.ensure_loaded(db, capas)
+            except Exception as e:
+                print(f"Límites no sincronizados con PostGIS: {e}")
+            finally:
+                db.close()
+
+        self.duracion_s = round(time.perf_counter() - inicio, 3)
+        self.error = None
+        self.estado = LISTO
+        self._ready.set()
+        print(f"Motor geográfico listo en {self.duracion_s} s "
+              f"({len(capas.municipios)} municipios, {len(capas.departamentos)} departamentos)")
+
+    def status(self) -> Dict[str, Any]:
+        """Resumen del estado para el endpoint de readiness"""
+        return {
+            "ready": self.is_ready,
+            "estado": self.estado,
+            "duracion_s": self.duracion_s,
+            "error": self.error,
+            "intentos": self.intentos,
+            "reintento_s": (
+                round(max(self._reintento_en - time.monotonic(), 0.0), 1) if self.estado == ERROR else None
+            ),
+        }
+
+
+# Instancia global del calentamiento
+geo_warmup = GeoWarmup()
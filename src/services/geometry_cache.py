@@ -0,0 +1,289 @@
+"""
+Caché binaria precompilada de límites DIVIPOLA
+
+Convierte cada GeoJSON de límites en un artefacto compacto que los workers
+abren con mmap al iniciar, sin parsear JSON:
+
+    <GEO_CACHE_DIR>/<nombre>-<sha256 del fuente>-v<formato>/
+        wkb.npy         bytes WKB de todas las geometrías concatenados (uint8)
+        offsets.npy     desplazamiento de cada geometría dentro de wkb.npy (int64, N + 1)
+        bbox.npy        envolvente [minx, miny, maxx, maxy] de cada geometría (float64, N x 4)
+        properties.json atributos de cada feature
+        meta.json       archivo fuente, hash, cantidad de features y diagnóstico de validación
+        ...             cachés derivadas de estas geometrías (ver derived_path)
+
+Cada feature se valida al construir el artefacto: las geometrías inválidas se
+reparan con make_valid (conservando solo la parte poligonal) y las que no se
+pueden leer ni reparar quedan en cuarentena, fuera del artefacto. Los análisis
+trabajan así sobre un arreglo de geometrías válidas.
+
+El nombre del directorio incluye el hash del contenido del GeoJSON, así que un
+archivo fuente modificado produce un artefacto nuevo de forma automática.
+
+Construcción manual (por ejemplo en el build de la imagen):
+    python -m src.services.geometry_cache
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, shape
+from shapely.geometry.base import BaseGeometry
+from src.config.config import DATA_DIR, DEPARTAMENTOS_GEOJSON, GEO_CACHE_DIR, MUNICIPIOS_GEOJSON
+
+FORMAT_VERSION = 2
+
+_POLIGONALES = ('Polygon', 'MultiPolygon')
+# Cachés derivadas guardadas antes en la raíz de GEO_CACHE_DIR, fuera del artefacto
+_DERIVADOS_ANTERIORES = re.compile(r'^[a-z]+-(grid|adjacency|tiles)-')
+
+
+class CachedLayer:
+    """Contenido de un artefacto: arreglos (posiblemente mapeados en memoria) y atributos"""
+
+    def __init__(self, path: str, wkb: np.ndarray, offsets: np.ndarray, bbox: np.ndarray,
+                 properties: List[Dict[str, Any]], meta: Dict[str, Any]):
+        self.path = path
+        self.wkb = wkb
+        self.offsets = offsets
+        self.bbox = bbox
+        self.properties = properties
+        self.meta = meta
+
+    def __len__(self) -> int:
+        return len(self.properties)
+
+    def geometries(self, indices=None) -> np.ndarray:
+        """Decodifica las geometrías WKB (todas o solo los índices dados)"""
+        if indices is None:
+            indices = range(len(self))
+        blobs = np.array(
+            [self.wkb[self.offsets[i]:self.offsets[i + 1]].tobytes() for i in indices],
+            dtype=object
+        )
+        return shapely.from_wkb(blobs)
+
+
+def poligonal(geom: BaseGeometry) -> BaseGeometry:
+    """Parte poligonal de una geometría (make_valid puede dejar líneas o puntos sueltos)"""
+    partes = [p for p in shapely.get_parts(geom) if p.geom_type in _POLIGONALES]
+    partes = [q for p in partes for q in shapely.get_parts(p)]
+    if not partes:
+        return Polygon()
+    return partes[0] if len(partes) == 1 else shapely.multipolygons(partes)
+
+
+def parse_features(features: List[Dict[str, Any]],
+                   source: str) -> Tuple[List[BaseGeometry], List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """
+    Convierte y valida los features de un GeoJSON de límites
+
+    Returns:
+        Geometrías válidas, sus propiedades y el diagnóstico
+        {'reparados': [...], 'cuarentena': [...]}, con el índice del feature
+        en el archivo, sus propiedades y el motivo
+    """
+    geometries, properties = [], []
+    diagnostico: Dict[str, List[Dict[str, Any]]] = {'reparados': [], 'cuarentena': []}
+
+    def _registrar(tipo: str, indice: int, props: Dict[str, Any], motivo: str) -> None:
+        diagnostico[tipo].append({'indice': indice, 'propiedades': props, 'motivo': motivo})
+
+    for indice, feature in enumerate(features):
+        props = (feature.get('properties') if isinstance(feature, dict) else None) or {}
+        if not isinstance(feature, dict) or not feature.get('geometry'):
+            _registrar('cuarentena', indice, props, "Feature sin geometría")
+            continue
+        try:
+            geom = shape(feature['geometry'])
+        except Exception as e:
+            _registrar('cuarentena', indice, props, f"Geometría ilegible: {e}")
+            continue
+        if geom.geom_type not in _POLIGONALES:
+            _registrar('cuarentena', indice, props, f"Geometría no poligonal: {geom.geom_type}")
+            continue
+        if geom.is_empty:
+            _registrar('cuarentena', indice, props, "Geometría vacía")
+            continue
+        if not geom.is_valid:
+            motivo = shapely.is_valid_reason(geom)
+            try:
+                geom = poligonal(shapely.make_valid(geom))
+            except Exception as e:
+                geom, motivo = Polygon(), f"{motivo} ({e})"
+            if geom.is_empty or not geom.is_valid:
+                _registrar('cuarentena', indice, props, f"Geometría irreparable: {motivo}")
+                continue
+            _registrar('reparados', indice, props, motivo)
+        geometries.append(geom)
+        properties.append(props)
+
+    for entrada in diagnostico['cuarentena']:
+        print(f"Feature {entrada['indice']} de {source} en cuarentena: {entrada['motivo']}")
+    if diagnostico['reparados']:
+        print(f"{len(diagnostico['reparados'])} features de {source} reparados con make_valid")
+    return geometries, properties, diagnostico
+
+
+def source_hash(source_path: str) -> str:
+    """SHA-256 del contenido del archivo fuente"""
+    digest = hashlib.sha256()
+    with open(source_path, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def artifact_path(source_path: str, sha: str) -> str:
+    """Directorio del artefacto correspondiente a un contenido del archivo fuente"""
+    nombre = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(GEO_CACHE_DIR, f"{nombre}-{sha[:16]}-v{FORMAT_VERSION}")
+
+
+def is_artifact(path: str) -> bool:
+    """
+    Si el directorio contiene un artefacto completo
+
+    meta.json se escribe último y se publica con el rename del directorio: un
+    directorio sin él (a medias o recreado por el escritor de una caché
+    derivada tras la poda) no es un artefacto.
+    """
+    return os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+def derived_path(artifact_dir: str, nombre: str) -> str:
+    """
+    Ruta de una caché derivada de las geometrías (grilla, grafo de adyacencia, tiles)
+
+    Se guarda dentro del directorio del artefacto: guarda índices de sus
+    geometrías, así que queda ligada a su contenido (hash del fuente y
+    FORMAT_VERSION) y se elimina junto con él. Los escritores no crean el
+    directorio del artefacto: si ya fue podado, la caché no se guarda.
+    """
+    return os.path.join(artifact_dir, nombre)
+
+
+def build(source_path: str, sha: Optional[str] = None) -> str:
+    """Construye el artefacto binario de un GeoJSON y retorna su directorio"""
+    sha = sha or source_hash(source_path)
+    destino = artifact_path(source_path, sha)
+    if is_artifact(destino):
+        return destino
+
+    with open(source_path, 'r', encoding='utf-8') as f:
+        geojson = json.load(f)
+
+    geometries, properties, diagnostico = parse_features(geojson.get('features', []), source_path)
+
+    blobs = shapely.to_wkb(np.array(geometries, dtype=object)) if geometries else np.array([], dtype=object)
+    sizes = np.array([len(b) for b in blobs], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    wkb = np.frombuffer(b''.join(blobs), dtype=np.uint8)
+    bbox = shapely.bounds(np.array(geometries, dtype=object)).reshape(-1, 4)
+
+    # Se escribe en un directorio temporal y se renombra: los lectores nunca ven un artefacto a medias
+    os.makedirs(GEO_CACHE_DIR, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=GEO_CACHE_DIR, prefix='.tmp-')
+    os.chmod(tmp, 0o755)
+    try:
+        np.save(os.path.join(tmp, 'wkb.npy'), wkb)
+        np.save(os.path.join(tmp, 'offsets.npy'), offsets)
+        np.save(os.path.join(tmp, 'bbox.npy'), bbox)
+        with open(os.path.join(tmp, 'properties.json'), 'w', encoding='utf-8') as f:
+            json.dump(properties, f, ensure_ascii=False)
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'source': os.path.basename(source_path),
+                'sha256': sha,
+                'features': len(properties),
+                'format': FORMAT_VERSION,
+                'reparados': diagnostico['reparados'],
+                'cuarentena': diagnostico['cuarentena'],
+            }, f)
+        # Un directorio sin meta.json en el destino es basura e impediría el rename
+        if os.path.isdir(destino) and not is_artifact(destino):
+            shutil.rmtree(destino, ignore_errors=True)
+        os.replace(tmp, destino)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        # Otro worker pudo publicar el mismo artefacto en paralelo
+        if not is_artifact(destino):
+            raise
+    _prune(source_path, destino)
+    return destino
+
+
+def _prune(source_path: str, vigente: str) -> None:
+    """
+    Elimina artefactos de versiones anteriores del mismo archivo fuente (con
+    sus cachés derivadas), los directorios sin meta.json y las cachés
+    derivadas del formato anterior que quedaron en la raíz de GEO_CACHE_DIR
+    """
+    nombre = os.path.splitext(os.path.basename(source_path))[0]
+    try:
+        entradas = os.listdir(GEO_CACHE_DIR)
+    except OSError:
+        return
+    for entrada in entradas:
+        path = os.path.join(GEO_CACHE_DIR, entrada)
+        if path == vigente or not (entrada.startswith(f"{nombre}-") or _DERIVADOS_ANTERIORES.match(entrada)):
+            continue
+        # Los procesos que aún los tengan mapeados conservan acceso a los datos
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def open_artifact(path: str) -> CachedLayer:
+    """Abre un artefacto con los arreglos mapeados en memoria (solo lectura)"""
+    with open(os.path.join(path, 'properties.json'), 'r', encoding='utf-8') as f:
+        properties = json.load(f)
+    with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    return CachedLayer(
+        path,
+        np.load(os.path.join(path, 'wkb.npy'), mmap_mode='r'),
+        np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r'),
+        np.load(os.path.join(path, 'bbox.npy'), mmap_mode='r'),
+        properties,
+        meta,
+    )
+
+
+def load(source_path: str) -> Tuple[CachedLayer, bool]:
+    """
+    Abre el artefacto vigente para `source_path`, construyéndolo si no existe
+
+    Retorna el artefacto y si fue necesario construirlo.
+    """
+    sha = source_hash(source_path)
+    path = artifact_path(source_path, sha)
+    construido = False
+    if not is_artifact(path):
+        build(source_path, sha)
+        construido = True
+    else:
+        _prune(source_path, path)
+    return open_artifact(path), construido
+
+
+def main():
+    for filename in (MUNICIPIOS_GEOJSON, DEPARTAMENTOS_GEOJSON):
+        source = os.path.join(DATA_DIR, filename)
+        if not os.path.exists(source):
+            print(f"No existe {source}, se omite")
+            continue
+        print(f"{source} -> {build(source)}")
+
+
+if __name__ == '__main__':
+    main()
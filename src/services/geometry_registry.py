@@ -0,0 +1,451 @@
+"""
+Registro compartido de geometrías DIVIPOLA (municipios y departamentos)
+
+Los límites se cargan una sola vez por proceso desde la caché binaria
+precompilada (ver geometry_cache); PointService, LineService y
+PolygonAnalysisService consultan la misma instancia.
+
+Cada carga produce un GeometrySnapshot inmutable. Una recarga construye la
+versión nueva aparte y la publica con una sola asignación: cada análisis toma
+el snapshot una vez al comenzar y termina con esa versión aunque se publique
+otra mientras tanto.
+"""
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry.base import BaseGeometry
+from src.config.config import (
+    DATA_DIR, MUNICIPIOS_GEOJSON, DEPARTAMENTOS_GEOJSON,
+    GEO_GEOMETRY_MODE, GEO_SHARED_DECODE_CACHE, GEO_TIER_COARSE_TOLERANCE, GEO_TIER_MEDIUM_TOLERANCE,
+)
+from src.services import geometry_cache
+from src.utils.measurement_util import areas_km2
+
+_versiones = itertools.count(1)
+
+
+class BoundaryLayer:
+    """Capa de límites: geometrías Shapely con su código DIVIPOLA y atributos"""
+
+    def __init__(self, nombre: str, codes: List[str], geometries: List[BaseGeometry],
+                 properties: List[Dict[str, Any]], source_sha: Optional[str] = None,
+                 diagnostico: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 artifact_dir: Optional[str] = None):
+        self.nombre = nombre
+        # Hash del GeoJSON de origen (None si no se cargó desde la caché binaria)
+        self.source_sha = source_sha
+        # Directorio del artefacto binario, donde se guardan las cachés derivadas (None sin caché binaria)
+        self.artifact_dir = artifact_dir
+        # Features reparados y en cuarentena durante la validación de carga
+        self.diagnostico = diagnostico or {'reparados': [], 'cuarentena': []}
+        self.codes = codes
+        self.geometries = np.array(geometries, dtype=object)
+        self.properties = properties
+        # Geometrías preparadas durante toda la vida de la capa: los predicados
+        # (intersects/contains) invocados sobre ellas reutilizan su índice interno
+        shapely.prepare(self.geometries)
+        # Índice espacial por envolvente (bounding box) de cada geometría
+        self.tree = STRtree(self.geometries)
+        self.bounds = shapely.bounds(self.geometries).reshape(-1, 4)
+        # Áreas completas precalculadas (grados² para porcentajes, km² para reportes)
+        self.areas = shapely.area(self.geometries)
+        self.areas_km2 = areas_km2(self.geometries)
+        self._build_tiers(GEO_TIER_COARSE_TOLERANCE, GEO_TIER_MEDIUM_TOLERANCE)
+
+    def _build_tiers(self, coarse_tol: float, medium_tol: float) -> None:
+        """
+        Niveles de resolución de cada límite:
+
+        - tier_coarse: simplificación gruesa ampliada, contiene al límite (descarte rápido)
+        - tier_medium: simplificación que preserva topología
+        - tier_outer / tier_inner: franja alrededor del borde a partir del nivel medio;
+          tier_outer contiene al límite y tier_inner está contenido en él
+
+        Cada nivel se verifica de forma exacta contra la geometría completa; si
+        la simplificación se desvía más de lo previsto, el nivel se reemplaza por
+        la geometría completa (outer) o por una geometría vacía (inner), de modo
+        que los atajos nunca cambian el resultado.
+        """
+        g = self.geometries
+        vacia = shapely.from_wkt("POLYGON EMPTY")
+
+        coarse = shapely.buffer(shapely.simplify(g, coarse_tol, preserve_topology=True), 2 * coarse_tol, quad_segs=2)
+        self.tier_coarse = np.where(shapely.covers(coarse, g), coarse, g)
+
+        self.tier_medium = shapely.simplify(g, medium_tol, preserve_topology=True)
+        outer = shapely.buffer(self.tier_medium, 2 * medium_tol, quad_segs=2)
+        self.tier_outer = np.where(shapely.covers(outer, g), outer, g)
+        inner = shapely.buffer(self.tier_medium, -2 * medium_tol, quad_segs=2)
+        self.tier_inner = np.where(shapely.covers(g, inner), inner, vacia)
+
+        for tier in (self.tier_coarse, self.tier_outer, self.tier_inner):
+            shapely.prepare(tier)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def intersects(self, idx: int, geom: BaseGeometry) -> bool:
+        """`límite.intersects(geom)` exacto, usando la resolución completa solo cerca del borde"""
+        if not self.tier_coarse[idx].intersects(geom):
+            return False
+        if self.tier_inner[idx].intersects(geom):
+            return True
+        if not self.tier_outer[idx].intersects(geom):
+            return False
+        return self.geometries[idx].intersects(geom)
+
+    def contains(self, idx: int, geom: BaseGeometry) -> bool:
+        """`límite.contains(geom)` exacto, usando la resolución completa solo cerca del borde"""
+        if not self.tier_coarse[idx].contains(geom):
+            return False
+        if self.tier_inner[idx].contains(geom):
+            return True
+        if not self.tier_outer[idx].contains(geom):
+            return False
+        return self.geometries[idx].contains(geom)
+
+    def within(self, idx: int, geom: BaseGeometry) -> bool:
+        """`geom.contains(límite)` exacto: el límite completo queda dentro de `geom`"""
+        if geom.contains(self.tier_coarse[idx]):
+            return True
+        inner = self.tier_inner[idx]
+        if not inner.is_empty and not geom.covers(inner):
+            return False
+        return geom.contains(self.geometries[idx])
+
+    def query(self, geoms: np.ndarray, predicate: str = 'intersects') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pares (índice en `geoms`, índice en la capa) que cumplen el predicado,
+        con `predicate` 'intersects' o 'within' (geometría dentro del límite)
+
+        Consulta el índice por envolvente y evalúa el predicado sobre las
+        geometrías de la capa, de modo que funciona igual con capas cuyo
+        índice se construyó solo con las envolventes.
+        """
+        geom_idx, layer_idx = self.tree.query(geoms)
+        if len(geom_idx) == 0:
+            return geom_idx, layer_idx
+        cumple = self.matches(layer_idx, np.asarray(geoms, dtype=object)[geom_idx], predicate)
+        return geom_idx[cumple], layer_idx[cumple]
+
+    def matches(self, layer_idx: np.ndarray, geoms: np.ndarray, predicate: str = 'intersects') -> np.ndarray:
+        """
+        Versión vectorizada de `intersects` / `contains` ('within') sobre pares
+        (límite `layer_idx[i]`, `geoms[i]`), con los mismos atajos por niveles
+        """
+        operacion = shapely.contains if predicate == 'within' else shapely.intersects
+        cumple = operacion(self.tier_coarse[layer_idx], geoms)
+        pendientes = np.flatnonzero(cumple)
+        aceptados = operacion(self.tier_inner[layer_idx[pendientes]], geoms[pendientes])
+        pendientes = pendientes[~aceptados]
+        cerca = operacion(self.tier_outer[layer_idx[pendientes]], geoms[pendientes])
+        cumple[pendientes[~cerca]] = False
+        pendientes = pendientes[cerca]
+        cumple[pendientes] = operacion(self.geometries[layer_idx[pendientes]], geoms[pendientes])
+        return cumple
+
+    def candidates(self, geom: BaseGeometry) -> np.ndarray:
+        """
+        Índices de las geometrías cuya envolvente intersecta a `geom`,
+        en el orden del archivo fuente
+        """
+        return np.sort(self.tree.query(geom))
+
+    def items(self) -> Iterator[Tuple[str, BaseGeometry]]:
+        """Itera pares (código, geometría) en el orden del archivo fuente"""
+        return zip(self.codes, self.geometries)
+
+
+class _LazyGeometries:
+    """
+    Geometrías decodificadas bajo demanda desde el WKB mapeado en memoria
+
+    Solo se mantienen decodificadas (y preparadas) las `capacity` usadas más
+    recientemente; el WKB lo comparten todos los procesos a través del caché
+    de páginas del sistema operativo.
+    """
+
+    def __init__(self, artefacto: geometry_cache.CachedLayer, capacity: int):
+        self._artefacto = artefacto
+        self._capacity = capacity
+        self._decoded: "OrderedDict[int, BaseGeometry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._artefacto)
+
+    def __iter__(self) -> Iterator[BaseGeometry]:
+        return (self._get(i) for i in range(len(self)))
+
+    def __getitem__(self, key):
+        if np.ndim(key) == 0:
+            return self._get(int(key))
+        return np.array([self._get(int(i)) for i in np.asarray(key).ravel()], dtype=object)
+
+    def _get(self, idx: int) -> BaseGeometry:
+        with self._lock:
+            geom = self._decoded.get(idx)
+            if geom is not None:
+                self._decoded.move_to_end(idx)
+                return geom
+        geom = self._artefacto.geometries([idx])[0]
+        shapely.prepare(geom)
+        with self._lock:
+            self._decoded[idx] = geom
+            while len(self._decoded) > self._capacity:
+                self._decoded.popitem(last=False)
+        return geom
+
+
+class _EmptyGeometries:
+    """Nivel interior vacío para todas las geometrías (ningún atajo de aceptación)"""
+
+    _vacia = shapely.from_wkt("POLYGON EMPTY")
+
+    def __getitem__(self, key):
+        if np.ndim(key) == 0:
+            return self._vacia
+        return np.full(np.size(key), self._vacia, dtype=object)
+
+
+class _LazyMeasures:
+    """
+    Medida (área) de cada geometría calculada la primera vez que se pide
+
+    `measure` es una función vectorizada sobre arreglos de geometrías; acepta
+    un índice o un arreglo de índices, y mide de una vez los que faltan.
+    """
+
+    def __init__(self, geometries: _LazyGeometries, measure):
+        self._geometries = geometries
+        self._measure = measure
+        self._values = np.full(len(geometries), np.nan)
+
+    def __getitem__(self, idx):
+        indices = np.atleast_1d(np.asarray(idx, dtype=np.intp))
+        faltan = indices[np.isnan(self._values[indices])]
+        if len(faltan):
+            self._values[faltan] = self._measure(self._geometries[faltan])
+        if np.ndim(idx) == 0:
+            return float(self._values[indices[0]])
+        return self._values[indices]
+
+
+class SharedBoundaryLayer(BoundaryLayer):
+    """
+    Capa de límites sobre el artefacto binario mapeado en memoria (modo compartido)
+
+    Con varios workers de uvicorn, cada proceso abre el mismo artefacto en solo
+    lectura: el índice se construye con las envolventes (bbox.npy) y las
+    geometrías se decodifican desde wkb.npy solo cuando un análisis las toca.
+    No se construyen niveles simplificados: el nivel grueso y el exterior son
+    la geometría completa y el interior está vacío, lo que conserva resultados
+    exactos a cambio de evaluar siempre la resolución completa.
+    """
+
+    def __init__(self, nombre: str, codes: List[str], artefacto: geometry_cache.CachedLayer,
+                 diagnostico: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 capacity: int = GEO_SHARED_DECODE_CACHE):
+        self.nombre = nombre
+        self.source_sha = artefacto.meta.get('sha256')
+        self.artifact_dir = artefacto.path
+        self.diagnostico = diagnostico or {'reparados': [], 'cuarentena': []}
+        self.codes = codes
+        self.properties = artefacto.properties
+        self.geometries = _LazyGeometries(artefacto, capacity)
+        self.bounds = artefacto.bbox
+        self.tree = STRtree(shapely.box(*np.asarray(artefacto.bbox).reshape(-1, 4).T))
+        self.areas = _LazyMeasures(self.geometries, shapely.area)
+        self.areas_km2 = _LazyMeasures(self.geometries, areas_km2)
+        self.tier_coarse = self.tier_outer = self.geometries
+        self.tier_inner = _EmptyGeometries()
+
+    def matches(self, layer_idx: np.ndarray, geoms: np.ndarray, predicate: str = 'intersects') -> np.ndarray:
+        operacion = shapely.contains if predicate == 'within' else shapely.intersects
+        return operacion(self.geometries[layer_idx], geoms)
+
+    def intersects(self, idx: int, geom: BaseGeometry) -> bool:
+        return self.geometries[idx].intersects(geom)
+
+    def contains(self, idx: int, geom: BaseGeometry) -> bool:
+        return self.geometries[idx].contains(geom)
+
+    def within(self, idx: int, geom: BaseGeometry) -> bool:
+        return geom.contains(self.geometries[idx])
+
+
+class GeometrySnapshot:
+    """Vista consistente de las capas de municipios y departamentos"""
+
+    def __init__(self, municipios: BoundaryLayer, departamentos: BoundaryLayer):
+        self.version = next(_versiones)
+        self.municipios = municipios
+        self.departamentos = departamentos
+
+        # Municipios agrupados por departamento según el prefijo del código DIVIPOLA
+        grupos: Dict[str, List[int]] = {}
+        for idx, codigo in enumerate(municipios.codes):
+            grupos.setdefault(str(codigo)[:2], []).append(idx)
+        self.municipios_por_departamento = {
+            codigo: np.array(indices, dtype=np.intp) for codigo, indices in grupos.items()
+        }
+        # Municipios cuyo departamento no está en la capa: siempre se evalúan
+        self._municipios_sin_departamento = np.array(
+            [i for codigo in set(grupos) - set(departamentos.codes) for i in grupos[codigo]],
+            dtype=np.intp
+        )
+
+    def departamentos_intersectados(self, geom: BaseGeometry,
+                                    contencion: bool = False) -> List[Tuple[int, bool]]:
+        """
+        Departamentos que intersectan a `geom`, en el orden del archivo fuente
+
+        Retorna pares (índice, contenido); con `contencion=True` se indica si el
+        departamento completo está dentro de `geom` (solo aplica a polígonos).
+        """
+        minx, miny, maxx, maxy = geom.bounds
+        resultado = []
+        for idx in self.departamentos.candidates(geom):
+            if not self.departamentos.intersects(idx, geom):
+                continue
+            contenido = False
+            if contencion:
+                dminx, dminy, dmaxx, dmaxy = self.departamentos.bounds[idx]
+                # Solo se prueba la contención si la envolvente lo permite
+                if minx <= dminx and miny <= dminy and dmaxx <= maxx and dmaxy <= maxy:
+                    contenido = self.departamentos.within(idx, geom)
+            resultado.append((int(idx), contenido))
+        return resultado
+
+    def municipios_de(self, codigos_departamento) -> np.ndarray:
+        """Índices (ordenados) de los municipios de los departamentos dados"""
+        grupos = [self.municipios_por_departamento.get(codigo) for codigo in codigos_departamento]
+        grupos = [g for g in grupos if g is not None] + [self._municipios_sin_departamento]
+        return np.sort(np.concatenate(grupos))
+
+
+def _municipio_code(props: Dict[str, Any]) -> str:
+    """Código DIVIPOLA de municipio a partir de las propiedades del feature"""
+    return str(props.get('DPTO')) + str(props.get('MPIO'))
+
+
+def _departamento_code(props: Dict[str, Any]) -> str:
+    """Código DIVIPOLA de departamento a partir de las propiedades del feature"""
+    return props.get('DPTO')
+
+
+def _diagnostico(crudo: Dict[str, Any], code_fn) -> Dict[str, List[Dict[str, Any]]]:
+    """Diagnóstico de validación con el código DIVIPOLA de cada feature afectado"""
+    return {
+        tipo: [
+            {'indice': e['indice'], 'codigo': code_fn(e['propiedades']), 'motivo': e['motivo']}
+            for e in crudo.get(tipo, [])
+        ]
+        for tipo in ('reparados', 'cuarentena')
+    }
+
+
+class GeometryRegistry:
+    """Carga perezosa y compartida de los límites DIVIPOLA"""
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self._snapshot: Optional[GeometrySnapshot] = None
+        self._lock = threading.Lock()
+        # Serializa las recargas sin bloquear a los lectores
+        self._reload_lock = threading.Lock()
+
+    def get(self) -> GeometrySnapshot:
+        """Retorna las capas cargadas, leyendo los archivos en el primer acceso"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                snapshot = self._snapshot
+        return snapshot
+
+    @property
+    def version(self) -> Optional[int]:
+        """Versión publicada (None si aún no se cargan los límites)"""
+        snapshot = self._snapshot
+        return snapshot.version if snapshot is not None else None
+
+    def reload(self) -> GeometrySnapshot:
+        """
+        Vuelve a leer los archivos de límites y publica la versión nueva
+
+        La construcción (artefacto binario, índices y niveles simplificados)
+        ocurre fuera del lock de lectura; las peticiones siguen usando la
+        versión anterior hasta el cambio de referencia.
+
+        Raises:
+            ValueError si alguna capa quedó vacía (archivo ausente o ilegible);
+            en ese caso se conserva la versión vigente
+        """
+        with self._reload_lock:
+            nuevo = self._load()
+            vigente = self._snapshot
+            for capa in ('municipios', 'departamentos'):
+                if vigente is not None and len(getattr(vigente, capa)) and not len(getattr(nuevo, capa)):
+                    raise ValueError(f"La capa de {capa} quedó vacía; se conserva la versión vigente")
+            with self._lock:
+                self._snapshot = nuevo
+        return nuevo
+
+    def _load(self) -> GeometrySnapshot:
+        """Lee ambos GeoJSON y construye las capas"""
+        municipios = self._load_layer('municipios', MUNICIPIOS_GEOJSON, _municipio_code)
+        departamentos = self._load_layer('departamentos', DEPARTAMENTOS_GEOJSON, _departamento_code)
+        return GeometrySnapshot(municipios, departamentos)
+
+    def _load_layer(self, nombre: str, filename: str, code_fn) -> BoundaryLayer:
+        """Abre el artefacto binario del GeoJSON (construyéndolo si cambió el archivo)"""
+        filepath = os.path.join(self.data_dir, filename)
+        if not os.path.exists(filepath):
+            print(f"Error cargando {filepath}: el archivo no existe")
+            return BoundaryLayer(nombre, [], [], [])
+
+        source_sha = artifact_dir = None
+        try:
+            artefacto, _ = geometry_cache.load(filepath)
+            diagnostico = _diagnostico(artefacto.meta, code_fn)
+            if GEO_GEOMETRY_MODE == 'shared':
+                codes = [code_fn(props) for props in artefacto.properties]
+                return SharedBoundaryLayer(nombre, codes, artefacto, diagnostico)
+            geometries = list(artefacto.geometries())
+            properties = artefacto.properties
+            source_sha = artefacto.meta.get('sha256')
+            artifact_dir = artefacto.path
+        except OSError as e:
+            # Sin permisos sobre GEO_CACHE_DIR: se parsea (y valida) el GeoJSON directamente
+            print(f"Caché binaria no disponible para {filepath}: {e}")
+            geometries, properties, crudo = self._parse_geojson(filepath)
+            diagnostico = _diagnostico(crudo, code_fn)
+
+        codes = [code_fn(props) for props in properties]
+        return BoundaryLayer(nombre, codes, geometries, properties, source_sha, diagnostico, artifact_dir)
+
+    def _parse_geojson(self, filepath: str) -> Tuple[List[BaseGeometry], List[Dict[str, Any]], Dict[str, Any]]:
+        """Convierte cada feature del GeoJSON en geometría Shapely válida"""
+        geojson = self._load_geojson(filepath)
+        return geometry_cache.parse_features(geojson.get('features', []), filepath)
+
+    def _load_geojson(self, filepath: str) -> dict:
+        """Carga un archivo GeoJSON"""
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error cargando {filepath}: {e}")
+            return {"type": "FeatureCollection", "features": []}
+
+
+# Instancia global del registro
+geometry_registry = GeometryRegistry()
@@ -1,52 +1,99 @@
 """
 Servicio para análisis de líneas (LineString)
 """
-import json
-import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import shapely
 from sqlalchemy.orm import Session
-from shapely.geometry import LineString, shape
-from shapely.ops import transform
-import pyproj
-from src.models.divipola import Departamento, Municipio
-from src.config.config import DATA_DIR, MUNICIPIOS_GEOJSON, DEPARTAMENTOS_GEOJSON
+from shapely.geometry import LineString
+from src.config.config import GEO_ENGINE
+from src.services.divipola_cache import divipola_cache
+from src.services.geometry_registry import BoundaryLayer, geometry_registry
+from src.services.postgis_engine import POSTGIS, postgis_engine
+from src.services.result_cache import geo_result_cache
+from src.utils.measurement_util import length_km, lengths_km
 
 class LineService:
     """Servicio para analizar líneas y determinar por qué municipios/departamentos pasa"""
     
     def __init__(self):
-        # Cargar GeoJSON de municipios y departamentos
-        self.municipios_geojson =  self._load_geojson(os.path.join(DATA_DIR, MUNICIPIOS_GEOJSON))
-        self.departamentos_geojson = self._load_geojson(os.path.join(DATA_DIR, DEPARTAMENTOS_GEOJSON))
-        
-        # print(f"[DEBUG] Municipios cargados: {len(self.municipios_geojson.get('features', []))}")
-        # print(f"[DEBUG] Departamentos cargados: {len(self.departamentos_geojson.get('features', []))}")
-
-    def _load_geojson(self, filepath: str) -> dict:
-        """Carga un archivo GeoJSON"""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error cargando {filepath}: {e}")
-            return {"type": "FeatureCollection", "features": []}
+        # Geometrías compartidas de municipios y departamentos
+        self.registry = geometry_registry
     
     def _calculate_line_length_km(self, line: LineString) -> float:
         """Calcula la longitud de una línea en kilómetros"""
         try:
-            # Proyección WGS84 a metros (usar proyección apropiada para Colombia)
-            wgs84 = pyproj.CRS('EPSG:4326')
-            utm = pyproj.CRS('EPSG:3116')  # MAGNA-SIRGAS / Colombia Bogota zone
-            
-            project = pyproj.Transformer.from_crs(wgs84, utm, always_xy=True).transform
-            line_projected = transform(project, line)
-            
-            # Longitud en metros, convertir a km
-            return line_projected.length / 1000.0
+            # Transformador cacheado del motor de medición (EPSG:3116 o geodésico)
+            return length_km(line)
         except:
             # Fallback: aproximación simple
             return line.length * 111.0  # Aproximación: 1 grado ≈ 111 km
     
+    def _segmentos(self, coordinates: List[List[float]]) -> np.ndarray:
+        """Segmentos consecutivos de la línea como arreglo de LineString"""
+        coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        return shapely.linestrings(np.stack([coords[:-1], coords[1:]], axis=1))
+    
+    def _recorrido(self, layer: BoundaryLayer, segmentos: np.ndarray,
+                   candidatos: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Límites que atraviesa la línea, con los km de línea dentro de cada uno
+        
+        Con `candidatos` solo se evalúan esos índices de la capa (los municipios
+        de los departamentos ya atravesados). Consulta el STRtree con todos los
+        segmentos a la vez y recorta solo los
+        segmentos que cruzan un borde: los que caen en el nivel interior del
+        límite cuentan completos. Cada límite se ubica sobre la línea por el
+        primer punto de su primer tramo (índice de segmento + fracción), de modo
+        que el resultado queda en el orden real de recorrido.
+        
+        Returns:
+            Lista de (índice en la capa, km) ordenada por punto de entrada
+        """
+        seg_idx, geom_idx = layer.tree.query(segmentos)
+        if candidatos is not None:
+            permitidos = np.isin(geom_idx, candidatos)
+            seg_idx, geom_idx = seg_idx[permitidos], geom_idx[permitidos]
+        if len(seg_idx) == 0:
+            return []
+        segs = segmentos[seg_idx]
+        
+        # Descarte rápido con el nivel grueso y aceptación completa con el interior
+        cerca = shapely.intersects(layer.tier_coarse[geom_idx], segs)
+        seg_idx, geom_idx, segs = seg_idx[cerca], geom_idx[cerca], segs[cerca]
+        completos = shapely.contains(layer.tier_inner[geom_idx], segs)
+        tramos = segs.copy()
+        borde = ~completos
+        tramos[borde] = shapely.intersection(segs[borde], layer.geometries[geom_idx[borde]])
+        
+        # Pares que solo comparten la envolvente no tocan el límite
+        tocan = ~shapely.is_empty(tramos)
+        seg_idx, geom_idx, tramos = seg_idx[tocan], geom_idx[tocan], tramos[tocan]
+        if len(seg_idx) == 0:
+            return []
+        
+        # Posición de entrada de cada tramo: fracción mínima de sus vértices sobre el segmento
+        coords, parte = shapely.get_coordinates(tramos, return_index=True)
+        inicio = shapely.get_coordinates(shapely.get_point(segmentos, 0))
+        fin = shapely.get_coordinates(shapely.get_point(segmentos, 1))
+        a, b = inicio[seg_idx[parte]], fin[seg_idx[parte]]
+        d = b - a
+        largo2 = np.einsum('ij,ij->i', d, d)
+        t = np.divide(np.einsum('ij,ij->i', coords - a, d), largo2, out=np.zeros(len(d)), where=largo2 > 0)
+        fraccion = np.full(len(tramos), np.inf)
+        np.minimum.at(fraccion, parte, np.clip(t, 0.0, 1.0))
+        posicion = seg_idx + fraccion
+        
+        km = lengths_km(tramos)
+        
+        # Agregar por límite: entrada más temprana y km totales
+        limites, inversa = np.unique(geom_idx, return_inverse=True)
+        entrada = np.full(len(limites), np.inf)
+        np.minimum.at(entrada, inversa, posicion)
+        total_km = np.bincount(inversa, weights=km, minlength=len(limites))
+        orden = np.lexsort((limites, entrada))
+        return [(int(limites[i]), float(total_km[i])) for i in orden]
+    
     def analyze_line(self, coordinates: List[List[float]], db: Session) -> Dict[str, Any]:
         """
         Analiza una línea y determina por qué municipios y departamentos pasa
@@ -58,6 +105,14 @@ class LineService:
         Returns:
             Diccionario con el análisis completo
         """
+        return geo_result_cache.get_or_compute(
+            'line', coordinates, db,
+            lambda: self._analyze_line(coordinates, db),
+            echo={'coordenadas_linea': coordinates}
+        )
+    
+    def _analyze_line(self, coordinates: List[List[float]], db: Session) -> Dict[str, Any]:
+        """Análisis sin caché de una línea"""
         try:
             # Crear geometría de línea
             line = LineString(coordinates)
@@ -65,74 +120,73 @@ class LineService:
             # Calcular longitud
             longitud_km = self._calculate_line_length_km(line)
             
-            # Buscar municipios por donde pasa la línea
-            municipios_encontrados = []
-            municipios_ids = set()
+            capas = self.registry.get()
+            divipola = divipola_cache.get(db)
             
-            for feature in self.municipios_geojson.get('features', []):
-                try:
-                    municipio_geom = shape(feature['geometry'])
-                    
-                    # Verificar si la línea intersecta con el municipio
-                    if line.intersects(municipio_geom):
-                        props = feature['properties']
-                        codigo_mpio = str(props.get('DPTO')) + str(props.get('MPIO'))
-                        
-                        if codigo_mpio and codigo_mpio not in municipios_ids:
-                            municipios_ids.add(codigo_mpio)
-                            
-                            # Buscar en BD
-                            municipio_db = db.query(Municipio).filter(
-                                Municipio.codigo_municipio == codigo_mpio
-                            ).first()
-                            
-                            if municipio_db:
-                                # Buscar departamento
-                                departamento_db = db.query(Departamento).filter(
-                                    Departamento.codigo == municipio_db.codigo_departamento
-                                ).first()
-                                
-                                municipios_encontrados.append({
-                                    'id': municipio_db.id,
-                                    'codigo_municipio': municipio_db.codigo_municipio,
-                                    'nombre_municipio': municipio_db.nombre_municipio,
-                                    'codigo_departamento': municipio_db.codigo_departamento,
-                                    'nombre_departamento': departamento_db.nombre if departamento_db else 'N/A',
-                                    'orden': len(municipios_encontrados) + 1
-                                })
-                except Exception as e:
+            if GEO_ENGINE == POSTGIS:
+                # Ambas capas en una sola consulta a PostGIS
+                recorridos = postgis_engine.recorridos(db, capas, line)
+            else:
+                # Una sola pasada indexada sobre los segmentos de la línea por capa
+                segmentos = self._segmentos(coordinates)
+                # Nivel 1: departamentos por donde pasa la línea
+                departamentos_rec = self._recorrido(capas.departamentos, segmentos)
+                # Nivel 2: solo municipios de esos departamentos
+                codigos_hit = [capas.departamentos.codes[idx] for idx, _ in departamentos_rec]
+                recorridos = {
+                    'municipios': self._recorrido(capas.municipios, segmentos, capas.municipios_de(codigos_hit)),
+                    'departamentos': departamentos_rec,
+                }
+            
+            # Municipios en el orden en que la línea entra a cada uno
+            municipios_encontrados = []
+            municipios_ids = {}
+            for idx, km in recorridos['municipios']:
+                codigo_mpio = capas.municipios.codes[idx]
+                # Un código repetido en varios features suma sus km a la primera aparición
+                if codigo_mpio in municipios_ids:
+                    municipios_ids[codigo_mpio]['longitud_km'] = round(municipios_ids[codigo_mpio]['longitud_km'] + km, 2)
                     continue
+                
+                # Buscar en la caché DIVIPOLA
+                municipio_db = divipola.municipios.get(codigo_mpio) if codigo_mpio else None
+                
+                if municipio_db:
+                    # Buscar departamento
+                    departamento_db = divipola.departamento_de(municipio_db)
+                    
+                    municipios_encontrados.append({
+                        'id': municipio_db['id'],
+                        'codigo_municipio': municipio_db['codigo_municipio'],
+                        'nombre_municipio': municipio_db['nombre_municipio'],
+                        'codigo_departamento': municipio_db['codigo_departamento'],
+                        'nombre_departamento': departamento_db['nombre'] if departamento_db else 'N/A',
+                        'orden': len(municipios_encontrados) + 1,
+                        'longitud_km': round(km, 2)
+                    })
+                    municipios_ids[codigo_mpio] = municipios_encontrados[-1]
             
-            # Buscar departamentos por donde pasa la línea
+            # Departamentos en el orden en que la línea entra a cada uno
             departamentos_encontrados = []
-            departamentos_ids = set()
-            
-            for feature in self.departamentos_geojson.get('features', []):
-                try:
-                    depto_geom = shape(feature['geometry'])
-                    
-                    # Verificar si la línea intersecta con el departamento
-                    if line.intersects(depto_geom):
-                        props = feature['properties']
-                        codigo_depto = props.get('DPTO') or props.get('DPTO')
-                        
-                        if codigo_depto and codigo_depto not in departamentos_ids:
-                            departamentos_ids.add(codigo_depto)
-                            
-                            # Buscar en BD
-                            depto_db = db.query(Departamento).filter(
-                                Departamento.codigo == codigo_depto
-                            ).first()
-                            
-                            if depto_db:
-                                departamentos_encontrados.append({
-                                    'id': depto_db.id,
-                                    'codigo_departamento': depto_db.codigo,
-                                    'nombre_departamento': depto_db.nombre,
-                                    'orden': len(departamentos_encontrados) + 1
-                                })
-                except Exception as e:
+            departamentos_ids = {}
+            for idx, km in recorridos['departamentos']:
+                codigo_depto = capas.departamentos.codes[idx]
+                if codigo_depto in departamentos_ids:
+                    departamentos_ids[codigo_depto]['longitud_km'] = round(departamentos_ids[codigo_depto]['longitud_km'] + km, 2)
                     continue
+                
+                # Buscar en la caché DIVIPOLA
+                depto_db = divipola.departamentos.get(codigo_depto) if codigo_depto else None
+                
+                if depto_db:
+                    departamentos_encontrados.append({
+                        'id': depto_db['id'],
+                        'codigo_departamento': depto_db['codigo'],
+                        'nombre_departamento': depto_db['nombre'],
+                        'orden': len(departamentos_encontrados) + 1,
+                        'longitud_km': round(km, 2)
+                    })
+                    departamentos_ids[codigo_depto] = departamentos_encontrados[-1]
             
             # Construir respuesta
             return {
@@ -0,0 +1,184 @@
+"""
+Grilla precalculada para resolver punto -> municipio con un acceso a arreglo
+
+Divide la envolvente de Colombia en celdas de GEO_LOOKUP_GRID_RESOLUTION
+grados. Cada celda guarda el índice (en la capa de municipios) del único
+municipio que la contiene por completo en su interior, o BORDE si la celda
+toca un límite, queda fuera de todos los municipios o la tocan varios.
+
+Las celdas interiores responden sin evaluar geometrías; las de borde siguen
+el camino exacto (STRtree + contains). La grilla se construye fuera de línea
+y se guarda dentro del artefacto de municipios de geometry_cache, cuyos índices
+almacena: un GeoJSON modificado o un cambio de formato del artefacto la dejan
+fuera de uso. Si el archivo no existe simplemente no se usa:
+
+    python -m src.services.lookup_grid [resolución]
+"""
+import os
+import sys
+import threading
+from typing import Optional
+import numpy as np
+import shapely
+from src.config.config import (
+    GEO_LAT_MAX, GEO_LAT_MIN, GEO_LNG_MAX, GEO_LNG_MIN, GEO_LOOKUP_GRID_RESOLUTION,
+)
+from src.services import geometry_cache
+from src.services.geometry_registry import BoundaryLayer, geometry_registry
+
+FORMAT_VERSION = 1
+# Celda que requiere la evaluación exacta
+BORDE = -1
+
+
+class LookupGrid:
+    """Celdas (filas = latitud, columnas = longitud) sobre la envolvente de Colombia"""
+
+    def __init__(self, cells: np.ndarray, resolution: float,
+                 lng_min: float = GEO_LNG_MIN, lat_min: float = GEO_LAT_MIN):
+        self.cells = cells
+        self.resolution = resolution
+        self.lng_min = lng_min
+        self.lat_min = lat_min
+
+    def lookup_many(self, coords: np.ndarray) -> np.ndarray:
+        """Índice de municipio de cada coordenada [lng, lat], o BORDE"""
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        filas = np.floor((coords[:, 1] - self.lat_min) / self.resolution).astype(np.int64)
+        columnas = np.floor((coords[:, 0] - self.lng_min) / self.resolution).astype(np.int64)
+        alto, ancho = self.cells.shape
+        dentro = (filas >= 0) & (filas < alto) & (columnas >= 0) & (columnas < ancho)
+        resultado = np.full(len(coords), BORDE, dtype=np.int64)
+        resultado[dentro] = self.cells[filas[dentro], columnas[dentro]]
+        return resultado
+
+    def lookup(self, lng: float, lat: float) -> int:
+        """Índice de municipio de un punto, o BORDE"""
+        return int(self.lookup_many([[lng, lat]])[0])
+
+
+def grid_shape(resolution: float):
+    """Filas y columnas de la grilla para una resolución"""
+    return (
+        int(np.ceil(round((GEO_LAT_MAX - GEO_LAT_MIN) / resolution, 9))),
+        int(np.ceil(round((GEO_LNG_MAX - GEO_LNG_MIN) / resolution, 9))),
+    )
+
+
+def grid_path(artifact_dir: str, resolution: float) -> str:
+    """Archivo de la grilla para un artefacto de municipios y una resolución"""
+    return geometry_cache.derived_path(artifact_dir, f"grid-{resolution:g}-v{FORMAT_VERSION}.npy")
+
+
+def build(layer: BoundaryLayer, resolution: float = GEO_LOOKUP_GRID_RESOLUTION) -> np.ndarray:
+    """
+    Calcula la grilla de una capa de municipios
+
+    Una celda recibe un municipio solo si ese municipio la contiene en su
+    interior (contains_properly) y ningún otro la intersecta.
+    """
+    alto, ancho = grid_shape(resolution)
+    propietario = np.full((alto, ancho), BORDE, dtype=np.int32)
+    toques = np.zeros((alto, ancho), dtype=np.int16)
+    # Margen mínimo para que los puntos sobre el borde de la celda también queden cubiertos
+    margen = resolution * 1e-6
+
+    for idx, geom in enumerate(layer.geometries):
+        if geom is None or geom.is_empty:
+            continue
+        minx, miny, maxx, maxy = geom.bounds
+        c0 = max(int(np.floor((minx - GEO_LNG_MIN) / resolution)), 0)
+        c1 = min(int(np.floor((maxx - GEO_LNG_MIN) / resolution)) + 1, ancho)
+        f0 = max(int(np.floor((miny - GEO_LAT_MIN) / resolution)), 0)
+        f1 = min(int(np.floor((maxy - GEO_LAT_MIN) / resolution)) + 1, alto)
+        if c0 >= c1 or f0 >= f1:
+            continue
+
+        filas, columnas = np.mgrid[f0:f1, c0:c1]
+        filas, columnas = filas.ravel(), columnas.ravel()
+        x0 = GEO_LNG_MIN + columnas * resolution
+        y0 = GEO_LAT_MIN + filas * resolution
+        celdas = shapely.box(x0 - margen, y0 - margen, x0 + resolution + margen, y0 + resolution + margen)
+
+        tocadas = shapely.intersects(geom, celdas)
+        filas, columnas, celdas = filas[tocadas], columnas[tocadas], celdas[tocadas]
+        toques[filas, columnas] += 1
+        interiores = shapely.contains_properly(geom, celdas)
+        propietario[filas[interiores], columnas[interiores]] = idx
+
+    # Celdas tocadas por más de un municipio (o por ninguno) van por el camino exacto
+    propietario[toques != 1] = BORDE
+    return propietario
+
+
+def save(cells: np.ndarray, path: str) -> Optional[str]:
+    """Escribe la grilla de forma atómica; None si el artefacto ya no existe"""
+    if not geometry_cache.is_artifact(os.path.dirname(path)):
+        print(f"El artefacto de {path} ya no existe, no se guarda la grilla")
+        return None
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        np.save(f, cells)
+    os.replace(tmp, path)
+    return path
+
+
+class MunicipioLookupGrid:
+    """Abre (una vez por versión de la capa de municipios) la grilla precalculada si existe"""
+
+    def __init__(self, resolution: float = GEO_LOOKUP_GRID_RESOLUTION):
+        self.resolution = resolution
+        self._layer: Optional[BoundaryLayer] = None
+        self._grid: Optional[LookupGrid] = None
+        self._lock = threading.Lock()
+
+    def get(self, layer: BoundaryLayer) -> Optional[LookupGrid]:
+        """Grilla correspondiente a `layer`, o None si no fue construida"""
+        if self._layer is not layer:
+            with self._lock:
+                if self._layer is not layer:
+                    self._grid = self._open(layer)
+                    self._layer = layer
+        return self._grid
+
+    def _open(self, layer: BoundaryLayer) -> Optional[LookupGrid]:
+        if not layer.artifact_dir:
+            return None
+        path = grid_path(layer.artifact_dir, self.resolution)
+        if not os.path.exists(path):
+            return None
+        try:
+            cells = np.load(path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            print(f"Error cargando la grilla {path}: {e}")
+            return None
+        if cells.shape != grid_shape(self.resolution):
+            print(f"Grilla {path} con dimensiones inesperadas {cells.shape}, se ignora")
+            return None
+        # Cada celda interior debe apuntar a un municipio de la capa
+        if len(cells) and int(cells.max()) >= len(layer):
+            print(f"Grilla {path} con índices fuera de los {len(layer)} municipios de la capa, se ignora")
+            return None
+        return LookupGrid(cells, self.resolution)
+
+
+# Instancia global de la grilla de municipios
+municipio_lookup_grid = MunicipioLookupGrid()
+
+
+def main():
+    resolution = float(sys.argv[1]) if len(sys.argv) > 1 else GEO_LOOKUP_GRID_RESOLUTION
+    municipios = geometry_registry.get().municipios
+    if not municipios.artifact_dir:
+        print("La capa de municipios no proviene de la caché binaria, no se construye la grilla")
+        return
+    cells = build(municipios, resolution)
+    path = save(cells, grid_path(municipios.artifact_dir, resolution))
+    if path is None:
+        return
+    interiores = float(np.mean(cells != BORDE)) * 100
+    print(f"{path}: {cells.shape[0]}x{cells.shape[1]} celdas, {interiores:.1f}% resueltas sin geometría")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ from src.models.logs_model import TipoOperacionEnum
 from src.schemas.municipio_schema import municipioCreate, MunicipioUpdate, LogEntityRead
 from datetime import datetime
 from src.utils.logs_util import registrar_log, LogUtil
+from src.services.divipola_cache import divipola_cache
 
 # Servicio para listar las unidades de ejecucion
 class MunicipioService:
@@ -71,6 +72,8 @@ class MunicipioService:
                                         activo=True, created_at=datetime.utcnow())
         self.db.add(entity)
         self.db.commit()
+        # La caché DIVIPOLA de los análisis geográficos debe reflejar el cambio
+        divipola_cache.invalidate()
         self.db.refresh(entity)
         
         # Registro de logs
@@ -138,6 +141,8 @@ class MunicipioService:
             dataupdate.id_persona = tokenpayload.get("sub")
             dataupdate.updated_at = datetime.utcnow()
             self.db.commit()
+            # La caché DIVIPOLA de los análisis geográficos debe reflejar el cambio
+            divipola_cache.invalidate()
             self.db.refresh(dataupdate)
             
             # Registro de logs
@@ -169,6 +174,8 @@ class MunicipioService:
         datadelete.id_persona = tokenpayload.get("sub")
         # guardar los cambios
         self.db.commit()
+        # La caché DIVIPOLA de los análisis geográficos debe reflejar el cambio
+        divipola_cache.invalidate()
         self.db.refresh(datadelete)
         
         
@@ -0,0 +1,112 @@
+"""
+Servicio de vecindad entre municipios y departamentos
+
+Responde desde el grafo de adyacencia precalculado (ver adjacency_graph) y la
+caché DIVIPOLA, sin evaluar geometrías por petición.
+"""
+from typing import Any, Dict, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from src.services.adjacency_graph import boundary_adjacency
+from src.services.divipola_cache import DivipolaSnapshot, divipola_cache
+from src.services.geometry_registry import geometry_registry
+
+CAPAS = ("municipios", "departamentos")
+
+
+class NeighborService:
+    """Servicio para consultar los límites vecinos de un municipio o departamento"""
+
+    def __init__(self):
+        # Geometrías compartidas de municipios y departamentos
+        self.registry = geometry_registry
+
+    def neighbors(self, capa: str, codigo: str, k: int, db: Session) -> Optional[Dict[str, Any]]:
+        """
+        Límites a 1..k saltos del municipio o departamento con código `codigo`
+
+        Args:
+            capa: `municipios` o `departamentos`
+            codigo: Código DIVIPOLA del límite consultado
+            k: Saltos máximos (1 = solo vecinos directos)
+            db: Sesión de base de datos (solo para cargar la caché DIVIPOLA)
+
+        Returns:
+            Vecinos ordenados por saltos y, entre los directos, por km de borde
+            compartido descendente; None si el código no existe en la capa
+        """
+        try:
+            capas = self.registry.get()
+            layer = capas.municipios if capa == "municipios" else capas.departamentos
+            origenes = np.array([i for i, c in enumerate(layer.codes) if c == codigo], dtype=np.intp)
+            if len(origenes) == 0:
+                return None
+
+            graph = boundary_adjacency.get(layer)
+            divipola = divipola_cache.get(db)
+
+            # Km de borde compartido con el límite consultado (un código puede tener varios features)
+            frontera: Dict[str, float] = {}
+            for idx in origenes:
+                vecinos, km = graph.vecinos(idx)
+                for j, longitud in zip(vecinos.tolist(), km.tolist()):
+                    frontera[layer.codes[j]] = frontera.get(layer.codes[j], 0.0) + longitud
+
+            saltos: Dict[str, int] = {}
+            if k == 1:
+                saltos = {c: 1 for c in frontera}
+            else:
+                alcanzados, niveles = graph.k_hop(origenes, k)
+                for j, nivel in zip(alcanzados.tolist(), niveles.tolist()):
+                    c = layer.codes[j]
+                    saltos[c] = min(saltos.get(c, nivel), nivel)
+            saltos.pop(codigo, None)
+
+            orden = sorted(saltos, key=lambda c: (saltos[c], -frontera.get(c, 0.0), c))
+            vecinos_result = []
+            for c in orden:
+                limite = self._limite(capa, c, divipola)
+                if limite:
+                    limite['saltos'] = saltos[c]
+                    limite['longitud_frontera_km'] = round(frontera[c], 2) if saltos[c] == 1 else None
+                    vecinos_result.append(limite)
+
+            consultado = self._limite(capa, codigo, divipola)
+            return {
+                'capa': capa,
+                'codigo': codigo,
+                'nombre': consultado['nombre'] if consultado else '',
+                'k': k,
+                'total_vecinos': len(vecinos_result),
+                'vecinos': vecinos_result
+            }
+
+        except Exception as e:
+            raise Exception(f"Error consultando vecinos: {str(e)}")
+
+    def _limite(self, capa: str, codigo: str, divipola: DivipolaSnapshot) -> Optional[Dict[str, Any]]:
+        """Estructura LimiteVecino (sin saltos) desde la caché DIVIPOLA"""
+        if capa == "municipios":
+            municipio_db = divipola.municipios.get(codigo)
+            if not municipio_db:
+                return None
+            departamento_db = divipola.departamento_de(municipio_db)
+            return {
+                'id': municipio_db['id'],
+                'codigo': municipio_db['codigo_municipio'],
+                'nombre': municipio_db['nombre_municipio'],
+                'codigo_departamento': municipio_db['codigo_departamento'],
+                'nombre_departamento': departamento_db['nombre'] if departamento_db else 'N/A',
+            }
+        depto_db = divipola.departamentos.get(codigo)
+        if not depto_db:
+            return None
+        return {
+            'id': depto_db['id'],
+            'codigo': depto_db['codigo'],
+            'nombre': depto_db['nombre'],
+        }
+
+
+# Instancia global del servicio
+neighbor_service = NeighborService()
@@ -1,46 +1,32 @@
 """
 Servicio para análisis de puntos (Point/Marker)
 """
-import json
-import os
 from typing import List, Dict, Any
+import numpy as np
+import shapely
 from sqlalchemy.orm import Session
-from shapely.geometry import Point, shape
-from shapely.ops import transform
-import pyproj
-from src.models.divipola import Departamento, Municipio
-from src.config.config import DATA_DIR, MUNICIPIOS_GEOJSON, DEPARTAMENTOS_GEOJSON
+from shapely.geometry import Point
+from src.config.config import GEO_ENGINE
+from src.services.centroid_index import municipio_centroid_index
+from src.services.divipola_cache import divipola_cache
+from src.services.geometry_registry import geometry_registry
+from src.services.lookup_grid import BORDE, municipio_lookup_grid
+from src.services.postgis_engine import POSTGIS, postgis_engine
+from src.services.result_cache import geo_result_cache
+from src.utils.measurement_util import distance_km, distances_km
 
 class PointService:
     """Servicio para analizar puntos y determinar en qué municipio/departamento se encuentra"""
     
     def __init__(self):
-        # Cargar GeoJSON de municipios y departamentos
-        self.municipios_geojson =  self._load_geojson(os.path.join(DATA_DIR, MUNICIPIOS_GEOJSON))
-        self.departamentos_geojson = self._load_geojson(os.path.join(DATA_DIR, DEPARTAMENTOS_GEOJSON))
-    
-    def _load_geojson(self, filepath: str) -> dict:
-        """Carga un archivo GeoJSON"""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error cargando {filepath}: {e}")
-            return {"type": "FeatureCollection", "features": []}
+        # Geometrías compartidas de municipios y departamentos
+        self.registry = geometry_registry
     
     def _calculate_distance_km(self, point1: Point, point2: Point) -> float:
         """Calcula la distancia entre dos puntos en kilómetros"""
         try:
-            # Proyección WGS84 a metros
-            wgs84 = pyproj.CRS('EPSG:4326')
-            utm = pyproj.CRS('EPSG:3116')  # MAGNA-SIRGAS / Colombia Bogota zone
-            
-            project = pyproj.Transformer.from_crs(wgs84, utm, always_xy=True).transform
-            point1_projected = transform(project, point1)
-            point2_projected = transform(project, point2)
-            
-            # Distancia en metros, convertir a km
-            return point1_projected.distance(point2_projected) / 1000.0
+            # Transformador cacheado del motor de medición (EPSG:3116 o geodésico)
+            return distance_km(point1, point2)
         except:
             # Fallback: aproximación simple
             return point1.distance(point2) * 111.0  # Aproximación: 1 grado ≈ 111 km
@@ -56,6 +42,14 @@ class PointService:
         Returns:
             Diccionario con el análisis completo
         """
+        return geo_result_cache.get_or_compute(
+            'point', coordinates, db,
+            lambda: self._analyze_point(coordinates, db),
+            echo={'coordenadas_punto': coordinates}
+        )
+    
+    def _analyze_point(self, coordinates: List[float], db: Session) -> Dict[str, Any]:
+        """Análisis sin caché de un punto"""
         try:
             # Crear geometría de punto
             point = Point(coordinates)
@@ -63,46 +57,44 @@ class PointService:
             # Buscar municipio que contiene el punto
             municipio_encontrado = None
             
-            for feature in self.municipios_geojson.get('features', []):
-                try:
-                    municipio_geom = shape(feature['geometry'])
-                    
-                    # Verificar si el punto está dentro del municipio
-                    if municipio_geom.contains(point):
-                        props = feature['properties']
-                        codigo_mpio = str(props.get('DPTO')) + str(props.get('MPIO'))
+            capas = self.registry.get()
+            municipios = capas.municipios
+            divipola = divipola_cache.get(db)
+            
+            if GEO_ENGINE == POSTGIS:
+                # Municipios que contienen el punto, resueltos por PostGIS
+                celda = BORDE
+                candidatos = postgis_engine.municipios_en_punto(db, capas, point.x, point.y)
+            else:
+                # Celda interior de la grilla precalculada: el municipio se conoce sin evaluar geometrías
+                grilla = municipio_lookup_grid.get(municipios)
+                celda = grilla.lookup(point.x, point.y) if grilla is not None else BORDE
+                
+                # Si no, solo se evalúan los municipios cuya envolvente contiene el punto
+                candidatos = [celda] if celda != BORDE else municipios.candidates(point)
+            verificados = GEO_ENGINE == POSTGIS
+            for idx in candidatos:
+                codigo_mpio = municipios.codes[idx]
+                # Geometrías validadas al cargar: el predicado no requiere manejo de errores
+                # Verificar si el punto está dentro del municipio (resolución completa solo cerca del borde)
+                if verificados or idx == celda or municipios.contains(idx, point):
+                    if codigo_mpio:
+                        # Buscar en la caché DIVIPOLA
+                        municipio_db = divipola.municipios.get(codigo_mpio)
                         
-                        if codigo_mpio:
-                            # Buscar en BD
-                            municipio_db = db.query(Municipio).filter(
-                                Municipio.codigo_municipio == codigo_mpio
-                            ).first()
+                        if municipio_db:
+                            # Buscar departamento
+                            departamento_db = divipola.departamento_de(municipio_db)
                             
-                            if municipio_db:
-                                # Buscar departamento
-                                departamento_db = db.query(Departamento).filter(
-                                    Departamento.codigo == municipio_db.codigo_departamento
-                                ).first()
-                                
-                                # Calcular distancia al centroide del municipio
-                                if municipio_db.latitud and municipio_db.longitud:
-                                    centroide = Point(float(municipio_db.longitud), float(municipio_db.latitud))
-                                    distancia_km = self._calculate_distance_km(point, centroide)
-                                else:
-                                    distancia_km = 0.0
-                                
-                                municipio_encontrado = {
-                                    'municipio_id': municipio_db.id,
-                                    'codigo_municipio': municipio_db.codigo_municipio,
-                                    'nombre_municipio': municipio_db.nombre_municipio,
-                                    'departamento_id': departamento_db.id if departamento_db else 0,
-                                    'codigo_departamento': municipio_db.codigo_departamento,
-                                    'nombre_departamento': departamento_db.nombre if departamento_db else 'N/A',
-                                    'distancia_centroide_km': round(distancia_km, 2)
-                                }
-                                break
-                except Exception as e:
-                    continue
+                            # Calcular distancia al centroide del municipio
+                            if municipio_db['latitud'] and municipio_db['longitud']:
+                                centroide = Point(municipio_db['longitud'], municipio_db['latitud'])
+                                distancia_km = self._calculate_distance_km(point, centroide)
+                            else:
+                                distancia_km = 0.0
+                            
+                            municipio_encontrado = self._ubicacion(municipio_db, departamento_db, distancia_km)
+                            break
             
             # Si no se encontró municipio, buscar el más cercano
             if not municipio_encontrado:
@@ -118,41 +110,93 @@ class PointService:
         except Exception as e:
             raise Exception(f"Error al analizar punto: {str(e)}")
     
-    def _find_nearest_municipality(self, point: Point, db: Session) -> Dict[str, Any]:
-        """Encuentra el municipio más cercano al punto"""
+    def analyze_points(self, coordinates: List[List[float]], db: Session) -> Dict[str, Any]:
+        """
+        Analiza un lote de puntos en una sola pasada vectorizada
+        
+        Args:
+            coordinates: Lista de coordenadas [[lng, lat], ...]
+            db: Sesión de base de datos
+            
+        Returns:
+            Diccionario con la ubicación de cada punto, en el mismo orden de entrada
+        """
         try:
-            # Obtener todos los municipios con coordenadas
-            municipios = db.query(Municipio).filter(
-                Municipio.latitud.isnot(None),
-                Municipio.longitud.isnot(None)
-            ).all()
-            
-            min_distance = float('inf')
-            nearest_municipio = None
-            
-            for municipio in municipios:
-                centroide = Point(float(municipio.longitud), float(municipio.latitud))
-                distance = self._calculate_distance_km(point, centroide)
+            coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+            points = shapely.points(coords)
+            capas = self.registry.get()
+            municipios = capas.municipios
+            
+            if GEO_ENGINE == POSTGIS:
+                # Pares (punto, municipio) del lote completo en una sola consulta
+                point_idx, mpio_idx = postgis_engine.municipios_en_puntos(db, capas, coords)
+            else:
+                # Puntos en celdas interiores de la grilla: municipio resuelto por índice
+                grilla = municipio_lookup_grid.get(municipios)
+                celdas = grilla.lookup_many(coords) if grilla is not None else np.full(len(coords), BORDE)
+                resueltos = np.flatnonzero(celdas != BORDE)
+                pendientes = np.flatnonzero(celdas == BORDE)
                 
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_municipio = municipio
-            
-            if nearest_municipio:
-                # Buscar departamento
-                departamento_db = db.query(Departamento).filter(
-                    Departamento.codigo == nearest_municipio.codigo_departamento
-                ).first()
+                # Pares (punto, municipio) donde el municipio contiene al punto
+                query_idx, mpio_idx = municipios.query(points[pendientes], predicate='within')
+                point_idx = np.concatenate([resueltos, pendientes[query_idx]])
+                mpio_idx = np.concatenate([celdas[resueltos], mpio_idx])
+            orden = np.lexsort((mpio_idx, point_idx))
+            point_idx, mpio_idx = point_idx[orden], mpio_idx[orden]
+            
+            # Atributos de todos los municipios desde la caché DIVIPOLA
+            divipola = divipola_cache.get(db)
+            
+            # Primer municipio (en orden del archivo) con registro en BD para cada punto
+            asignados: Dict[int, Dict[str, Any]] = {}
+            for p, m in zip(point_idx.tolist(), mpio_idx.tolist()):
+                if p not in asignados and municipios.codes[m] in divipola.municipios:
+                    asignados[p] = divipola.municipios[municipios.codes[m]]
+            
+            # Distancias al centroide calculadas con una sola transformación
+            con_centroide = [p for p, m in asignados.items() if m['latitud'] and m['longitud']]
+            distancias = {}
+            if con_centroide:
+                centroides = np.array([
+                    [asignados[p]['longitud'], asignados[p]['latitud']]
+                    for p in con_centroide
+                ])
+                valores = distances_km(coords[con_centroide], centroides)
+                distancias = dict(zip(con_centroide, valores.tolist()))
+            
+            puntos = []
+            for p, coordenada in enumerate(coordinates):
+                if p in asignados:
+                    municipio_db = asignados[p]
+                    departamento_db = divipola.departamento_de(municipio_db)
+                    ubicacion = self._ubicacion(municipio_db, departamento_db, distancias.get(p, 0.0))
+                else:
+                    # Punto fuera de todos los municipios: buscar el más cercano
+                    ubicacion = self._find_nearest_municipality(Point(coordenada), db)
                 
-                return {
-                    'municipio_id': nearest_municipio.id,
-                    'codigo_municipio': nearest_municipio.codigo_municipio,
-                    'nombre_municipio': f"{nearest_municipio.nombre_municipio} (más cercano)",
-                    'departamento_id': departamento_db.id if departamento_db else 0,
-                    'codigo_departamento': nearest_municipio.codigo_departamento,
-                    'nombre_departamento': departamento_db.nombre if departamento_db else 'N/A',
-                    'distancia_centroide_km': round(min_distance, 2)
-                }
+                puntos.append({
+                    'coordenadas_punto': coordenada,
+                    'ubicacion': ubicacion
+                })
+            
+            return {
+                'tipo': 'marker',
+                'total_puntos': len(puntos),
+                'puntos': puntos
+            }
+            
+        except Exception as e:
+            raise Exception(f"Error al analizar lote de puntos: {str(e)}")
+    
+    def _find_nearest_municipality(self, point: Point, db: Session) -> Dict[str, Any]:
+        """Encuentra el municipio más cercano al punto"""
+        try:
+            # Índice en memoria de centroides: sin recorrer la tabla de municipios
+            cercanos = municipio_centroid_index.nearest(point.x, point.y, db, k=1)
+            
+            if cercanos:
+                nearest_municipio = cercanos[0]
+                return self._ubicacion_cercana(nearest_municipio, " (más cercano)")
             else:
                 # Fallback si no se encuentra nada
                 return {
@@ -166,6 +210,62 @@ class PointService:
                 }
         except Exception as e:
             raise Exception(f"Error buscando municipio más cercano: {str(e)}")
+    
+    def _ubicacion(self, municipio: Dict[str, Any], departamento: Dict[str, Any],
+                   distancia_km: float) -> Dict[str, Any]:
+        """Estructura UbicacionPunto a partir de los registros de la caché DIVIPOLA"""
+        return {
+            'municipio_id': municipio['id'],
+            'codigo_municipio': municipio['codigo_municipio'],
+            'nombre_municipio': municipio['nombre_municipio'],
+            'departamento_id': departamento['id'] if departamento else 0,
+            'codigo_departamento': municipio['codigo_departamento'],
+            'nombre_departamento': departamento['nombre'] if departamento else 'N/A',
+            'distancia_centroide_km': round(distancia_km, 2)
+        }
+    
+    def _ubicacion_cercana(self, municipio: Dict[str, Any], sufijo: str = "") -> Dict[str, Any]:
+        """Convierte un resultado del índice de centroides en la estructura UbicacionPunto"""
+        return {
+            'municipio_id': municipio['municipio_id'],
+            'codigo_municipio': municipio['codigo_municipio'],
+            'nombre_municipio': f"{municipio['nombre_municipio']}{sufijo}",
+            'departamento_id': municipio['departamento_id'],
+            'codigo_departamento': municipio['codigo_departamento'],
+            'nombre_departamento': municipio['nombre_departamento'],
+            'distancia_centroide_km': round(municipio['distancia_km'], 2)
+        }
+    
+    def nearest_municipalities(self, coordinates: List[float], k: int, db: Session) -> Dict[str, Any]:
+        """
+        Retorna los k municipios cuyo centroide está más cerca del punto
+        
+        Args:
+            coordinates: Coordenadas [lng, lat]
+            k: Cantidad de municipios a retornar
+            db: Sesión de base de datos (solo se usa si el índice debe construirse)
+            
+        Returns:
+            Diccionario con los municipios ordenados por distancia ascendente
+        """
+        return geo_result_cache.get_or_compute(
+            'nearest', coordinates, db,
+            lambda: self._nearest_municipalities(coordinates, k, db),
+            echo={'coordenadas_punto': coordinates}, k=k
+        )
+    
+    def _nearest_municipalities(self, coordinates: List[float], k: int, db: Session) -> Dict[str, Any]:
+        """Búsqueda sin caché de los municipios más cercanos"""
+        try:
+            lng, lat = coordinates
+            cercanos = municipio_centroid_index.nearest(lng, lat, db, k=k)
+            return {
+                'tipo': 'marker',
+                'coordenadas_punto': coordinates,
+                'municipios': [self._ubicacion_cercana(m) for m in cercanos]
+            }
+        except Exception as e:
+            raise Exception(f"Error buscando municipios cercanos: {str(e)}")
 
 
 # Instancia global del servicio
@@ -1,40 +1,31 @@
 """
 Servicio para análisis de polígonos con datos DIVIPOLA desde MySQL
 """
-import json
-import os
-from typing import List, Dict, Any
-from shapely.geometry import shape, Polygon as ShapelyPolygon
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import shapely
+from shapely.geometry import Polygon as ShapelyPolygon
 from sqlalchemy.orm import Session
-from src.models.divipola import Departamento, Municipio
-from src.config.config import DATA_DIR, MUNICIPIOS_GEOJSON, DEPARTAMENTOS_GEOJSON
+from src.config.config import GEO_DEPARTMENT_AREAS, GEO_ENGINE
+from src.services.divipola_cache import DivipolaSnapshot, divipola_cache
+from src.services.geometry_registry import BoundaryLayer, GeometrySnapshot, geometry_registry
+from src.services.postgis_engine import POSTGIS, postgis_engine
+from src.services.result_cache import geo_result_cache
+from src.utils.measurement_util import area_km2, areas_km2
+
+# Cálculo de las áreas de los departamentos (GEO_DEPARTMENT_AREAS)
+EXACTO = "exact"
+AGREGADO = "aggregate"
 
 
 class PolygonAnalysisService:
     """Servicio para análisis geoespacial de polígonos"""
     
     def __init__(self):
-        self.data_dir = DATA_DIR
-        self._municipios_geojson = None
-        self._departamentos_geojson = None
-    
-    @property
-    def municipios_geojson(self) -> Dict:
-        """Carga lazy de datos GeoJSON de municipios"""
-        if self._municipios_geojson is None:
-            geojson_path = os.path.join(self.data_dir, MUNICIPIOS_GEOJSON)
-            with open(geojson_path, 'r', encoding='utf-8') as f:
-                self._municipios_geojson = json.load(f)
-        return self._municipios_geojson
-    
-    @property
-    def departamentos_geojson(self) -> Dict:
-        """Carga lazy de datos GeoJSON de departamentos"""
-        if self._departamentos_geojson is None:
-            geojson_path = os.path.join(self.data_dir, DEPARTAMENTOS_GEOJSON)
-            with open(geojson_path, 'r', encoding='utf-8') as f:
-                self._departamentos_geojson = json.load(f)
-        return self._departamentos_geojson
+        # Geometrías compartidas de municipios y departamentos (carga lazy)
+        self.registry = geometry_registry
+        # Áreas de departamentos exactas o sumadas desde los municipios
+        self.departamentos_mode = GEO_DEPARTMENT_AREAS
     
     def analyze_polygon(self, polygon_coords: List[List[List[float]]], db: Session) -> Dict[str, Any]:
         """
@@ -47,16 +38,99 @@ class PolygonAnalysisService:
         Returns:
             Dict con análisis completo
         """
-        # Crear polígono Shapely
+        return geo_result_cache.get_or_compute(
+            'polygon', polygon_coords, db,
+            lambda: self._analyze_polygon(polygon_coords, db),
+            echo={'coordenadas_poligono': polygon_coords}
+        )
+    
+    def _poligono(self, polygon_coords: List[List[List[float]]]) -> ShapelyPolygon:
+        """
+        Polígono del usuario
+
+        Raises:
+            ValueError si es inválido (p. ej. autointersectado); no se repara
+            para no analizar una geometría distinta de la enviada
+        """
         user_polygon = ShapelyPolygon(polygon_coords[0])
+        if not user_polygon.is_valid:
+            raise ValueError(shapely.is_valid_reason(user_polygon))
+        return user_polygon
+    
+    def _analyze_polygon(self, polygon_coords: List[List[List[float]]], db: Session) -> Dict[str, Any]:
+        """Análisis sin caché de un polígono"""
+        # Crear polígono Shapely (preparado: se prueba contra varios departamentos)
+        try:
+            user_polygon = self._poligono(polygon_coords)
+        except ValueError as e:
+            raise ValueError(f"Polígono inválido: {str(e)}")
+        shapely.prepare(user_polygon)
         
-        # Analizar intersecciones
-        municipios_result = self._find_intersecting_municipios(user_polygon, db)
-        departamentos_result = self._find_intersecting_departamentos(user_polygon, db)
+        # Analizar intersecciones sobre una misma versión de las capas
+        capas = self.registry.get()
+        divipola = divipola_cache.get(db)
+        
+        if GEO_ENGINE == POSTGIS:
+            return self._resultado_postgis(polygon_coords, user_polygon, capas, divipola, db)
+        
+        # Nivel 1: departamentos intersectados y cuáles quedan completamente dentro
+        departamentos_hit = capas.departamentos_intersectados(user_polygon, contencion=True)
+        
+        return self._resultado(polygon_coords, user_polygon, area_km2(user_polygon), capas, divipola, departamentos_hit)
+    
+    def _resultado(self, polygon_coords: List[List[List[float]]], user_polygon: ShapelyPolygon,
+                   area_total_km2: float, capas: GeometrySnapshot, divipola: DivipolaSnapshot,
+                   departamentos_hit: List[Tuple[int, bool]],
+                   municipios_hit: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Arma la respuesta a partir de los departamentos (y opcionalmente municipios) ya identificados"""
+        # Nivel 2: solo municipios de esos departamentos
+        intersecciones = self._intersecciones_municipios(
+            user_polygon, capas, departamentos_hit, municipios_hit
+        )
+        municipios_result = self._find_intersecting_municipios(capas.municipios, intersecciones, divipola)
+        if self.departamentos_mode == AGREGADO:
+            departamentos_result = self._aggregate_departamentos(
+                capas, departamentos_hit, intersecciones, divipola
+            )
+        else:
+            departamentos_result = self._find_intersecting_departamentos(
+                user_polygon, capas.departamentos, departamentos_hit, divipola
+            )
+        return self._respuesta(polygon_coords, area_total_km2, departamentos_result, municipios_result)
+    
+    def _resultado_postgis(self, polygon_coords: List[List[List[float]]], user_polygon: ShapelyPolygon,
+                           capas: GeometrySnapshot, divipola: DivipolaSnapshot, db: Session) -> Dict[str, Any]:
+        """Arma la respuesta con intersecciones y áreas calculadas por PostGIS en una sola consulta"""
+        intersecciones = postgis_engine.intersecciones(db, capas, user_polygon)
         
+        municipios_result = []
+        for idx, area, area_limite, area_km2_interseccion in intersecciones['municipios']:
+            municipio_db = divipola.municipios.get(capas.municipios.codes[idx])
+            if municipio_db:
+                municipios_result.append(self._municipio_intersectado(
+                    municipio_db, divipola, (area / area_limite) * 100, area_km2_interseccion
+                ))
+        
+        departamentos_result = []
+        for idx, area, area_limite, area_km2_interseccion in intersecciones['departamentos']:
+            depto_db = divipola.departamentos.get(capas.departamentos.codes[idx])
+            if depto_db:
+                departamentos_result.append(self._departamento_intersectado(
+                    depto_db, (area / area_limite) * 100, area_km2_interseccion
+                ))
+        
+        # Mismo orden que el motor shapely: por porcentaje de intersección
+        municipios_result.sort(key=lambda x: x['porcentaje_interseccion'], reverse=True)
+        departamentos_result.sort(key=lambda x: x['porcentaje_interseccion'], reverse=True)
+        return self._respuesta(polygon_coords, area_km2(user_polygon), departamentos_result, municipios_result)
+    
+    def _respuesta(self, polygon_coords: List[List[List[float]]], area_total_km2: float,
+                   departamentos_result: List[Dict], municipios_result: List[Dict]) -> Dict[str, Any]:
+        """Estructura AnalisisPolygonResponse"""
         return {
+            "tipo": "polygon",
             "coordenadas_poligono": polygon_coords,
-            "area_total_km2": round(user_polygon.area * 111 * 111, 2),
+            "area_total_km2": round(area_total_km2, 2),
             "resumen": {
                 "total_departamentos": len(departamentos_result),
                 "total_municipios": len(municipios_result)
@@ -65,83 +139,309 @@ class PolygonAnalysisService:
             "municipios": municipios_result
         }
     
-    def _find_intersecting_municipios(self, user_polygon: ShapelyPolygon, db: Session) -> List[Dict]:
-        """Encuentra municipios que intersectan con el polígono"""
-        municipios_intersectados = []
+    def iter_polygons(self, polygons_coords: List[List[List[List[float]]]],
+                      db: Session) -> Iterator[Dict[str, Any]]:
+        """
+        Analiza un lote de polígonos contra el índice compartido
         
-        # Iterar sobre features de municipios en GeoJSON
-        for feature in self.municipios_geojson.get('features', []):
+        La búsqueda de departamentos y municipios intersectados se hace para
+        todos los polígonos a la vez con operaciones vectorizadas; luego se
+        entrega el resultado de cada polígono, en el orden de entrada, a medida
+        que se completa.
+        
+        Args:
+            polygons_coords: Coordenadas GeoJSON de cada polígono
+            db: Sesión de base de datos
+        
+        Yields:
+            Dict con `indice`, `success`, `data` (misma estructura de analyze_polygon) y `error`
+        """
+        capas = self.registry.get()
+        divipola = divipola_cache.get(db)
+        
+        if GEO_ENGINE == POSTGIS:
+            # Una consulta por polígono: PostGIS resuelve el lote con su índice GiST
+            for i, coords in enumerate(polygons_coords):
+                try:
+                    user_polygon = self._poligono(coords)
+                except Exception as e:
+                    yield {"indice": i, "success": False, "data": None, "error": f"Polígono inválido: {str(e)}"}
+                    continue
+                try:
+                    data = self._resultado_postgis(coords, user_polygon, capas, divipola, db)
+                    yield {"indice": i, "success": True, "data": data, "error": None}
+                except Exception as e:
+                    yield {"indice": i, "success": False, "data": None, "error": f"Error al analizar polígono: {str(e)}"}
+            return
+        
+        # Polígonos válidos del lote (los inválidos se reportan sin detener el resto)
+        polys = np.full(len(polygons_coords), None, dtype=object)
+        errores: Dict[int, str] = {}
+        for i, coords in enumerate(polygons_coords):
             try:
-                municipio_geom = shape(feature['geometry'])
-                
-                if user_polygon.intersects(municipio_geom):
-                    props = feature.get('properties', {})
-                    cod_mpio = str(props.get('DPTO')) + str(props.get('MPIO'))
-
-
-                    # Buscar información en MySQL
-                    municipio_db = db.query(Municipio).filter(
-                        Municipio.codigo_municipio == cod_mpio
-                    ).first()
-                    
-                    if municipio_db:
-                        # Calcular intersección
-                        intersection = user_polygon.intersection(municipio_geom)
-                        porcentaje_area = (intersection.area / municipio_geom.area) * 100
-                        
-                        # Obtener departamento
-                        departamento_db = db.query(Departamento).filter(
-                            Departamento.codigo == municipio_db.codigo_departamento
-                        ).first()
-                        
-                        municipios_intersectados.append({
-                            "id": municipio_db.id,
-                            "codigo_municipio": municipio_db.codigo_municipio,
-                            "nombre_municipio": municipio_db.nombre_municipio,
-                            "codigo_departamento": municipio_db.codigo_departamento,
-                            "nombre_departamento": departamento_db.nombre if departamento_db else "",
-                            "porcentaje_interseccion": round(porcentaje_area, 2),
-                            "area_interseccion_km2": round(intersection.area * 111 * 111, 2)
-                        })
+                polys[i] = self._poligono(coords)
             except Exception as e:
-                continue
+                errores[i] = f"Polígono inválido: {str(e)}"
+        validos = np.array([i for i in range(len(polys)) if i not in errores], dtype=np.intp)
+        shapely.prepare(polys[validos])
+        
+        departamentos_hit, municipios_hit = self._batch_hits(capas, polys[validos])
+        areas_totales = areas_km2(polys[validos])
+        
+        for k, i in enumerate(validos.tolist()):
+            try:
+                data = self._resultado(
+                    polygons_coords[i], polys[i], float(areas_totales[k]), capas, divipola,
+                    departamentos_hit[k], municipios_hit[k]
+                )
+                yield {"indice": i, "success": True, "data": data, "error": None}
+            except Exception as e:
+                yield {"indice": i, "success": False, "data": None, "error": f"Error al analizar polígono: {str(e)}"}
+        for i, error in errores.items():
+            yield {"indice": i, "success": False, "data": None, "error": error}
+    
+    def analyze_polygons(self, polygons_coords: List[List[List[List[float]]]], db: Session) -> Dict[str, Any]:
+        """Analiza un lote de polígonos y retorna todos los resultados en orden de entrada"""
+        resultados = sorted(self.iter_polygons(polygons_coords, db), key=lambda r: r["indice"])
+        return {
+            "tipo": "polygon",
+            "total_features": len(resultados),
+            "features": resultados
+        }
+    
+    def _batch_hits(self, capas: GeometrySnapshot,
+                    polys: np.ndarray) -> Tuple[List[List[Tuple[int, bool]]], List[np.ndarray]]:
+        """
+        Departamentos (con contención) y municipios intersectados por cada polígono
+        
+        Equivale a `departamentos_intersectados(contencion=True)` más el filtro de
+        municipios por departamento, pero con una consulta al índice y un
+        predicado vectorizado por capa para todo el lote.
+        """
+        departamentos, municipios = capas.departamentos, capas.municipios
+        
+        # Nivel 1: pares (polígono, departamento) que se intersectan
+        p_idx, d_idx = departamentos.query(polys, predicate='intersects')
+        orden = np.lexsort((d_idx, p_idx))
+        p_idx, d_idx = p_idx[orden], d_idx[orden]
+        
+        # Contención exacta solo donde la envolvente del departamento cabe en la del polígono
+        pb = shapely.bounds(polys).reshape(-1, 4)[p_idx]
+        dbx = np.asarray(departamentos.bounds).reshape(-1, 4)[d_idx]
+        posible = (pb[:, 0] <= dbx[:, 0]) & (pb[:, 1] <= dbx[:, 1]) & (dbx[:, 2] <= pb[:, 2]) & (dbx[:, 3] <= pb[:, 3])
+        contenido = np.zeros(len(p_idx), dtype=bool)
+        contenido[posible] = shapely.contains(polys[p_idx[posible]], departamentos.geometries[d_idx[posible]])
+        
+        departamentos_hit: List[List[Tuple[int, bool]]] = [[] for _ in range(len(polys))]
+        for p, d, c in zip(p_idx.tolist(), d_idx.tolist(), contenido.tolist()):
+            departamentos_hit[p].append((d, c))
+        
+        # Nivel 2: municipios cuya envolvente toca el polígono, filtrados por departamento
+        codigos_capa = set(departamentos.codes)
+        estado = [
+            {departamentos.codes[d]: c for d, c in hits} for hits in departamentos_hit
+        ]
+        pm_idx, m_idx = municipios.tree.query(polys)
+        aceptados, pendientes = [], []
+        for k, (p, m) in enumerate(zip(pm_idx.tolist(), m_idx.tolist())):
+            codigo_dpto = municipios.codes[m][:2]
+            contenido_dpto = estado[p].get(codigo_dpto)
+            if contenido_dpto:
+                aceptados.append(k)
+            elif contenido_dpto is not None or codigo_dpto not in codigos_capa:
+                pendientes.append(k)
+        pendientes = np.array(pendientes, dtype=np.intp)
+        tocan = pendientes[municipios.matches(m_idx[pendientes], polys[pm_idx[pendientes]])]
+        hits = np.concatenate([np.array(aceptados, dtype=np.intp), tocan])
+        
+        municipios_hit = [np.empty(0, dtype=np.intp) for _ in range(len(polys))]
+        if len(hits):
+            orden = np.lexsort((m_idx[hits], pm_idx[hits]))
+            hp, hm = pm_idx[hits][orden], m_idx[hits][orden]
+            cortes = np.searchsorted(hp, np.arange(len(polys) + 1))
+            municipios_hit = [hm[cortes[p]:cortes[p + 1]] for p in range(len(polys))]
+        return departamentos_hit, municipios_hit
+    
+    def _intersecciones_municipios(self, user_polygon: ShapelyPolygon, capas: GeometrySnapshot,
+                                   departamentos_hit: List[Tuple[int, bool]],
+                                   municipios_hit: Optional[np.ndarray] = None
+                                   ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Municipios que intersectan con el polígono y área de cada intersección
+        
+        `municipios_hit` son municipios ya verificados (análisis por lote); si
+        no se da, se buscan los candidatos y se verifican todos de una vez.
+        
+        Returns:
+            Índices de los municipios, áreas de intersección en grados² y en km²
+        """
+        municipios = capas.municipios
+        
+        # Departamentos completamente contenidos: sus municipios no requieren intersección exacta
+        codigos_hit = [capas.departamentos.codes[idx] for idx, _ in departamentos_hit]
+        codigos_contenidos = {capas.departamentos.codes[idx] for idx, contenido in departamentos_hit if contenido}
+        
+        # Candidatos: municipios de los departamentos intersectados cuya envolvente toca el polígono
+        if municipios_hit is None:
+            candidatos = np.intersect1d(capas.municipios_de(codigos_hit), municipios.candidates(user_polygon))
+        else:
+            candidatos = municipios_hit
+        contenidos = np.array([municipios.codes[idx][:2] in codigos_contenidos for idx in candidatos], dtype=bool)
+        
+        if municipios_hit is None:
+            verificar = np.flatnonzero(~contenidos)
+            tocan = municipios.matches(candidatos[verificar], np.full(len(verificar), user_polygon, dtype=object))
+            descartados = verificar[~tocan]
+            candidatos = np.delete(candidatos, descartados)
+            contenidos = np.delete(contenidos, descartados)
+        
+        # Calcular intersecciones (el municipio completo si su departamento está contenido)
+        areas, areas_km2_interseccion = self._areas_interseccion(user_polygon, municipios, candidatos, contenidos)
+        return candidatos, areas, areas_km2_interseccion
+    
+    def _find_intersecting_municipios(self, municipios: BoundaryLayer,
+                                      intersecciones: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                                      divipola: DivipolaSnapshot) -> List[Dict]:
+        """Estructura de los municipios intersectados, ordenados por porcentaje de intersección"""
+        municipios_intersectados = []
+        indices, areas, areas_km2_interseccion = intersecciones
+        porcentajes = (areas / municipios.areas[indices]) * 100
+        
+        for idx, porcentaje_area, area_km2_interseccion in zip(indices.tolist(), porcentajes.tolist(),
+                                                               areas_km2_interseccion.tolist()):
+            # Buscar información en la caché DIVIPOLA
+            municipio_db = divipola.municipios.get(municipios.codes[idx])
+            
+            if municipio_db:
+                municipios_intersectados.append(self._municipio_intersectado(
+                    municipio_db, divipola, porcentaje_area, area_km2_interseccion
+                ))
         
         # Ordenar por porcentaje de intersección
         municipios_intersectados.sort(key=lambda x: x['porcentaje_interseccion'], reverse=True)
         return municipios_intersectados
     
-    def _find_intersecting_departamentos(self, user_polygon: ShapelyPolygon, db: Session) -> List[Dict]:
-        """Encuentra departamentos que intersectan con el polígono"""
+    def _municipio_intersectado(self, municipio_db: Dict[str, Any], divipola: DivipolaSnapshot,
+                                porcentaje_area: float, area_km2_interseccion: float) -> Dict[str, Any]:
+        """Estructura MunicipioIntersectado a partir del registro de la caché DIVIPOLA"""
+        departamento_db = divipola.departamento_de(municipio_db)
+        return {
+            "id": municipio_db['id'],
+            "codigo_municipio": municipio_db['codigo_municipio'],
+            "nombre_municipio": municipio_db['nombre_municipio'],
+            "codigo_departamento": municipio_db['codigo_departamento'],
+            "nombre_departamento": departamento_db['nombre'] if departamento_db else "",
+            "porcentaje_interseccion": round(porcentaje_area, 2),
+            "area_interseccion_km2": round(area_km2_interseccion, 2)
+        }
+    
+    def _departamento_intersectado(self, depto_db: Dict[str, Any], porcentaje_area: float,
+                                   area_km2_interseccion: float) -> Dict[str, Any]:
+        """Estructura DepartamentoIntersectado a partir del registro de la caché DIVIPOLA"""
+        return {
+            "id": depto_db['id'],
+            "codigo_departamento": depto_db['codigo'],
+            "nombre_departamento": depto_db['nombre'],
+            "porcentaje_interseccion": round(porcentaje_area, 2),
+            "area_interseccion_km2": round(area_km2_interseccion, 2)
+        }
+    
+    def _areas_interseccion(self, user_polygon: ShapelyPolygon, layer: BoundaryLayer,
+                            indices: np.ndarray, contenidos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Áreas de la intersección entre el polígono y varios límites (grados², km²)
+
+        Evita la intersección exacta cuando uno de los dos contiene al otro:
+        el límite contenido usa sus áreas precalculadas y el polígono dentro
+        del nivel interior del límite es la intersección misma. El resto se
+        interseca en una sola llamada vectorizada.
+        """
+        areas = np.zeros(len(indices))
+        areas_km2_interseccion = np.zeros(len(indices))
+        areas[contenidos] = layer.areas[indices[contenidos]]
+        areas_km2_interseccion[contenidos] = layer.areas_km2[indices[contenidos]]
+        
+        resto = np.flatnonzero(~contenidos)
+        dentro = shapely.contains(layer.tier_inner[indices[resto]], user_polygon)
+        if dentro.any():
+            areas[resto[dentro]] = user_polygon.area
+            areas_km2_interseccion[resto[dentro]] = area_km2(user_polygon)
+        
+        resto = resto[~dentro]
+        if len(resto):
+            piezas = shapely.intersection(user_polygon, layer.geometries[indices[resto]])
+            areas[resto] = shapely.area(piezas)
+            areas_km2_interseccion[resto] = areas_km2(piezas)
+        return areas, areas_km2_interseccion
+    
+    def _find_intersecting_departamentos(self, user_polygon: ShapelyPolygon, departamentos: BoundaryLayer,
+                                         departamentos_hit: List[Tuple[int, bool]],
+                                         divipola: DivipolaSnapshot) -> List[Dict]:
+        """Calcula la intersección con los departamentos ya identificados en el nivel 1"""
         departamentos_intersectados = []
         
-        # Iterar sobre features de departamentos en GeoJSON
-        for feature in self.departamentos_geojson.get('features', []):
-            try:
-                depto_geom = shape(feature['geometry'])
+        # Calcular intersecciones (el departamento completo si está contenido)
+        indices = np.array([idx for idx, _ in departamentos_hit], dtype=np.intp)
+        contenidos = np.array([contenido for _, contenido in departamentos_hit], dtype=bool)
+        areas, areas_km2_interseccion = self._areas_interseccion(user_polygon, departamentos, indices, contenidos)
+        porcentajes = (areas / departamentos.areas[indices]) * 100
+        
+        for idx, porcentaje_area, area_km2_interseccion in zip(indices.tolist(), porcentajes.tolist(),
+                                                               areas_km2_interseccion.tolist()):
+            # Buscar información en la caché DIVIPOLA
+            depto_db = divipola.departamentos.get(departamentos.codes[idx])
+            
+            if depto_db:
+                departamentos_intersectados.append(self._departamento_intersectado(
+                    depto_db, porcentaje_area, area_km2_interseccion
+                ))
+        
+        # Ordenar por porcentaje de intersección
+        departamentos_intersectados.sort(key=lambda x: x['porcentaje_interseccion'], reverse=True)
+        return departamentos_intersectados
+    
+    def _aggregate_departamentos(self, capas: GeometrySnapshot, departamentos_hit: List[Tuple[int, bool]],
+                                 intersecciones: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                                 divipola: DivipolaSnapshot) -> List[Dict]:
+        """
+        Intersección con los departamentos sumada desde las piezas de sus municipios
+        
+        Los municipios particionan cada departamento, así que el área intersectada
+        de un departamento es la suma de las de sus municipios (agrupados por el
+        prefijo del código DIVIPOLA) y no hace falta intersecar su geometría. El
+        porcentaje usa el área precalculada del departamento; la diferencia con
+        el cálculo exacto se limita a las holguras entre las dos capas fuente.
+        Un departamento sin área en ninguna pieza municipal (el polígono solo
+        cae en una holgura de la capa de municipios) no se reporta.
+        """
+        departamentos = capas.departamentos
+        
+        sumas: Dict[str, List[float]] = {}
+        indices, areas, areas_km2_interseccion = intersecciones
+        for idx, area, area_km2_interseccion in zip(indices.tolist(), areas.tolist(), areas_km2_interseccion.tolist()):
+            suma = sumas.setdefault(capas.municipios.codes[idx][:2], [0.0, 0.0])
+            suma[0] += area
+            suma[1] += area_km2_interseccion
+        
+        departamentos_intersectados = []
+        for idx, contenido in departamentos_hit:
+            cod_dpto = departamentos.codes[idx]
+            # Buscar información en la caché DIVIPOLA
+            depto_db = divipola.departamentos.get(cod_dpto)
+            
+            if depto_db:
+                if contenido:
+                    area, area_km2_interseccion = float(departamentos.areas[idx]), float(departamentos.areas_km2[idx])
+                else:
+                    area, area_km2_interseccion = sumas.get(cod_dpto, (0.0, 0.0))
+                    if area <= 0:
+                        continue
+                # Las holguras entre capas no deben llevar el porcentaje por encima de 100
+                porcentaje_area = min((area / departamentos.areas[idx]) * 100, 100.0)
                 
-                if user_polygon.intersects(depto_geom):
-                    props = feature.get('properties', {})
-                    cod_dpto = props.get('DPTO') or props.get('DPTO')
-                    
-                    # Buscar información en MySQL
-                    depto_db = db.query(Departamento).filter(
-                        Departamento.codigo == cod_dpto
-                    ).first()
-                    
-                    if depto_db:
-                        # Calcular intersección
-                        intersection = user_polygon.intersection(depto_geom)
-                        porcentaje_area = (intersection.area / depto_geom.area) * 100
-                        
-                        departamentos_intersectados.append({
-                            "id": depto_db.id,
-                            "codigo_departamento": depto_db.codigo,
-                            "nombre_departamento": depto_db.nombre,
-                            "porcentaje_interseccion": round(porcentaje_area, 2),
-                            "area_interseccion_km2": round(intersection.area * 111 * 111, 2)
-                        })
-            except Exception as e:
-                continue
+                departamentos_intersectados.append(self._departamento_intersectado(
+                    depto_db, porcentaje_area, area_km2_interseccion
+                ))
         
         # Ordenar por porcentaje de intersección
         departamentos_intersectados.sort(key=lambda x: x['porcentaje_interseccion'], reverse=True)
@@ -0,0 +1,328 @@
+"""
+Motor PostGIS para los predicados espaciales (GEO_ENGINE="postgis")
+
+Los límites del registro de geometrías se copian a la tabla `geo_limites`
+(columna geometry con índice GiST) de la base principal. Cada análisis de
+punto, línea o polígono resuelve sus predicados y medidas con una única
+consulta (ST_Contains / ST_Intersects / ST_Area / ST_Length) y devuelve
+índices de la capa en memoria, de modo que los servicios arman la respuesta
+igual que con el motor shapely.
+
+Cada fila lleva la firma de la versión de su capa (el artefacto de
+geometry_cache del que salió) y cada consulta filtra por la firma de las capas
+que tiene el llamador: durante una recarga, los workers que aún atienden con la
+versión anterior siguen recibiendo índices de esa versión. El primer worker que
+ve una versión nueva la copia bajo un advisory lock; se conservan las
+_VERSIONES_CONSERVADAS más recientes de cada capa.
+
+La extensión y las tablas no se crean al arrancar la aplicación; se instalan
+con un comando explícito y el motor falla con un mensaje claro si faltan:
+    python -m src.services.postgis_engine setup
+"""
+import hashlib
+import os
+import sys
+import threading
+import weakref
+from typing import Dict, List, Set, Tuple
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from src.config.config import GEO_MEASUREMENT_MODE, GEO_PROJECTED_CRS, sessions
+from src.services.geometry_registry import BoundaryLayer, GeometrySnapshot
+from src.utils.measurement_util import GEODESIC
+
+SHAPELY = "shapely"
+POSTGIS = "postgis"
+
+# Llave del advisory lock que serializa la instalación y la carga de la tabla entre workers
+_LOCK_KEY = 74113201
+# Versiones de cada capa que se conservan en la tabla (la vigente y la anterior,
+# para los workers que todavía no recargan)
+_VERSIONES_CONSERVADAS = 2
+
+_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS postgis",
+    """
+    CREATE TABLE IF NOT EXISTS geo_limites (
+        capa varchar(20) NOT NULL,
+        firma varchar(64) NOT NULL,
+        idx integer NOT NULL,
+        codigo varchar(10),
+        geom geometry(MultiPolygon, 4326) NOT NULL,
+        PRIMARY KEY (capa, firma, idx)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS geo_limites_geom_gist ON geo_limites USING GIST (geom)",
+    """
+    CREATE TABLE IF NOT EXISTS geo_limites_version (
+        capa varchar(20) NOT NULL,
+        firma varchar(64) NOT NULL,
+        features integer NOT NULL,
+        cargada timestamptz NOT NULL DEFAULT now(),
+        PRIMARY KEY (capa, firma)
+    )
+    """,
+)
+
+_COMANDO_SETUP = "python -m src.services.postgis_engine setup"
+# Filtro de las filas de la versión de ambas capas del llamador (parámetros :fm y :fd)
+_VERSION_CAPAS = (
+    "((l.capa = 'municipios' AND l.firma = :fm) OR (l.capa = 'departamentos' AND l.firma = :fd))"
+)
+
+
+def _srid() -> int:
+    """SRID numérico de GEO_PROJECTED_CRS ("EPSG:3116" -> 3116)"""
+    return int(GEO_PROJECTED_CRS.split(':')[-1])
+
+
+def _km2(expr: str) -> str:
+    """Expresión SQL del área en km² de una geometría WGS84, según el modo de medición"""
+    if GEO_MEASUREMENT_MODE == GEODESIC:
+        return f"ST_Area(({expr})::geography) / 1e6"
+    return f"ST_Area(ST_Transform({expr}, {_srid()})) / 1e6"
+
+
+def _km(expr: str) -> str:
+    """Expresión SQL de la longitud en km de una geometría WGS84, según el modo de medición"""
+    if GEO_MEASUREMENT_MODE == GEODESIC:
+        return f"ST_Length(({expr})::geography) / 1e3"
+    return f"ST_Length(ST_Transform({expr}, {_srid()})) / 1e3"
+
+
+# Firma calculada de cada capa (se libera con la capa)
+_firmas: "weakref.WeakKeyDictionary[BoundaryLayer, str]" = weakref.WeakKeyDictionary()
+
+
+def firma(layer: BoundaryLayer) -> str:
+    """
+    Identifica el contenido de una capa: el artefacto de geometry_cache (hash
+    del GeoJSON y formato) o, sin caché binaria, el hash de sus geometrías
+    """
+    valor = _firmas.get(layer)
+    if valor is None:
+        h = hashlib.sha256()
+        if layer.artifact_dir:
+            h.update(os.path.basename(os.path.normpath(layer.artifact_dir)).encode('utf-8'))
+        else:
+            for codigo, geom in layer.items():
+                h.update(str(codigo).encode('utf-8'))
+                h.update(shapely.to_wkb(geom))
+        valor = _firmas[layer] = h.hexdigest()
+    return valor
+
+
+def setup(db: Session) -> None:
+    """
+    Instala la extensión postgis y las tablas del motor
+
+    Una tabla del formato anterior (sin firma por versión) se descarta: solo
+    contiene una copia de los límites, que se vuelve a cargar al usarla.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:llave)"), {"llave": _LOCK_KEY})
+    anterior = db.execute(text(
+        "SELECT to_regclass('geo_limites') IS NOT NULL AND NOT EXISTS ("
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'geo_limites' AND column_name = 'firma')"
+    )).scalar()
+    if anterior:
+        db.execute(text("DROP TABLE IF EXISTS geo_limites, geo_limites_version"))
+    for sentencia in _DDL:
+        db.execute(text(sentencia))
+    db.commit()
+
+
+class PostgisEngine:
+    """Consultas espaciales contra la copia de los límites en PostGIS"""
+
+    def __init__(self):
+        # Versiones (capa, firma) cuya copia ya se verificó en la base
+        self._cargadas: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------------------- carga
+
+    def ensure_loaded(self, db: Session, capas: GeometrySnapshot) -> None:
+        """
+        Garantiza que `geo_limites` tiene la versión de las capas del llamador
+
+        Raises:
+            RuntimeError si faltan la extensión o las tablas (ver `setup`)
+        """
+        claves = {(layer.nombre, firma(layer)) for layer in (capas.municipios, capas.departamentos)}
+        if claves <= self._cargadas:
+            return
+        with self._lock:
+            if claves <= self._cargadas:
+                return
+            try:
+                self._verificar_esquema(db)
+                self._sincronizar(db, capas)
+            except Exception:
+                db.rollback()
+                raise
+            self._cargadas |= claves
+
+    def _verificar_esquema(self, db: Session) -> None:
+        """Falla con un mensaje claro si no se ejecutó `setup` en la base"""
+        fila = db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis') AS postgis, "
+            "to_regclass('geo_limites_version') IS NOT NULL AS versiones, "
+            "EXISTS (SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'geo_limites' AND column_name = 'firma') AS limites"
+        )).one()
+        if not fila.postgis:
+            raise RuntimeError(f"La base no tiene la extensión postgis; ejecute: {_COMANDO_SETUP}")
+        if not (fila.versiones and fila.limites):
+            raise RuntimeError(f"Faltan las tablas geo_limites del motor PostGIS; ejecute: {_COMANDO_SETUP}")
+
+    def _sincronizar(self, db: Session, capas: GeometrySnapshot) -> None:
+        """Copia las versiones de las capas que faltan en la tabla y poda las antiguas"""
+        db.execute(text("SELECT pg_advisory_xact_lock(:llave)"), {"llave": _LOCK_KEY})
+        actuales = {tuple(fila) for fila in db.execute(text("SELECT capa, firma FROM geo_limites_version")).all()}
+
+        recargadas = 0
+        for layer in (capas.municipios, capas.departamentos):
+            firma_capa = firma(layer)
+            if (layer.nombre, firma_capa) in actuales:
+                continue
+            filas = [
+                {"capa": layer.nombre, "firma": firma_capa, "idx": i, "codigo": codigo, "wkb": shapely.to_wkb(geom)}
+                for i, (codigo, geom) in enumerate(layer.items())
+            ]
+            if filas:
+                db.execute(text(
+                    "INSERT INTO geo_limites (capa, firma, idx, codigo, geom) "
+                    "VALUES (:capa, :firma, :idx, :codigo, ST_Multi(ST_SetSRID(ST_GeomFromWKB(:wkb), 4326)))"
+                ), filas)
+            db.execute(text(
+                "INSERT INTO geo_limites_version (capa, firma, features) VALUES (:capa, :firma, :features)"
+            ), {"capa": layer.nombre, "firma": firma_capa, "features": len(filas)})
+
+            # Versiones antiguas de la capa que ya ningún worker debería estar usando
+            db.execute(text(
+                "WITH antiguas AS ("
+                "  DELETE FROM geo_limites_version WHERE capa = :capa AND firma IN ("
+                "    SELECT firma FROM geo_limites_version WHERE capa = :capa "
+                "    ORDER BY cargada DESC OFFSET :conservadas)"
+                "  RETURNING firma) "
+                "DELETE FROM geo_limites WHERE capa = :capa AND firma IN (SELECT firma FROM antiguas)"
+            ), {"capa": layer.nombre, "conservadas": _VERSIONES_CONSERVADAS})
+            recargadas += 1
+            print(f"Límites de {layer.nombre} cargados en PostGIS ({len(filas)} features, firma {firma_capa[:12]})")
+
+        if recargadas:
+            db.execute(text("ANALYZE geo_limites"))
+        db.commit()
+
+    def _firmas(self, db: Session, capas: GeometrySnapshot) -> Dict[str, str]:
+        """Firma de cada capa del llamador, tras garantizar que su copia está en la base"""
+        self.ensure_loaded(db, capas)
+        return {"fm": firma(capas.municipios), "fd": firma(capas.departamentos)}
+
+    # ------------------------------------------------------------- consultas
+
+    def municipios_en_punto(self, db: Session, capas: GeometrySnapshot, lng: float, lat: float) -> List[int]:
+        """Índices (en orden del archivo) de los municipios de `capas` que contienen el punto"""
+        filas = db.execute(text(
+            "SELECT idx FROM geo_limites "
+            "WHERE capa = 'municipios' AND firma = :fm "
+            "AND ST_Contains(geom, ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)) "
+            "ORDER BY idx"
+        ), {"lng": float(lng), "lat": float(lat), **self._firmas(db, capas)}).all()
+        return [fila.idx for fila in filas]
+
+    def municipios_en_puntos(self, db: Session, capas: GeometrySnapshot,
+                             coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pares (punto, municipio de `capas`) donde el municipio contiene al punto, para todo el lote"""
+        filas = db.execute(text(
+            "SELECT p.i - 1 AS punto, l.idx "
+            "FROM unnest(CAST(:lngs AS float8[]), CAST(:lats AS float8[])) WITH ORDINALITY AS p(lng, lat, i) "
+            "JOIN geo_limites l ON l.capa = 'municipios' AND l.firma = :fm "
+            "AND ST_Contains(l.geom, ST_SetSRID(ST_MakePoint(p.lng, p.lat), 4326)) "
+            "ORDER BY punto, l.idx"
+        ), {"lngs": coords[:, 0].tolist(), "lats": coords[:, 1].tolist(), **self._firmas(db, capas)}).all()
+        return (
+            np.array([fila.punto for fila in filas], dtype=np.intp),
+            np.array([fila.idx for fila in filas], dtype=np.intp),
+        )
+
+    def recorridos(self, db: Session, capas: GeometrySnapshot,
+                   line: BaseGeometry) -> Dict[str, List[Tuple[int, float]]]:
+        """
+        Límites de `capas` que atraviesa la línea en ambas capas, con sus km
+
+        Equivale a `LineService._recorrido`: cada límite se ubica por la
+        fracción de la línea en la que entra (el vértice más temprano de su
+        tramo) y el resultado de cada capa queda en orden de recorrido.
+        """
+        filas = db.execute(text(f"""
+            WITH linea AS (SELECT ST_SetSRID(ST_GeomFromWKB(:wkb), 4326) AS g),
+            tramos AS (
+                SELECT l.capa, l.idx, ST_Intersection(l.geom, linea.g) AS tramo, linea.g AS linea
+                FROM geo_limites l, linea
+                WHERE {_VERSION_CAPAS} AND ST_Intersects(l.geom, linea.g)
+            )
+            SELECT capa, idx,
+                   (SELECT MIN(ST_LineLocatePoint(t.linea, d.geom)) FROM ST_DumpPoints(t.tramo) d) AS entrada,
+                   {_km('t.tramo')} AS km
+            FROM tramos t
+            WHERE NOT ST_IsEmpty(t.tramo)
+            ORDER BY capa, entrada, idx
+        """), {"wkb": shapely.to_wkb(line), **self._firmas(db, capas)}).all()
+
+        resultado: Dict[str, List[Tuple[int, float]]] = {"municipios": [], "departamentos": []}
+        for fila in filas:
+            resultado[fila.capa].append((fila.idx, float(fila.km)))
+        return resultado
+
+    def intersecciones(self, db: Session, capas: GeometrySnapshot,
+                       polygon: BaseGeometry) -> Dict[str, List[Tuple[int, float, float, float]]]:
+        """
+        Límites de `capas` que intersectan al polígono en ambas capas
+
+        Returns:
+            Por capa, tuplas (índice, área de la intersección en grados²,
+            área del límite en grados², área de la intersección en km²)
+        """
+        filas = db.execute(text(f"""
+            WITH poli AS (SELECT ST_SetSRID(ST_GeomFromWKB(:wkb), 4326) AS g)
+            SELECT l.capa, l.idx, ST_Area(i.g) AS area, ST_Area(l.geom) AS area_limite,
+                   {_km2('i.g')} AS area_km2
+            FROM geo_limites l
+            CROSS JOIN poli
+            CROSS JOIN LATERAL (
+                SELECT CASE WHEN ST_Contains(poli.g, l.geom) THEN l.geom
+                            ELSE ST_Intersection(l.geom, poli.g) END AS g
+            ) i
+            WHERE {_VERSION_CAPAS} AND ST_Intersects(l.geom, poli.g)
+            ORDER BY l.capa, l.idx
+        """), {"wkb": shapely.to_wkb(polygon), **self._firmas(db, capas)}).all()
+
+        resultado: Dict[str, List[Tuple[int, float, float, float]]] = {"municipios": [], "departamentos": []}
+        for fila in filas:
+            resultado[fila.capa].append((fila.idx, float(fila.area), float(fila.area_limite), float(fila.area_km2)))
+        return resultado
+
+
+# Instancia global del motor PostGIS
+postgis_engine = PostgisEngine()
+
+
+def main():
+    if sys.argv[1:] != ["setup"]:
+        print(f"Uso: {_COMANDO_SETUP}")
+        raise SystemExit(2)
+    db = sessions[0]()
+    try:
+        setup(db)
+    finally:
+        db.close()
+    print("Extensión postgis y tablas geo_limites listas")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Servicio de proximidad: municipios a menos de X km de un punto o una línea
+"""
+from typing import Any, Dict, List
+import numpy as np
+import shapely
+from shapely.geometry import LineString, Point
+from shapely.geometry.base import BaseGeometry
+from sqlalchemy.orm import Session
+from src.services.divipola_cache import divipola_cache
+from src.services.geometry_registry import geometry_registry
+from src.services.result_cache import geo_result_cache
+from src.utils.measurement_util import project_geometry, unproject_geometry
+
+# Segmentos por cuarto de círculo del buffer de búsqueda
+_QUAD_SEGS = 16
+# Holgura del buffer de búsqueda: el polígono del buffer queda inscrito en el círculo real
+_HOLGURA = 1.01
+
+
+class ProximityService:
+    """Servicio para encontrar los municipios dentro de un radio de una geometría"""
+
+    def __init__(self):
+        # Geometrías compartidas de municipios y departamentos
+        self.registry = geometry_registry
+
+    def point_within(self, coordinates: List[float], radio_km: float, db: Session) -> Dict[str, Any]:
+        """
+        Municipios a menos de `radio_km` del punto
+
+        Args:
+            coordinates: Coordenadas [lng, lat]
+            radio_km: Radio de búsqueda en km
+            db: Sesión de base de datos
+
+        Returns:
+            Diccionario con los municipios ordenados por distancia ascendente
+        """
+        return geo_result_cache.get_or_compute(
+            'proximity-point', coordinates, db,
+            lambda: self._within(Point(coordinates), radio_km, db, {'tipo': 'marker'}),
+            echo={'coordenadas_punto': coordinates}, radio_km=radio_km
+        )
+
+    def line_within(self, coordinates: List[List[float]], radio_km: float, db: Session) -> Dict[str, Any]:
+        """Municipios a menos de `radio_km` de la línea (por ejemplo, una vía)"""
+        return geo_result_cache.get_or_compute(
+            'proximity-line', coordinates, db,
+            lambda: self._within(LineString(coordinates), radio_km, db, {'tipo': 'line'}),
+            echo={'coordenadas_linea': coordinates}, radio_km=radio_km
+        )
+
+    def _within(self, geom: BaseGeometry, radio_km: float, db: Session,
+                encabezado: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Búsqueda sin caché acotada por el índice espacial
+
+        La geometría se proyecta a GEO_PROJECTED_CRS (transformador cacheado),
+        se amplía con un buffer del radio en metros y se lleva de vuelta a
+        WGS84: solo los municipios que el STRtree devuelve para ese buffer se
+        miden, con distancias en metros sobre la proyección. Los que tocan la
+        geometría quedan a distancia 0 sin proyectarse.
+        """
+        try:
+            municipios = self.registry.get().municipios
+            divipola = divipola_cache.get(db)
+
+            geom_m = project_geometry(geom)
+            zona = unproject_geometry(shapely.buffer(geom_m, radio_km * 1000.0 * _HOLGURA, quad_segs=_QUAD_SEGS))
+            _, candidatos = municipios.query(np.array([zona], dtype=object), predicate='intersects')
+
+            distancias = np.zeros(len(candidatos))
+            tocan = municipios.matches(candidatos, np.full(len(candidatos), geom, dtype=object))
+            lejanos = np.flatnonzero(~tocan)
+            if len(lejanos):
+                geoms_m = project_geometry(municipios.geometries[candidatos[lejanos]])
+                distancias[lejanos] = shapely.distance(geoms_m, geom_m) / 1000.0
+
+            # Distancia mínima por código (un municipio puede tener varios features)
+            por_codigo: Dict[str, float] = {}
+            for idx, distancia in zip(candidatos.tolist(), distancias.tolist()):
+                if distancia <= radio_km:
+                    codigo_mpio = municipios.codes[idx]
+                    por_codigo[codigo_mpio] = min(por_codigo.get(codigo_mpio, distancia), distancia)
+
+            municipios_result = []
+            for codigo_mpio, distancia in sorted(por_codigo.items(), key=lambda x: (x[1], x[0])):
+                # Buscar en la caché DIVIPOLA
+                municipio_db = divipola.municipios.get(codigo_mpio)
+                if municipio_db:
+                    departamento_db = divipola.departamento_de(municipio_db)
+                    municipios_result.append({
+                        'id': municipio_db['id'],
+                        'codigo_municipio': municipio_db['codigo_municipio'],
+                        'nombre_municipio': municipio_db['nombre_municipio'],
+                        'codigo_departamento': municipio_db['codigo_departamento'],
+                        'nombre_departamento': departamento_db['nombre'] if departamento_db else 'N/A',
+                        'distancia_km': round(distancia, 2)
+                    })
+
+            return dict(
+                encabezado,
+                radio_km=radio_km,
+                total_municipios=len(municipios_result),
+                municipios=municipios_result
+            )
+
+        except Exception as e:
+            raise Exception(f"Error buscando municipios cercanos: {str(e)}")
+
+
+# Instancia global del servicio
+proximity_service = ProximityService()
@@ -0,0 +1,143 @@
+"""
+Caché de resultados de los análisis geográficos
+
+Los tableros reenvían constantemente las mismas geometrías (por ejemplo las
+huellas guardadas de los proyectos); el resultado se reutiliza mientras no
+cambien los límites ni las tablas DIVIPOLA.
+
+La llave es un hash canónico de la geometría con las coordenadas redondeadas a
+GEO_RESULT_CACHE_PRECISION decimales, más el tipo de análisis y sus parámetros.
+
+Los resultados se guardan serializados: cada petición recibe su propia copia y
+modificarla (o sus listas anidadas) no altera las respuestas siguientes.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from src.config.config import (
+    GEO_RESULT_CACHE_PRECISION, GEO_RESULT_CACHE_SIZE, GEO_RESULT_CACHE_TTL_SECONDS,
+)
+from src.services.divipola_cache import divipola_cache
+from src.services.geometry_registry import geometry_registry
+
+
+class GeoResultCache:
+    """
+    Caché LRU con expiración (TTL) compartida por los analizadores
+
+    Cada entrada queda asociada a la versión de las capas geográficas y de la
+    caché DIVIPOLA con que se calculó; al cambiar cualquiera de las dos se
+    descarta todo el contenido.
+    """
+
+    def __init__(self, maxsize: int = GEO_RESULT_CACHE_SIZE, ttl: float = GEO_RESULT_CACHE_TTL_SECONDS,
+                 precision: int = GEO_RESULT_CACHE_PRECISION):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.precision = precision
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._generation: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, kind: str, coordinates: Any, **params: Any) -> str:
+        """Llave canónica de un análisis: tipo, parámetros y coordenadas redondeadas"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(kind.encode())
+        digest.update(repr(sorted(params.items())).encode())
+        self._update(digest, coordinates)
+        return digest.hexdigest()
+
+    def _update(self, digest, coordinates: Any) -> None:
+        try:
+            arr = np.asarray(coordinates, dtype=float)
+        except ValueError:
+            # Anillos de distinto tamaño: se recorre cada parte por separado
+            digest.update(b'[')
+            for parte in coordinates:
+                self._update(digest, parte)
+            digest.update(b']')
+            return
+        # Sumar 0.0 normaliza -0.0 a 0.0 tras el redondeo
+        arr = np.round(arr, self.precision) + 0.0
+        digest.update(repr(arr.shape).encode())
+        digest.update(arr.tobytes())
+
+    def get_or_compute(self, kind: str, coordinates: Any, db: Session,
+                       compute: Callable[[], Dict[str, Any]],
+                       echo: Optional[Dict[str, Any]] = None, **params: Any) -> Dict[str, Any]:
+        """
+        Retorna el resultado cacheado del análisis o lo calcula con `compute`
+
+        `echo` sobrescribe campos del resultado con los de la petición (por
+        ejemplo sus coordenadas originales, que pueden diferir dentro de la
+        precisión de la llave).
+        """
+        if self.maxsize <= 0:
+            return compute()
+
+        generation = (geometry_registry.get().version, divipola_cache.get(db).version)
+        clave = self.key(kind, coordinates, **params)
+        ahora = time.monotonic()
+
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+            entrada = self._entries.get(clave)
+            if entrada is not None and (self.ttl <= 0 or entrada[0] > ahora):
+                self._entries.move_to_end(clave)
+                self.hits += 1
+                serializado = entrada[1]
+            else:
+                serializado = None
+                self.misses += 1
+
+        if serializado is not None:
+            resultado = pickle.loads(serializado)
+        else:
+            resultado = compute()
+            serializado = pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[clave] = (ahora + self.ttl, serializado)
+                    self._entries.move_to_end(clave)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+
+        if echo:
+            resultado.update(echo)
+        return resultado
+
+    def clear(self) -> None:
+        """Descarta todos los resultados cacheados"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos y fallos para monitoreo"""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "habilitada": self.maxsize > 0,
+                "entradas": len(self._entries),
+                "capacidad": self.maxsize,
+                "ttl_s": self.ttl,
+                "precision": self.precision,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / consultas, 4) if consultas else 0.0,
+            }
+
+
+# Instancia global de la caché de resultados
+geo_result_cache = GeoResultCache()
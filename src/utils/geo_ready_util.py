@@ -0,0 +1,36 @@
+"""
+Dependencia de disponibilidad del motor geográfico para las rutas /api/point,
+/api/line, /api/polygon y afines
+"""
+import asyncio
+import time
+
+from fastapi import HTTPException, status
+
+from src.config.config import GEO_WARMUP_WAIT_SECONDS
+from src.services.geo_warmup import ERROR, geo_warmup
+
+
+async def require_geo_ready():
+    """
+    Dependencia para las rutas geográficas: espera (sin bloquear el event loop)
+    hasta GEO_WARMUP_WAIT_SECONDS a que el motor esté listo y, si no lo está,
+    responde 503 con Retry-After.
+    """
+    if geo_warmup.is_ready:
+        return
+
+    # Aplicaciones sin el evento de startup (por ejemplo, pruebas) inician la carga aquí;
+    # tras un fallo, la relanza si ya venció la espera de reintento
+    geo_warmup.start()
+
+    limite = time.monotonic() + GEO_WARMUP_WAIT_SECONDS
+    while not geo_warmup.is_ready and geo_warmup.estado != ERROR and time.monotonic() < limite:
+        await asyncio.sleep(0.05)
+
+    if not geo_warmup.is_ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El motor geográfico aún se está cargando, intenta de nuevo en unos segundos",
+            headers={"Retry-After": "5"},
+        )
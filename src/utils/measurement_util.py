@@ -0,0 +1,119 @@
+"""
+Motor de medición: proyección de coordenadas y cálculos de longitud, distancia y área
+
+Los transformadores de pyproj se crean una sola vez y se reutilizan durante toda
+la vida del proceso. Como `pyproj.Transformer` no es seguro para compartir entre
+hilos, se mantiene una instancia por hilo y por par de CRS.
+"""
+import threading
+from typing import Optional, Tuple
+import numpy as np
+import pyproj
+import shapely
+from shapely.geometry.base import BaseGeometry
+from src.config.config import GEO_MEASUREMENT_MODE, GEO_PROJECTED_CRS
+
+WGS84 = "EPSG:4326"
+PROJECTED = "projected"
+GEODESIC = "geodesic"
+
+_local = threading.local()
+# pyproj.Geod no guarda estado entre llamadas, por lo que se comparte entre hilos
+_geod = pyproj.Geod(ellps="WGS84")
+
+
+def get_transformer(src: str = WGS84, dst: str = GEO_PROJECTED_CRS) -> pyproj.Transformer:
+    """Transformador cacheado (por hilo) entre dos CRS, con orden de ejes lng/lat"""
+    cache = getattr(_local, "transformers", None)
+    if cache is None:
+        cache = _local.transformers = {}
+    transformer = cache.get((src, dst))
+    if transformer is None:
+        transformer = pyproj.Transformer.from_crs(src, dst, always_xy=True)
+        cache[(src, dst)] = transformer
+    return transformer
+
+
+def project_xy(lng, lat, crs: str = GEO_PROJECTED_CRS) -> Tuple[np.ndarray, np.ndarray]:
+    """Proyecta arreglos de longitudes/latitudes WGS84 a metros en `crs`"""
+    x, y = get_transformer(WGS84, crs).transform(np.asarray(lng, dtype=float), np.asarray(lat, dtype=float))
+    return np.asarray(x), np.asarray(y)
+
+
+def project_geometry(geom, crs: str = GEO_PROJECTED_CRS):
+    """
+    Proyecta una geometría WGS84 (o un arreglo de geometrías) a `crs`,
+    transformando todas sus coordenadas en bloque
+    """
+    def _transform(coords: np.ndarray) -> np.ndarray:
+        x, y = project_xy(coords[:, 0], coords[:, 1], crs)
+        return np.column_stack([x, y])
+    return shapely.transform(geom, _transform)
+
+
+def unproject_geometry(geom, crs: str = GEO_PROJECTED_CRS):
+    """Inversa de `project_geometry`: lleva una geometría en metros de `crs` a WGS84"""
+    def _transform(coords: np.ndarray) -> np.ndarray:
+        lng, lat = get_transformer(crs, WGS84).transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([lng, lat])
+    return shapely.transform(geom, _transform)
+
+
+def _mode(mode: Optional[str]) -> str:
+    return mode or GEO_MEASUREMENT_MODE
+
+
+def length_km(geom: BaseGeometry, mode: Optional[str] = None) -> float:
+    """Longitud de una geometría WGS84 en kilómetros"""
+    if _mode(mode) == GEODESIC:
+        return _geod.geometry_length(geom) / 1000.0
+    return project_geometry(geom).length / 1000.0
+
+
+def lengths_km(geoms: np.ndarray, mode: Optional[str] = None) -> np.ndarray:
+    """Longitudes en km de un arreglo de geometrías WGS84 (una sola proyección en modo proyectado)"""
+    geoms = np.asarray(geoms, dtype=object)
+    if _mode(mode) == GEODESIC:
+        return np.array([length_km(g, mode) for g in geoms], dtype=float)
+    return shapely.length(project_geometry(geoms)) / 1000.0
+
+
+def area_km2(geom: BaseGeometry, mode: Optional[str] = None) -> float:
+    """Área de una geometría WGS84 en kilómetros cuadrados"""
+    if geom.is_empty:
+        return 0.0
+    if _mode(mode) == GEODESIC:
+        area, _ = _geod.geometry_area_perimeter(geom)
+        return abs(area) / 1_000_000.0
+    return project_geometry(geom).area / 1_000_000.0
+
+
+def areas_km2(geoms: np.ndarray, mode: Optional[str] = None) -> np.ndarray:
+    """Áreas en km² de un arreglo de geometrías WGS84 (una sola proyección en modo proyectado)"""
+    geoms = np.asarray(geoms, dtype=object)
+    if _mode(mode) == GEODESIC:
+        return np.array([area_km2(g, mode) for g in geoms], dtype=float)
+    return shapely.area(project_geometry(geoms)) / 1_000_000.0
+
+
+def distances_km(origins: np.ndarray, targets: np.ndarray, mode: Optional[str] = None) -> np.ndarray:
+    """
+    Distancias en km entre coordenadas [lng, lat]
+
+    `origins` y `targets` son arreglos N x 2 (o 1 x 2 para difundir un mismo
+    punto contra varios destinos).
+    """
+    origins = np.atleast_2d(np.asarray(origins, dtype=float))
+    targets = np.atleast_2d(np.asarray(targets, dtype=float))
+    origins, targets = np.broadcast_arrays(origins, targets)
+    if _mode(mode) == GEODESIC:
+        _, _, metros = _geod.inv(origins[:, 0], origins[:, 1], targets[:, 0], targets[:, 1])
+        return np.asarray(metros) / 1000.0
+    ox, oy = project_xy(origins[:, 0], origins[:, 1])
+    tx, ty = project_xy(targets[:, 0], targets[:, 1])
+    return np.hypot(ox - tx, oy - ty) / 1000.0
+
+
+def distance_km(point1: BaseGeometry, point2: BaseGeometry, mode: Optional[str] = None) -> float:
+    """Distancia en km entre dos puntos WGS84"""
+    return float(distances_km([point1.x, point1.y], [point2.x, point2.y], mode)[0])
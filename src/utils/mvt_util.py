@@ -0,0 +1,155 @@
+"""
+Codificación de Mapbox Vector Tiles (especificación MVT 2.1)
+
+Implementa solo lo necesario para publicar límites: una capa por tile con
+features poligonales y atributos de texto/número, sin dependencias externas
+(el protobuf se escribe a mano).
+"""
+import math
+from typing import Any, Dict, Iterable, List, Tuple
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+EXTENT = 4096
+# Radio de la esfera de Web Mercator (EPSG:3857)
+_R = 6378137.0
+_MAX_LAT = 85.0511287798066
+
+# Tipos de geometría de la especificación
+POLYGON = 3
+
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Envolvente WGS84 (minx, miny, maxx, maxy) del tile z/x/y (esquema XYZ)"""
+    n = 2 ** z
+    lng_min = x / n * 360.0 - 180.0
+    lng_max = (x + 1) / n * 360.0 - 180.0
+    lat_max = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    lat_min = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return lng_min, lat_min, lng_max, lat_max
+
+
+def to_tile_coords(geom: BaseGeometry, z: int, x: int, y: int, extent: int = EXTENT) -> BaseGeometry:
+    """Transforma una geometría WGS84 a coordenadas del tile (0..extent, eje y hacia abajo)"""
+    n = 2 ** z
+
+    def _transform(coords: np.ndarray) -> np.ndarray:
+        lng = coords[:, 0]
+        lat = np.clip(coords[:, 1], -_MAX_LAT, _MAX_LAT)
+        mx = (lng + 180.0) / 360.0 * n
+        my = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / math.pi) / 2.0 * n
+        return np.column_stack([(mx - x) * extent, (my - y) * extent])
+
+    return shapely.transform(geom, _transform)
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field: int, data: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(data)) + data
+
+
+def _uint_field(field: int, value: int) -> bytes:
+    return _key(field, 0) + _varint(value)
+
+
+def _packed(field: int, values: Iterable[int]) -> bytes:
+    return _bytes_field(field, b''.join(_varint(v) for v in values))
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _encode_value(value: Any) -> bytes:
+    """Mensaje Value: texto, entero con signo, doble o booleano"""
+    if isinstance(value, bool):
+        return _uint_field(7, int(value))
+    if isinstance(value, int):
+        return _uint_field(6, _zigzag(value))
+    if isinstance(value, float):
+        return _key(3, 1) + np.float64(value).tobytes()
+    return _bytes_field(1, str(value).encode('utf-8'))
+
+
+def _ring_commands(coords: np.ndarray, cursor: List[int]) -> List[int]:
+    """MoveTo + LineTo + ClosePath de un anillo (sin repetir el punto de cierre)"""
+    puntos = coords[:-1]
+    if len(puntos) < 3:
+        return []
+    comandos = [(1 << 3) | _MOVE_TO]
+    for i, (px, py) in enumerate(puntos):
+        dx, dy = int(px) - cursor[0], int(py) - cursor[1]
+        cursor[0], cursor[1] = int(px), int(py)
+        comandos.extend([_zigzag(dx), _zigzag(dy)])
+        if i == 0:
+            comandos.append(((len(puntos) - 1) << 3) | _LINE_TO)
+    comandos.append((1 << 3) | _CLOSE_PATH)
+    return comandos
+
+
+def polygon_commands(geom: BaseGeometry) -> List[int]:
+    """
+    Comandos de geometría de un (Multi)Polygon ya expresado en coordenadas
+    enteras del tile; el anillo exterior queda con área positiva y los
+    interiores con área negativa, como exige la especificación.
+    """
+    comandos: List[int] = []
+    cursor = [0, 0]
+    geom = shapely.orient_polygons(geom, exterior_cw=False)
+    for poligono in shapely.get_parts(geom):
+        if poligono.geom_type != 'Polygon' or poligono.is_empty:
+            continue
+        exterior = _ring_commands(np.asarray(poligono.exterior.coords), cursor)
+        if not exterior:
+            continue
+        comandos.extend(exterior)
+        for interior in poligono.interiors:
+            comandos.extend(_ring_commands(np.asarray(interior.coords), cursor))
+    return comandos
+
+
+def encode_layer(name: str, features: List[Tuple[int, List[int], Dict[str, Any]]],
+                 extent: int = EXTENT) -> bytes:
+    """
+    Tile con una sola capa
+
+    `features` son tuplas (id, comandos de geometría poligonal, atributos).
+    """
+    keys: Dict[str, int] = {}
+    values: Dict[Any, int] = {}
+    cuerpo = bytearray()
+    for feature_id, comandos, atributos in features:
+        if not comandos:
+            continue
+        tags = []
+        for clave, valor in atributos.items():
+            if valor is None:
+                continue
+            tags.append(keys.setdefault(clave, len(keys)))
+            tags.append(values.setdefault((type(valor), valor), len(values)))
+        feature = _uint_field(1, feature_id) + _packed(2, tags) + _uint_field(3, POLYGON) + _packed(4, comandos)
+        cuerpo += _bytes_field(2, feature)
+
+    layer = _uint_field(15, 2) + _bytes_field(1, name.encode('utf-8')) + bytes(cuerpo)
+    layer += b''.join(_bytes_field(3, k.encode('utf-8')) for k in keys)
+    layer += b''.join(_bytes_field(4, _encode_value(v)) for _, v in values)
+    layer += _uint_field(5, extent)
+    return _bytes_field(3, layer)
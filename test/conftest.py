@@ -0,0 +1,108 @@
+"""
+Fixtures de los servicios geográficos
+
+Los límites son sintéticos y pequeños: tres departamentos contiguos de 1° x 2°
+y cuatro municipios por departamento, cortados en un punto distinto en cada
+uno. Al departamento 11 le falta su municipio noreste, como las holguras entre
+las dos capas fuente. Los registros DIVIPOLA viven en una base SQLite en memoria.
+"""
+import json
+from typing import Dict, List, Tuple
+import pytest
+from shapely.geometry import box, mapping
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.config.config import Base, DEPARTAMENTOS_GEOJSON, MUNICIPIOS_GEOJSON
+from src.models.divipola import Departamento, Municipio
+from src.services import geometry_cache
+from src.services.geometry_registry import geometry_registry
+from src.services.result_cache import geo_result_cache
+
+LAT_MIN, LAT_MAX = 4.0, 6.0
+# Código DIVIPOLA y longitud oeste de cada departamento
+DEPARTAMENTOS: List[Tuple[str, float]] = [("05", -76.0), ("08", -75.0), ("11", -74.0)]
+# Parte de la capa de departamentos sin municipio (noreste del departamento 11)
+HUECO = ("11", "004")
+
+
+def _corte(i: int, x0: float) -> Tuple[float, float]:
+    """Punto en el que se cortan los cuatro municipios del departamento i"""
+    return x0 + 0.37 + 0.1 * i, 4.83 + 0.2 * i
+
+
+def _limites() -> Tuple[List[Dict], List[Dict]]:
+    """Features GeoJSON de departamentos y municipios"""
+    departamentos, municipios = [], []
+    for i, (dpto, x0) in enumerate(DEPARTAMENTOS):
+        departamentos.append({
+            "type": "Feature",
+            "properties": {"DPTO": dpto, "NOMBRE_DPT": f"D{dpto}"},
+            "geometry": mapping(box(x0, LAT_MIN, x0 + 1, LAT_MAX)),
+        })
+        cx, cy = _corte(i, x0)
+        cuadrantes = [
+            box(x0, LAT_MIN, cx, cy), box(cx, LAT_MIN, x0 + 1, cy),
+            box(x0, cy, cx, LAT_MAX), box(cx, cy, x0 + 1, LAT_MAX),
+        ]
+        for j, geom in enumerate(cuadrantes, start=1):
+            mpio = f"{j:03d}"
+            if (dpto, mpio) == HUECO:
+                continue
+            municipios.append({
+                "type": "Feature",
+                "properties": {"DPTO": dpto, "MPIO": mpio, "MPIO_CNMBR": f"M{dpto}{mpio}"},
+                "geometry": mapping(geom),
+            })
+    return departamentos, municipios
+
+
+@pytest.fixture(scope="session")
+def hueco():
+    """Rectángulo (minx, miny, maxx, maxy) del departamento 11 que no cubre ningún municipio"""
+    i = [dpto for dpto, _ in DEPARTAMENTOS].index(HUECO[0])
+    x0 = DEPARTAMENTOS[i][1]
+    cx, cy = _corte(i, x0)
+    return cx, cy, x0 + 1, LAT_MAX
+
+
+@pytest.fixture(scope="session")
+def geo_data(tmp_path_factory):
+    """Directorio con los GeoJSON sintéticos"""
+    data_dir = tmp_path_factory.mktemp("data")
+    departamentos, municipios = _limites()
+    for filename, features in ((DEPARTAMENTOS_GEOJSON, departamentos), (MUNICIPIOS_GEOJSON, municipios)):
+        with open(data_dir / filename, "w", encoding="utf-8") as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f)
+    return data_dir
+
+
+@pytest.fixture(scope="session")
+def capas(geo_data):
+    """Capas del registro global leídas desde los límites sintéticos, sin caché de resultados"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(geometry_cache, "GEO_CACHE_DIR", str(geo_data / "cache"))
+        mp.setattr(geometry_registry, "data_dir", str(geo_data))
+        mp.setattr(geometry_registry, "_snapshot", None)
+        mp.setattr(geo_result_cache, "maxsize", 0)
+        yield geometry_registry.get()
+
+
+@pytest.fixture(scope="session")
+def db(capas):
+    """Sesión SQLite con los departamentos y municipios de los límites sintéticos"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Departamento.__table__, Municipio.__table__])
+    session = sessionmaker(bind=engine)()
+    for codigo in capas.departamentos.codes:
+        session.add(Departamento(codigo=codigo, nombre=f"D{codigo}", activo=True))
+    for codigo, geom in capas.municipios.items():
+        punto = geom.representative_point()
+        session.add(Municipio(
+            codigo_departamento=codigo[:2], codigo_municipio=codigo, nombre_municipio=f"M{codigo}",
+            latitud=round(punto.y, 7), longitud=round(punto.x, 7), activo=True,
+        ))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
@@ -0,0 +1,39 @@
+"""
+Artefactos de la caché binaria y cachés derivadas dentro de ellos
+"""
+import json
+import os
+import numpy as np
+import pytest
+from shapely.geometry import box, mapping
+from src.services import geometry_cache
+from src.services.lookup_grid import save
+
+
+@pytest.fixture
+def fuente(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_cache, "GEO_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "municipios_colombia.geojson"
+    feature = {"type": "Feature", "properties": {"DPTO": "05", "MPIO": "001"}, "geometry": mapping(box(0, 0, 1, 1))}
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [feature]}), encoding="utf-8")
+    return str(path)
+
+
+def test_directorio_sin_meta_se_reconstruye(fuente):
+    # Directorio recreado solo con una caché derivada tras la poda
+    path = geometry_cache.artifact_path(fuente, geometry_cache.source_hash(fuente))
+    os.makedirs(path)
+    open(os.path.join(path, "grid-0.01-v1.npy"), "wb").close()
+
+    artefacto, construido = geometry_cache.load(fuente)
+    assert construido
+    assert artefacto.path == path
+    assert geometry_cache.is_artifact(path)
+    assert len(list(artefacto.geometries())) == 1
+
+
+def test_cache_derivada_no_recrea_el_artefacto(fuente):
+    artefacto, _ = geometry_cache.load(fuente)
+    podado = artefacto.path + "-podado"
+    assert save(np.zeros((2, 2), dtype=np.int32), geometry_cache.derived_path(podado, "grid.npy")) is None
+    assert not os.path.exists(podado)
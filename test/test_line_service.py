@@ -0,0 +1,67 @@
+"""
+Orden de recorrido y km por límite de las líneas
+"""
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import LineString, Point
+from src.services.line_service import line_service
+from src.utils.measurement_util import length_km
+
+
+def _recorrido(layer, line: LineString) -> list:
+    """Códigos en orden de entrada de la línea y km dentro de cada uno, evaluando todos los límites"""
+    entradas = []
+    for codigo, geom in layer.items():
+        tramo = shapely.intersection(line, geom)
+        if tramo.is_empty or tramo.length == 0:
+            continue
+        entrada = min(line.project(Point(c)) for c in shapely.get_coordinates(tramo))
+        entradas.append((entrada, codigo, length_km(tramo)))
+    return [(codigo, km) for _, codigo, km in sorted(entradas)]
+
+
+def test_recorrido_oeste_a_este(capas, db):
+    resultado = line_service.analyze_line([[-75.9, 4.5], [-73.1, 4.5]], db)
+    assert [d["codigo_departamento"] for d in resultado["departamentos"]] == ["05", "08", "11"]
+    assert [m["codigo_municipio"] for m in resultado["municipios"]] == [
+        "05001", "05002", "08001", "08002", "11001", "11002"
+    ]
+    assert [m["orden"] for m in resultado["municipios"]] == list(range(1, 7))
+    # La línea queda completa dentro de la capa de departamentos
+    assert sum(d["longitud_km"] for d in resultado["departamentos"]) == pytest.approx(resultado["longitud_km"], abs=0.03)
+
+    inverso = line_service.analyze_line([[-73.1, 4.5], [-75.9, 4.5]], db)
+    assert [m["codigo_municipio"] for m in inverso["municipios"]] == [
+        m["codigo_municipio"] for m in reversed(resultado["municipios"])
+    ]
+
+
+@pytest.mark.parametrize("capa,campo", [("municipios", "codigo_municipio"), ("departamentos", "codigo_departamento")])
+def test_recorrido_igual_a_fuerza_bruta(capas, db, capa, campo):
+    rng = np.random.default_rng(0)
+    layer = getattr(capas, capa)
+    for _ in range(40):
+        n = int(rng.integers(2, 7))
+        coords = np.column_stack([rng.uniform(-76.2, -72.8, n), rng.uniform(3.8, 6.2, n)]).round(6).tolist()
+        esperado = _recorrido(layer, LineString(coords))
+        obtenido = line_service.analyze_line(coords, db)[capa]
+
+        assert [r[campo] for r in obtenido] == [codigo for codigo, _ in esperado], coords
+        for r, (_, km) in zip(obtenido, esperado):
+            assert r["longitud_km"] == pytest.approx(km, abs=0.011)
+
+
+def test_municipios_solo_de_departamentos_atravesados(capas, db, monkeypatch):
+    evaluados = []
+    original = line_service._recorrido
+
+    def recorrido(layer, segmentos, candidatos=None):
+        if layer is capas.municipios:
+            evaluados.append(candidatos)
+        return original(layer, segmentos, candidatos)
+    monkeypatch.setattr(line_service, "_recorrido", recorrido)
+
+    resultado = line_service.analyze_line([[-75.9, 4.2], [-75.1, 5.8]], db)
+    assert [d["codigo_departamento"] for d in resultado["departamentos"]] == ["05"]
+    assert {capas.municipios.codes[i][:2] for i in evaluados[0]} == {"05"}
@@ -0,0 +1,53 @@
+"""
+Grilla de búsqueda punto -> municipio frente al camino exacto
+"""
+import numpy as np
+import pytest
+import shapely
+from src.config.config import GEO_LOOKUP_GRID_RESOLUTION
+from src.services.lookup_grid import BORDE, MunicipioLookupGrid, build, grid_path, municipio_lookup_grid, save
+from src.services.point_service import point_service
+
+
+def _puntos(n: int, semilla: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([rng.uniform(-76.2, -72.8, n), rng.uniform(3.8, 6.2, n)]).round(6)
+
+
+@pytest.fixture(scope="module")
+def grilla(capas):
+    """Grilla de los municipios sintéticos, guardada donde la busca el servicio"""
+    municipios = capas.municipios
+    save(build(municipios), grid_path(municipios.artifact_dir, GEO_LOOKUP_GRID_RESOLUTION))
+    grilla = municipio_lookup_grid.get(municipios)
+    assert grilla is not None
+    return grilla
+
+
+def test_celdas_resueltas_coinciden_con_contains(capas, grilla):
+    coords = _puntos(5000)
+    celdas = grilla.lookup_many(coords)
+    resueltos = np.flatnonzero(celdas != BORDE)
+    assert len(resueltos) > len(coords) // 2
+
+    geoms = np.asarray(capas.municipios.geometries, dtype=object)
+    puntos = shapely.points(coords[resueltos])
+    assert shapely.contains(geoms[celdas[resueltos]], puntos).all()
+
+
+def test_servicio_con_y_sin_grilla(capas, db, grilla, monkeypatch):
+    coords = _puntos(500, semilla=1).tolist()
+    con_grilla = point_service.analyze_points(coords, db)
+    monkeypatch.setattr(municipio_lookup_grid, "get", lambda layer: None)
+    assert point_service.analyze_points(coords, db) == con_grilla
+
+
+def test_grilla_de_otra_capa_se_ignora(capas):
+    municipios = capas.municipios
+    resolucion = 0.1
+    cells = build(municipios, resolucion)
+    assert (cells != BORDE).any()
+    # Índice que no existe en la capa: la grilla se construyó para otra versión
+    cells[cells != BORDE] = len(municipios)
+    save(cells, grid_path(municipios.artifact_dir, resolucion))
+    assert MunicipioLookupGrid(resolucion).get(municipios) is None
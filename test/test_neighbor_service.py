@@ -0,0 +1,60 @@
+"""
+Vecinos desde el grafo de adyacencia frente a la comparación por fuerza bruta
+"""
+import os
+import pytest
+import shapely
+from src.config.config import GEO_ADJACENCY_TOLERANCE
+from src.services.adjacency_graph import boundary_adjacency, graph_path
+from src.services.neighbor_service import neighbor_service
+from src.utils.measurement_util import length_km
+
+
+def _vecinos_directos(layer, idx: int) -> dict:
+    """Códigos que tocan al límite `idx` y km del borde común, evaluando todas las parejas"""
+    geom = layer.geometries[idx]
+    vecinos = {}
+    for j, (codigo, otra) in enumerate(layer.items()):
+        if j != idx and shapely.dwithin(geom, otra, GEO_ADJACENCY_TOLERANCE):
+            vecinos[codigo] = length_km(shapely.intersection(geom.boundary, otra.boundary))
+    return vecinos
+
+
+@pytest.mark.parametrize("capa", ["municipios", "departamentos"])
+def test_vecinos_directos(capas, db, capa):
+    layer = getattr(capas, capa)
+    for idx, codigo in enumerate(layer.codes):
+        esperado = _vecinos_directos(layer, idx)
+        resultado = neighbor_service.neighbors(capa, codigo, 1, db)
+        obtenido = {v["codigo"]: v["longitud_frontera_km"] for v in resultado["vecinos"]}
+        assert set(obtenido) == set(esperado), codigo
+        for vecino, km in esperado.items():
+            assert obtenido[vecino] == pytest.approx(km, abs=0.05), (codigo, vecino)
+
+
+def test_vecinos_k_saltos(capas, db):
+    layer = capas.municipios
+    directos = {c: set(_vecinos_directos(layer, i)) for i, c in enumerate(layer.codes)}
+    origen = "05001"
+    # Anchura por fuerza bruta sobre los vecinos directos
+    saltos, frontera = {origen: 0}, {origen}
+    for nivel in (1, 2, 3):
+        frontera = {v for c in frontera for v in directos[c]} - set(saltos)
+        saltos.update({c: nivel for c in frontera})
+    del saltos[origen]
+
+    resultado = neighbor_service.neighbors("municipios", origen, 3, db)
+    assert {v["codigo"]: v["saltos"] for v in resultado["vecinos"]} == saltos
+    assert [v["saltos"] for v in resultado["vecinos"]] == sorted(saltos.values())
+
+
+def test_codigo_inexistente(capas, db):
+    assert neighbor_service.neighbors("municipios", "99999", 1, db) is None
+
+
+def test_grafo_dentro_del_artefacto(capas):
+    layer = capas.departamentos
+    boundary_adjacency.get(layer)
+    path = graph_path(layer.artifact_dir)
+    assert os.path.dirname(path) == layer.artifact_dir
+    assert os.path.exists(path)
@@ -0,0 +1,19 @@
+"""
+Análisis de puntos en lote frente al análisis punto a punto
+"""
+import numpy as np
+from src.services.point_service import point_service
+
+
+def test_lote_igual_a_puntos_individuales(capas, db, hueco):
+    rng = np.random.default_rng(0)
+    coords = np.column_stack([rng.uniform(-76.5, -72.5, 300), rng.uniform(3.5, 6.5, 300)]).round(6).tolist()
+    # Sobre un borde compartido, en la holgura de la capa y fuera de todos los límites
+    coords += [[-75.0, 5.0], [hueco[0] + 0.1, hueco[1] + 0.1], [-77.0, 5.0]]
+
+    lote = point_service.analyze_points(coords, db)
+    assert lote["total_puntos"] == len(coords)
+    for c, resultado in zip(coords, lote["puntos"]):
+        individual = point_service.analyze_point(c, db)
+        assert resultado["coordenadas_punto"] == c
+        assert resultado["ubicacion"] == individual["ubicacion"], c
@@ -0,0 +1,114 @@
+"""
+Análisis de polígonos sobre los límites sintéticos
+"""
+import json
+import numpy as np
+import pytest
+import shapely
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from shapely.geometry import Polygon as ShapelyPolygon, box
+from src.routes import polygon as polygon_route
+from src.services.geo_executor import geo_executor
+from src.services.polygon_service import AGREGADO, EXACTO, polygon_service
+from src.utils.geo_ready_util import require_geo_ready
+
+# Moño: los lados se cruzan en (-74.5, 5.0)
+AUTOINTERSECTADO = [[[-75.0, 4.5], [-74.0, 5.5], [-74.0, 4.5], [-75.0, 5.5], [-75.0, 4.5]]]
+CUADRADO = [[[-75.2, 4.4], [-74.6, 4.4], [-74.6, 5.0], [-75.2, 5.0], [-75.2, 4.4]]]
+
+
+def test_poligono_invalido_se_rechaza(capas, db):
+    with pytest.raises(ValueError, match="Polígono inválido"):
+        polygon_service.analyze_polygon(AUTOINTERSECTADO, db)
+
+
+def test_poligono_invalido_en_lote(capas, db):
+    resultados = polygon_service.analyze_polygons([CUADRADO, AUTOINTERSECTADO], db)["features"]
+    assert [r["success"] for r in resultados] == [True, False]
+    assert resultados[1]["error"].startswith("Polígono inválido")
+
+
+def _poligonos(n: int, semilla: int = 0) -> list:
+    """Rectángulos aleatorios sobre los límites sintéticos"""
+    rng = np.random.default_rng(semilla)
+    poligonos = []
+    for _ in range(n):
+        lng, lat = rng.uniform(-76.2, -73.5), rng.uniform(3.8, 5.8)
+        ancho, alto = rng.uniform(0.05, 1.5, 2)
+        poligonos.append([[
+            [lng, lat], [lng + ancho, lat], [lng + ancho, lat + alto], [lng, lat + alto], [lng, lat]
+        ]])
+    return poligonos
+
+
+def _departamentos(coords, modo: str, db, monkeypatch) -> dict:
+    monkeypatch.setattr(polygon_service, "departamentos_mode", modo)
+    return {d["codigo_departamento"]: d for d in polygon_service.analyze_polygon(coords, db)["departamentos"]}
+
+
+def test_departamentos_agregados_igual_a_exactos(capas, db, hueco, monkeypatch):
+    comparados = 0
+    for coords in _poligonos(80):
+        # Las holguras entre capas se prueban aparte
+        if shapely.intersects(ShapelyPolygon(coords[0]), box(*hueco)):
+            continue
+        exactos = _departamentos(coords, EXACTO, db, monkeypatch)
+        agregados = _departamentos(coords, AGREGADO, db, monkeypatch)
+        assert set(agregados) == set(exactos)
+        for codigo, d in exactos.items():
+            assert agregados[codigo]["porcentaje_interseccion"] == pytest.approx(d["porcentaje_interseccion"], abs=0.02)
+            assert agregados[codigo]["area_interseccion_km2"] == pytest.approx(
+                d["area_interseccion_km2"], rel=1e-3, abs=1.0
+            )
+        comparados += 1
+    assert comparados > 20
+
+
+def test_departamento_solo_en_holgura_no_se_reporta(capas, db, hueco, monkeypatch):
+    minx, miny, maxx, maxy = hueco
+    dentro = [[[minx + 0.1, miny + 0.1], [maxx - 0.1, miny + 0.1], [maxx - 0.1, maxy - 0.1],
+               [minx + 0.1, maxy - 0.1], [minx + 0.1, miny + 0.1]]]
+    assert "11" in _departamentos(dentro, EXACTO, db, monkeypatch)
+    assert _departamentos(dentro, AGREGADO, db, monkeypatch) == {}
+
+    # Con parte del polígono sobre un municipio se reporta lo que cubren sus piezas
+    cruzando = [[[minx - 0.1, miny + 0.1], [maxx - 0.1, miny + 0.1], [maxx - 0.1, maxy - 0.1],
+                 [minx - 0.1, maxy - 0.1], [minx - 0.1, miny + 0.1]]]
+    exacto = _departamentos(cruzando, EXACTO, db, monkeypatch)["11"]
+    agregado = _departamentos(cruzando, AGREGADO, db, monkeypatch)["11"]
+    assert 0 < agregado["porcentaje_interseccion"] < exacto["porcentaje_interseccion"]
+
+
+def test_lote_igual_a_poligonos_individuales(capas, db):
+    poligonos = _poligonos(40, semilla=1) + [AUTOINTERSECTADO]
+    lote = polygon_service.analyze_polygons(poligonos, db)
+    assert [r["indice"] for r in lote["features"]] == list(range(len(poligonos)))
+    for coords, resultado in zip(poligonos[:-1], lote["features"]):
+        assert resultado["success"]
+        assert resultado["data"] == polygon_service.analyze_polygon(coords, db)
+    assert not lote["features"][-1]["success"]
+
+
+def test_lote_ndjson_igual_al_lote(capas, db, monkeypatch):
+    app = FastAPI()
+    app.include_router(polygon_route.router)
+    app.dependency_overrides[require_geo_ready] = lambda: None
+
+    def sesion(_indice):
+        yield db
+    monkeypatch.setattr(polygon_route, "get_session", sesion)
+
+    poligonos = _poligonos(10, semilla=2)
+    cuerpo = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "id": f"p{i}", "geometry": {"type": "Polygon", "coordinates": coords}}
+        for i, coords in enumerate(poligonos)
+    ]}
+    with TestClient(app) as client:
+        respuesta = client.post("/api/polygon/analyze-batch", params={"stream": "true"}, json=cuerpo)
+    assert respuesta.status_code == 200
+    lineas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    esperado = polygon_service.analyze_polygons(poligonos, db)["features"]
+    assert sorted(lineas, key=lambda r: r["indice"]) == [dict(r, id=f"p{r['indice']}") for r in esperado]
+    # El cupo del pool tomado para el lote se liberó
+    assert geo_executor.en_curso == 0
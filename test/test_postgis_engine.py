@@ -0,0 +1,100 @@
+"""
+Equivalencia entre el motor shapely y el motor PostGIS
+
+Requiere una base PostGIS de pruebas en GEO_TEST_POSTGIS_DSN (se instalan sus
+tablas con `setup` y se cargan los límites sintéticos); sin ella se omite.
+"""
+import math
+import os
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.services import line_service, point_service, polygon_service
+from src.services.divipola_cache import divipola_cache
+from src.services.postgis_engine import POSTGIS, SHAPELY, setup
+
+DSN = os.getenv("GEO_TEST_POSTGIS_DSN")
+pytestmark = pytest.mark.skipif(not DSN, reason="GEO_TEST_POSTGIS_DSN no configurado")
+
+# Diferencia aceptada en áreas, porcentajes y km (las respuestas se redondean a 2 decimales)
+TOLERANCIA_REL = 1e-3
+TOLERANCIA_ABS = 0.011
+
+
+def _muestra(n: int = 60, semilla: int = 0) -> dict:
+    """Puntos, líneas y polígonos aleatorios sobre los límites sintéticos (y algo fuera de ellos)"""
+    rng = np.random.default_rng(semilla)
+
+    def _coords(k: int) -> list:
+        return np.column_stack([rng.uniform(-76.2, -72.8, k), rng.uniform(3.8, 6.2, k)]).round(6).tolist()
+
+    poligonos = []
+    for lng, lat in _coords(n):
+        ancho, alto = rng.uniform(0.05, 1.5, 2).round(6)
+        poligonos.append([[
+            [lng, lat], [lng + ancho, lat], [lng + ancho, lat + alto], [lng, lat + alto], [lng, lat]
+        ]])
+    return {
+        "puntos": _coords(n),
+        "lineas": [_coords(int(rng.integers(2, 6))) for _ in range(n)],
+        "poligonos": poligonos,
+    }
+
+
+def _diferencias(a, b, ruta: str = "") -> list:
+    """Rutas donde difieren dos respuestas: códigos y textos exactos, números con tolerancia"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        if set(a) != set(b):
+            return [f"{ruta}: llaves {sorted(a)} != {sorted(b)}"]
+        return [d for k in a for d in _diferencias(a[k], b[k], f"{ruta}.{k}")]
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return [f"{ruta}: {len(a)} elementos != {len(b)}"]
+        return [d for i, (x, y) in enumerate(zip(a, b)) for d in _diferencias(x, y, f"{ruta}[{i}]")]
+    if isinstance(a, float) or isinstance(b, float):
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) \
+                and math.isclose(a, b, rel_tol=TOLERANCIA_REL, abs_tol=TOLERANCIA_ABS):
+            return []
+    elif a == b:
+        return []
+    return [f"{ruta}: {a!r} != {b!r}"]
+
+
+@pytest.fixture(scope="module")
+def pg():
+    engine = create_engine(DSN)
+    session = sessionmaker(bind=engine)()
+    setup(session)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def motor(monkeypatch, db):
+    """Selecciona el motor de los servicios; la DIVIPOLA sale de la base SQLite"""
+    divipola = divipola_cache.get(db)
+    monkeypatch.setattr(divipola_cache, "get", lambda _db: divipola)
+
+    def usar(nombre: str) -> None:
+        for modulo in (point_service, line_service, polygon_service):
+            monkeypatch.setattr(modulo, "GEO_ENGINE", nombre)
+    return usar
+
+
+def _analizar(muestra: dict, db) -> dict:
+    return {
+        "puntos": point_service.point_service.analyze_points(muestra["puntos"], db)["puntos"],
+        "lineas": [line_service.line_service.analyze_line(c, db) for c in muestra["lineas"]],
+        "poligonos": [polygon_service.polygon_service.analyze_polygon(c, db) for c in muestra["poligonos"]],
+    }
+
+
+def test_motores_equivalentes(capas, pg, motor):
+    muestra = _muestra()
+    motor(SHAPELY)
+    esperado = _analizar(muestra, pg)
+    motor(POSTGIS)
+    obtenido = _analizar(muestra, pg)
+    assert _diferencias(esperado, obtenido) == []
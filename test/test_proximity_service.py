@@ -0,0 +1,45 @@
+"""
+Municipios dentro de un radio frente a la distancia a todos los municipios
+"""
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import LineString, Point
+from src.services.proximity_service import proximity_service
+from src.utils.measurement_util import project_geometry
+
+
+def _distancias(layer, geom) -> dict:
+    """Distancia en km (sobre la proyección) de la geometría a cada municipio"""
+    geoms_m = project_geometry(np.asarray(layer.geometries, dtype=object))
+    distancias = shapely.distance(geoms_m, project_geometry(geom)) / 1000.0
+    return dict(zip(layer.codes, distancias.tolist()))
+
+
+def _comparar(resultado: dict, distancias: dict, radio_km: float) -> None:
+    obtenido = {m["codigo_municipio"]: m["distancia_km"] for m in resultado["municipios"]}
+    # Los municipios justo en el radio pueden quedar de cualquier lado por redondeo
+    dudosos = {c for c, d in distancias.items() if abs(d - radio_km) < 1e-6}
+    assert set(obtenido) - dudosos == {c for c, d in distancias.items() if d <= radio_km} - dudosos
+    for codigo, km in obtenido.items():
+        assert km == pytest.approx(distancias[codigo], abs=0.011)
+    assert list(obtenido.values()) == sorted(obtenido.values())
+    assert resultado["total_municipios"] == len(obtenido)
+
+
+@pytest.mark.parametrize("radio_km", [0.5, 20.0, 80.0])
+def test_punto_dentro_del_radio(capas, db, radio_km):
+    rng = np.random.default_rng(0)
+    for lng, lat in np.column_stack([rng.uniform(-76.5, -72.5, 30), rng.uniform(3.5, 6.5, 30)]).round(6).tolist():
+        resultado = proximity_service.point_within([lng, lat], radio_km, db)
+        _comparar(resultado, _distancias(capas.municipios, Point(lng, lat)), radio_km)
+
+
+@pytest.mark.parametrize("radio_km", [1.0, 30.0])
+def test_linea_dentro_del_radio(capas, db, radio_km):
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        n = int(rng.integers(2, 5))
+        coords = np.column_stack([rng.uniform(-76.5, -72.5, n), rng.uniform(3.5, 6.5, n)]).round(6).tolist()
+        resultado = proximity_service.line_within(coords, radio_km, db)
+        _comparar(resultado, _distancias(capas.municipios, LineString(coords)), radio_km)